@@ -5,10 +5,8 @@ import numpy as np
 from config import *
 
 #ref: https://www.youtube.com/watch?v=Bk9hlNZc6sE
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Tic Tac Toe')
-screen.fill(BG_COLOR)
+# display is created in main()
+screen = None
 
 class Board:
     def __init__(self):
@@ -177,6 +175,12 @@ class Game:
         self.winner_line_coords = None
 
 def main():
+    global screen
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Tic Tac Toe')
+    screen.fill(BG_COLOR)
+
     game = Game()
     board = game.board
 
@@ -218,4 +222,5 @@ def main():
 
         pygame.display.update()
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,13 @@
 #Ultimate Version
-import math
+import math, copy
 import numpy as np
-from PIL import Image
-import random, time, requests, io, base64, pygame
+import random, time, requests, urllib3, io, base64, gzip, json, re, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from uttt_engine import BitBoard, FULL_MASK, CENTER_BIT, CORNER_BITS, LINES, index_to_move, random_playouts
+from batch_eval import evaluate_batch
+from board_tables import LINE_SCORE_LIST, mask_index
 from config import *
 
-def check_win(grid):
-    for i in range(3):
-        # Check each row
-        if grid[i, 0] == grid[i, 1] == grid[i, 2] != 0:
-            return grid[i, 0]
-
-        # Check each column
-        if grid[0, i] == grid[1, i] == grid[2, i] != 0:
-            return grid[0, i]
-    # Check both diagonals
-    if (grid[0, 0] == grid[1, 1] == grid[2, 2] != 0) or (grid[2, 0] == grid[1, 1] == grid[0, 2] != 0):
-        return grid[1, 1]
-    # Draw
-    if np.all(grid != 0):
-        return -1
-    # Ongoing
-    return 0
-
 class RandomTTTBot:
     def __init__(self, player):
         self.player = player
@@ -34,68 +19,296 @@ class RandomTTTBot:
         return random.choice(legal_moves)
 
 class VLMBot:
-    def __init__(self, screen, player):
+    def __init__(self, screen, player, api_url = VLM_API_URL, timeout = VLM_TIMEOUT, retries = VLM_RETRIES,
+                 backoff = VLM_BACKOFF, compress = True, fallback = True, image_size = VLM_IMAGE_SIZE,
+                 jpeg_quality = VLM_JPEG_QUALITY, multipart = VLM_MULTIPART):
         self.player = player
         self.screen = screen
-        self.api_url = "https://vernetta-superspiritual-sorrily.ngrok-free.dev/predict_move"
-
-    def get_bot_move(self, game):
-
-        image_data = pygame.image.tostring(self.screen, "RGB")
-        img = Image.frombytes("RGB", self.screen.get_size(), image_data)
-        buffered = io.BytesIO()
-        img.save(buffered, format="JPEG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-
-        game_state_list = []
-        for gr in range(ROWS):
-            for gc in range(COLS):
-                for lr in range(ROWS):
-                    for lc in range(COLS):
-                        game_state_list.append({
-                            "global_row": gr, "global_col": gc,
-                            "local_row": lr, "local_col": lc,
-                            "player": int(game.board.squares[gr][gc][lr][lc]),
-                        })
-
-        payload = {
-            "image_base64": img_str,
+        self.api_url = api_url
+        # total time budget for one move, retries included
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        # gzip the request body, the server inflates Content-Encoding: gzip bodies
+        self.compress = compress
+        # play the local engine's move when the API misses the deadline or returns nothing usable
+        self.fallback = fallback
+        self.fallback_bot = None
+        # one keep-alive connection pool for all moves instead of a new connection per request
+        self.session = requests.Session()
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        # side length the frame is scaled to before encoding, None keeps the window size
+        self.image_size = image_size
+        self.jpeg_quality = jpeg_quality
+        # send the JPEG as a raw multipart file instead of base64 inside the JSON body
+        self.multipart = multipart
+        self.encode_buffer = io.BytesIO()
+        self.metrics = []
+        # frame taken by snapshot() for the next move
+        self.frame = None
+
+    # the window as a PIL image, read straight from the surface buffer when the pixel layout allows it
+    def capture(self):
+        # only the VLM bot needs a screen, so the engine bots import without pygame
+        import pygame
+        from PIL import Image
+
+        size = self.screen.get_size()
+        rawmode = {(16, 8, 0): "BGRX", (0, 8, 16): "RGBX"}.get(self.screen.get_shifts()[:3])
+        if self.screen.get_bitsize() == 32 and rawmode is not None:
+            buffer = self.screen.get_buffer()
+            img = Image.frombuffer("RGB", size, buffer, "raw", rawmode, self.screen.get_pitch(), 1)
+            # frombuffer converts into the image's own memory, the surface lock is released right after
+            img.load()
+            del buffer
+        else:
+            img = Image.frombytes("RGB", size, pygame.image.tostring(self.screen, "RGB"))
+
+        if self.image_size is not None and size != (self.image_size, self.image_size):
+            img = img.resize((self.image_size, self.image_size), Image.BILINEAR)
+        return img
+
+    # called on the thread that draws the window (main.BotRunner.request), get_bot_move may run on a
+    # worker thread and must not lock the display surface while the renderer blits to it
+    def snapshot(self):
+        self.frame = self.capture()
+
+    # JPEG bytes in a buffer that is reused for every move
+    def encode_image(self):
+        self.encode_buffer.seek(0)
+        self.encode_buffer.truncate()
+        frame, self.frame = self.frame, None
+        (frame if frame is not None else self.capture()).save(self.encode_buffer, format="JPEG", quality=self.jpeg_quality)
+        return self.encode_buffer.getbuffer()
+
+    # the 81 cells as one digit string, index (global_row * 3 + global_col) * 9 + local_row * 3 + local_col
+    def encode_board(self, game):
+        return "".join(str(int(player)) for player in game.board.to_array().reshape(81))
+
+    # (url, body, headers, image bytes)
+    def encode_request(self, game):
+        image = self.encode_image()
+        image_bytes = len(image)
+        fields = {
             "player_turn": "X" if self.player == 1 else "O",
-            "global_state": game_state_list,
+            "board": self.encode_board(game),
             "allowed_square": game.allowed_square
         }
+        if self.multipart:
+            url = f"{self.api_url}/multipart"
+            fields["allowed_square"] = json.dumps(fields["allowed_square"])
+            fields["image"] = ("board.jpg", bytes(image), "image/jpeg")
+            body, content_type = urllib3.encode_multipart_formdata(fields)
+        else:
+            url = self.api_url
+            fields["image_base64"] = base64.b64encode(image).decode()
+            body, content_type = json.dumps(fields, separators=(",", ":")).encode(), "application/json"
+        # the view has to go before the buffer can be truncated for the next move
+        image.release()
+
+        headers = {"Content-Type": content_type}
+        if self.compress:
+            # the flat board colours make even the JPEG shrink to about a quarter
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return url, body, headers, image_bytes
+
+    def post(self, url, body, headers, deadline):
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline - time.time()
+            try:
+                response = self.session.post(url, data=body, headers=headers, timeout=max(remaining, 0.1))
+                if response.status_code == 200:
+                    return response, attempt
+                print(f"API Error: Status {response.status_code}")
+                # only overload and server errors are worth another try
+                if response.status_code != 429 and response.status_code < 500:
+                    return None, attempt
+            except requests.RequestException as e:
+                print(f"VLM API CONNECTION ERROR: {e}")
 
-        try:
-            print(f"--- Sending API Request for Player {self.player} ---")
-            response = requests.post(self.api_url, json=payload, timeout=20)
-            if response.status_code == 200:
+            delay = self.backoff * 2 ** (attempt - 1)
+            if attempt > self.retries or time.time() + delay >= deadline:
+                return None, attempt
+            time.sleep(delay)
+
+    def get_bot_move(self, game):
+        start_time = time.time()
+        deadline = start_time + self.timeout
+        url, body, headers, image_bytes = self.encode_request(game)
+        encode_time = time.time() - start_time
+
+        print(f"--- Sending API Request for Player {self.player} ---")
+        request_start = time.time()
+        response, attempts = self.post(url, body, headers, deadline)
+        request_time = time.time() - request_start
+
+        move = None
+        server_time = 0.0
+        if response is not None:
+            server_time = server_timing(response)
+            try:
                 move = response.json()
-                # Verify coordinates are present
-                if all(k in move for k in ["global_row", "global_col", "local_row", "local_col"]):
-                    return (move["global_row"], move["global_col"], move["local_row"], move["local_col"])
-            else:
-                print(f"API Error: Status {response.status_code}")
-        except Exception as e:
-            print(f"VLM API CONNECTION ERROR: {e}")
+            except ValueError:
+                move = None
+            # Verify coordinates are present
+            try:
+                move = tuple(int(move[k]) for k in ["global_row", "global_col", "local_row", "local_col"])
+            except (TypeError, KeyError, ValueError):
+                move = None
+
+        metrics = {"encode": encode_time, "network": max(request_time - server_time, 0.0), "server": server_time,
+                   "bytes": len(body), "image_bytes": image_bytes, "attempts": attempts}
+        self.metrics.append(metrics)
+        print(f"Player {self.player}: encode {encode_time * 1000:.1f} ms, network {metrics['network'] * 1000:.1f} ms, "
+              f"server {server_time * 1000:.1f} ms, {len(body)} bytes ({image_bytes} image), {attempts} attempt(s)")
+
+        if move is not None and not (all(0 <= v <= 2 for v in move) and game.is_move_legal(*move)):
+            print(f"VLM returned illegal move {move}")
+            move = None
+        if move is None and self.fallback:
+            if self.fallback_bot is None:
+                self.fallback_bot = UltimateTTTBot(self.player, max_time=VLM_FALLBACK_TIME)
+            print(f"Player {self.player}: falling back to the local engine")
+            move = self.fallback_bot.get_bot_move(game)
+        return move
+
+# seconds from a "Server-Timing: predict;dur=<ms>" response header, 0 when the server does not send it
+def server_timing(response):
+    match = re.search(r"dur=([0-9.]+)", response.headers.get("Server-Timing", ""))
+    return float(match.group(1)) / 1000 if match else 0.0
+
+# bound types stored in the transposition table
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+class TranspositionTable:
+    def __init__(self, size = 1 << 18):
+        # rounded up to a power of two so the slot is key & mask
+        slots = 1 << max(size - 1, 1).bit_length()
+        self.mask = slots - 1
+        # entry: (key, depth, value, bound, best_move, generation)
+        self.entries = [None] * slots
+        self.size = 0
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        self.generation += 1
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
 
+    # depth-preferred, entries left over from earlier moves are always replaced
+    def store(self, key, depth, value, bound, best_move):
+        slot = key & self.mask
+        entry = self.entries[slot]
+        if entry is None:
+            self.size += 1
+        elif entry[0] != key and entry[5] == self.generation and entry[1] > depth:
+            return
+        self.entries[slot] = (key, depth, value, bound, best_move, self.generation)
+
+    # lookup without touching the hit statistics
+    def get(self, key):
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
         return None
 
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+class SearchTimeout(Exception):
+    pass
+
+# bots kept alive in each worker process so their transposition tables survive between moves,
+# keyed by their search options so a search with another table size or move path gets its own bot
+_worker_bots = {}
+# set by stop() of the bot that owns the pool, the workers end their searches early
+_stop_event = None
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+def search_root_moves(state, player, moves, deadline, tt_size, make_unmake = True, batch_leaves = False):
+    key = (player, tt_size, make_unmake, batch_leaves)
+    bot = _worker_bots.get(key)
+    if bot is None:
+        bot = _worker_bots[key] = UltimateTTTBot(player, make_unmake=make_unmake, tt_size=tt_size, batch_leaves=batch_leaves)
+        bot.stop_event = _stop_event
+    return bot.search_root(BitBoard.from_state(state), moves, deadline)
+
 class UltimateTTTBot:
-    def __init__(self, player, max_time = 2.0):
+    def __init__(self, player, max_time = 2.0, make_unmake = True, tt_size = 1 << 18, batch_leaves = False, workers = 1):
         self.player = player
         self.opponent = 1 if player == 2 else 2
         self.max_time = max_time
+        # False searches on a deepcopy per child like the old Game.copy() path, kept for comparison
+        self.make_unmake = make_unmake
+        # tt_size = 0 turns the transposition table off
+        self.tt_size = tt_size
+        self.table = TranspositionTable(tt_size) if tt_size else None
+        # score all children of a depth 1 node with one evaluate_batch call
+        self.batch_leaves = batch_leaves
+        # evaluate_lines of every local board state from this bot's side
+        self.local_line_scores = LINE_SCORE_LIST[player]
+        # workers > 1 splits the root moves over a process pool
+        self.workers = workers
+        self.executor = None
+        # shared with the worker processes, stop() sets it
+        self.stop_event = None
+        # minimax raises SearchTimeout once this time has passed, only set for root searches in workers
+        self.deadline = None
+        self.nodes = 0
+        self.nodes_per_second = 0.0
+        self.depth = 0
+        self.principal_variation = []
+        # set from another thread by stop() to end the current search early
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    # minimax gives up once this is true
+    def should_stop(self):
+        return (self.stopped or self.deadline is not None and time.time() > self.deadline
+                or self.stop_event is not None and self.stop_event.is_set())
 
     def get_bot_move(self, game):
+        self.stopped = False
+        if self.workers > 1:
+            return self.get_parallel_bot_move(game)
+
         start_time = time.time()
-        legal_moves = game.get_legal_moves()
+        self.nodes = 0
+        if self.table is not None:
+            self.table.new_search()
+        board = game.board
+        legal_moves = board.legal_indices()
         if not legal_moves:
             return None
         best_move = legal_moves[0]
         current_depth = 1
+        # a depth that runs past max_time is abandoned, the move of the last finished depth is played
+        self.deadline = start_time + self.max_time
 
         while True:
-            if time.time() - start_time > self.max_time * 0.95:
+            if time.time() - start_time > self.max_time * 0.95 or self.stopped:
                 break
             try:
                 if current_depth > 1:
@@ -104,24 +317,173 @@ class UltimateTTTBot:
                 else:
                     ordered_moves = legal_moves
 
-                _, current_best_move = self.minimax(game, current_depth, -math.inf, math.inf, True, ordered_moves)
-                if current_best_move:
+                _, current_best_move = self.minimax(board, current_depth, -math.inf, math.inf, True, ordered_moves)
+                if current_best_move is not None:
                     best_move = current_best_move
                 current_depth += 1
+            except SearchTimeout:
+                break
             except Exception as e:
                 print(e)
                 break
-        return best_move
+        self.deadline = None
+
+        elapsed = time.time() - start_time
+        self.depth = current_depth - 1
+        self.nodes_per_second = self.nodes / elapsed if elapsed > 0 else 0.0
+        self.principal_variation = self.get_principal_variation(board, best_move, self.depth)
+        print(f"Player {self.player}: depth {self.depth}, {self.nodes} nodes, {self.nodes_per_second:.0f} nodes/s")
+        print(f"Player {self.player}: PV {self.principal_variation}")
+        if self.table is not None:
+            print(f"Player {self.player}: TT hit rate {self.table.hit_rate * 100:.1f}%, "
+                  f"{self.table.size}/{len(self.table.entries)} entries")
+        return index_to_move(best_move)
+
+    def get_parallel_bot_move(self, game):
+        start_time = time.time()
+        board = game.board
+        legal_moves = board.legal_indices()
+        if not legal_moves:
+            return None
 
-    def minimax(self, game, depth, alpha, beta, maximizing_player, moves = None):
+        # every worker searches its share of the root moves until the common deadline
+        deadline = start_time + self.max_time * 0.95
+        workers = min(self.workers, len(legal_moves))
+        self.start_workers()
+        self.stop_event.clear()
+        state = board.state()
+        futures = [self.executor.submit(search_root_moves, state, self.player, legal_moves[i::workers], deadline, self.tt_size,
+                                        self.make_unmake, self.batch_leaves)
+                   for i in range(workers)]
+        pending = futures
+        while pending and not self.stopped:
+            _, pending = wait(pending, timeout=0.05)
+        # after stop() the workers that have not started are dropped, the running ones see the event and return
+        for future in pending:
+            future.cancel()
+        results = [future.result() for future in futures if not future.cancelled()]
+        if not results:
+            return index_to_move(legal_moves[0])
+
+        # values are only comparable at a depth every worker has finished
+        worker_depths = [len(result["depths"]) for result in results]
+        self.depth = min(worker_depths)
+        self.nodes = sum(result["nodes"] for result in results)
+        if self.depth == 0:
+            best_move, self.principal_variation = legal_moves[0], [index_to_move(legal_moves[0])]
+        else:
+            best_value = -math.inf
+            for result in results:
+                _, value, move, variation = result["depths"][self.depth - 1]
+                if value > best_value:
+                    best_value, best_move, self.principal_variation = value, move, variation
+
+        elapsed = time.time() - start_time
+        self.nodes_per_second = self.nodes / elapsed if elapsed > 0 else 0.0
+        print(f"Player {self.player}: {workers} workers, depth {self.depth} (per worker {worker_depths}), "
+              f"{self.nodes} nodes, {self.nodes_per_second:.0f} nodes/s")
+        print(f"Player {self.player}: PV {self.principal_variation}")
+        return index_to_move(best_move)
+
+    # searches the position with the opponent to move until stop(), the next get_bot_move then
+    # starts with a transposition table that already holds the replies to their likely moves
+    def ponder(self, game):
+        if self.table is None or self.workers > 1:
+            return
+        self.nodes = 0
+        self.table.new_search()
+        board = game.board
+        depth = 1
+        try:
+            while not self.stopped and depth <= 81 and board.legal_indices():
+                self.minimax(board, depth, -math.inf, math.inf, False)
+                depth += 1
+        except SearchTimeout:
+            pass
+        print(f"Player {self.player}: pondered to depth {depth - 1}, {self.nodes} nodes")
+
+    # iterative deepening over a subset of the root moves, run inside a worker process
+    def search_root(self, board, moves, deadline):
+        self.nodes = 0
+        self.deadline = deadline
+        if self.table is not None:
+            self.table.new_search()
+        best_move = moves[0]
+        depths = []
+        current_depth = 1
+        try:
+            while not self.should_stop():
+                ordered_moves = [best_move] + [move for move in moves if move != best_move]
+                value, current_best_move = self.minimax(board, current_depth, -math.inf, math.inf, True, ordered_moves)
+                if current_best_move is not None:
+                    best_move = current_best_move
+                depths.append((current_depth, value, best_move, self.get_principal_variation(board, best_move, current_depth)))
+                current_depth += 1
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return {"depths": depths, "nodes": self.nodes}
+
+    # follows the stored best moves in the transposition table after the chosen root move
+    def get_principal_variation(self, board, move, depth):
+        variation = [move]
+        undos = [board.make_move(move)]
+        while self.table is not None and len(variation) < depth and board.global_status() not in (1, 2):
+            entry = self.table.get(board.hash_key())
+            if entry is None or entry[4] is None or not board.is_legal(entry[4]):
+                break
+            variation.append(entry[4])
+            undos.append(board.make_move(entry[4]))
+        for undo in reversed(undos):
+            board.unmake_move(undo)
+        return [index_to_move(move) for move in variation]
+
+    # starts the process pool up front so the first move does not pay for it
+    def start_workers(self):
+        if self.workers > 1 and self.executor is None:
+            self.stop_event = multiprocessing.Event()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.stop_event,))
+            list(self.executor.map(abs, range(self.workers)))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    # moves are cell indices (0-80) on the bitboard
+    def minimax(self, board, depth, alpha, beta, maximizing_player, moves = None):
+        self.nodes += 1
+        if not self.nodes & 1023 and self.should_stop():
+            raise SearchTimeout()
         is_minimax_ordered = moves is not None
-        legal_moves = moves if is_minimax_ordered else game.get_legal_moves()
-
-        if depth == 0 or game.is_game_over() or not legal_moves:
-            return self.evaluate(game), None
+        legal_moves = moves if is_minimax_ordered else board.legal_indices()
+
+        if depth == 0 or board.global_status() in (1, 2) or not legal_moves:
+            return self.evaluate(board), None
+
+        alpha_original, beta_original = alpha, beta
+        key = None
+        if self.table is not None:
+            key = board.hash_key()
+            entry = self.table.probe(key)
+            if entry is not None:
+                _, entry_depth, entry_value, entry_bound, entry_move, _ = entry
+                # no cutoffs at the root, it has to return a move from the given list
+                if entry_depth >= depth and not is_minimax_ordered:
+                    if entry_bound == TT_EXACT:
+                        return entry_value, entry_move
+                    if entry_bound == TT_LOWER:
+                        alpha = max(alpha, entry_value)
+                    else:
+                        beta = min(beta, entry_value)
+                    if beta <= alpha:
+                        return entry_value, entry_move
+                # search the stored best move first
+                if not is_minimax_ordered and entry_move in legal_moves:
+                    legal_moves = [entry_move] + [move for move in legal_moves if move != entry_move]
 
         best_move = None
-        current_player = self.player if maximizing_player else self.opponent
         next_player = not maximizing_player
 
         if maximizing_player:
@@ -129,20 +491,28 @@ class UltimateTTTBot:
         else:
             value = math.inf
 
-        for move in legal_moves:
-            new_game = game.copy()
-            new_game.board.mark_square(move[0], move[1], move[2], move[3], current_player)
-            g_row, g_col, l_row, l_col = move
-            new_game.board.global_squares[g_row, g_col] = check_win(new_game.board.squares[g_row, g_col])
-            if new_game.board.global_squares[l_row, l_col] != 0:
-                new_game.allowed_square = None
+        child_scores = None
+        if self.batch_leaves and depth == 1:
+            # a batch takes as long as many plain nodes, the deadline is checked before every one
+            if self.should_stop():
+                raise SearchTimeout()
+            child_scores = self.evaluate_children(board, legal_moves)
+
+        for i, move in enumerate(legal_moves):
+            if child_scores is not None:
+                self.nodes += 1
+                eval_score = float(child_scores[i])
+            elif self.make_unmake:
+                undo = board.make_move(move)
+                # a SearchTimeout from below must not leave the move on the caller's board
+                try:
+                    eval_score, _ = self.minimax(board, depth - 1, alpha, beta, next_player)
+                finally:
+                    board.unmake_move(undo)
             else:
-                new_game.allowed_square = (l_row, l_col)
-
-            # need to switch player so that the function does not mistake the next move as its own
-            new_game.switch_player()
-
-            eval_score, _ = self.minimax(new_game, depth - 1, alpha, beta, next_player)
+                new_board = copy.deepcopy(board)
+                new_board.make_move(move)
+                eval_score, _ = self.minimax(new_board, depth - 1, alpha, beta, next_player)
 
             if maximizing_player:
                 if eval_score > value:
@@ -156,11 +526,20 @@ class UltimateTTTBot:
                 beta = min(beta, value)
                 if beta <= alpha:
                     break
+
+        if key is not None:
+            if value <= alpha_original:
+                bound = TT_UPPER
+            elif value >= beta_original:
+                bound = TT_LOWER
+            else:
+                bound = TT_EXACT
+            self.table.store(key, depth, value, bound, best_move)
         return value, best_move
 
     # Evaluate the current game state
-    def evaluate(self, game):
-        winner = game.get_winner()
+    def evaluate(self, board):
+        winner = board.global_status()
 
         if winner == self.player:
             return 10000000
@@ -170,64 +549,280 @@ class UltimateTTTBot:
         score = 0
 
         # Global Board Evaluation
-        global_board = game.board.global_squares
-        score += self.evaluate_global_board(global_board)
+        own_boards, opponent_boards = board.won[self.player], board.won[self.opponent]
+        score += self.evaluate_global_board(own_boards, opponent_boards, ~board.closed & FULL_MASK)
 
         # Punish for giving opponent free play
-        if game.allowed_square is None: score -= 500
+        if board.allowed < 0: score -= 500
 
         # Local Board Evaluation
-        for row in range(ROWS):
-            for col in range(COLS):
-                board = game.board.squares[row][col]
-                if check_win(board) == self.player:
-                    score += 2000
-                    if row == 1 and col == 1: score += 2000
-                elif check_win(board) == self.opponent:
-                    score -= 2000
-                else:
-                    score += self.evaluate_local_board(board)
+        x_cells, o_cells = board.cells[1], board.cells[2]
+        for local in range(9):
+            bit = 1 << local
+            if own_boards & bit:
+                score += 2000
+                if local == 4: score += 2000
+            elif opponent_boards & bit:
+                score -= 2000
+            else:
+                shift = local * 9
+                score += self.evaluate_local_board(mask_index((x_cells >> shift) & FULL_MASK, (o_cells >> shift) & FULL_MASK))
         return score
 
-    # General Evaluation
-    def evaluate_lines(self, board):
-        lines = [
-            [(0,0), (0,1), (0,2)],
-            [(1,0), (1,1), (1,2)],
-            [(2,0), (2,1), (2,2)],
-            [(0,0), (1,0), (2,0)],
-            [(0,1), (1,1), (2,1)],
-            [(0,2), (1,2), (2,2)],
-            [(0,0), (1,1), (2,2)],
-            [(0,2), (1,1), (2,0)],
-        ]
-
+    # evaluate for a (N, 3, 3, 3, 3) stack of positions, e.g. from batch_eval.stack_log_entries
+    def evaluate_batch(self, squares, free_play):
+        return evaluate_batch(squares, free_play, self.player)
+
+    def evaluate_children(self, board, moves):
+        n = len(moves)
+        squares = np.repeat(board.to_array().reshape(1, 81), n, axis=0)
+        squares[np.arange(n), moves] = board.player
+        free_play = []
+        for move in moves:
+            undo = board.make_move(move)
+            free_play.append(board.allowed < 0)
+            board.unmake_move(undo)
+        return self.evaluate_batch(squares.reshape(n, ROWS, COLS, ROWS, COLS), free_play)
+
+    # General Evaluation on 9-bit masks of own, opponent and empty squares
+    def evaluate_lines(self, own, opponent, empty):
         score = 0
 
-        center_square = board[1][1]
-        if center_square == self.player: score += 0.35
-        elif center_square == self.opponent: score -= 0.35
+        if own & CENTER_BIT: score += 0.35
+        elif opponent & CENTER_BIT: score -= 0.35
 
-        corners = [(0, 0), (0, 2), (2, 0), (2, 2)]
-        for row, col in corners:
-            corner = board[row][col]
-            if corner == self.player: score += 0.30
-            elif corner == self.opponent: score -= 0.30
+        for corner in CORNER_BITS:
+            if own & corner: score += 0.30
+            elif opponent & corner: score -= 0.30
 
-        for line in lines:
-            values = [board[r][c] for r, c in line]
-            if values.count(self.player) == 2 and 0 in values:
+        for line in LINES:
+            own_count = (own & line).bit_count()
+            opponent_count = (opponent & line).bit_count()
+            empty_count = (empty & line).bit_count()
+            if own_count == 2 and empty_count:
                 score += 20
-            elif values.count(self.opponent) == 2 and 0 in values:
+            elif opponent_count == 2 and empty_count:
                 score -= 20
-            elif values.count(self.player) == 1 and values.count(0) == 2:
+            elif own_count == 1 and empty_count == 2:
                 score += 1
-            elif values.count(self.opponent) == 1 and values.count(0) == 2:
+            elif opponent_count == 1 and empty_count == 2:
                 score -= 1
         return score
 
-    def evaluate_global_board(self, board):
-        return self.evaluate_lines(board) * 10000
+    def evaluate_global_board(self, own, opponent, empty):
+        return self.evaluate_lines(own, opponent, empty) * 10000
+
+    # local boards are looked up by their base-3 index in board_tables
+    def evaluate_local_board(self, index):
+        return self.local_line_scores[index] * 5
 
-    def evaluate_local_board(self, board):
-        return self.evaluate_lines(board) * 5
\ No newline at end of file
+class MCTSBot:
+    def __init__(self, player, max_time = 2.0, batch_size = 32, exploration = 1.4, capacity = 1 << 16,
+                 reuse_tree = True, seed = None):
+        self.player = player
+        self.max_time = max_time
+        # random playouts run together from every new leaf
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.rng = np.random.default_rng(seed)
+        self.playouts = 0
+        self.playouts_per_second = 0.0
+        self.stopped = False
+        self.allocate(capacity)
+
+    # the tree lives in flat arrays, children of a node are stored next to each other
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.move = np.full(capacity, -1, dtype=np.int16)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int16)
+        self.visits = np.zeros(capacity)
+        # reward from the view of the player who made the move into the node: 1 win, 0.5 draw
+        self.value = np.zeros(capacity)
+        self.mover = np.zeros(capacity, dtype=np.int8)
+        self.size = 0
+        self.root = -1
+        self.root_state = None
+
+    def new_node(self, parent, move, mover):
+        node = self.size
+        self.parent[node], self.move[node], self.mover[node] = parent, move, mover
+        self.first_child[node], self.child_count[node] = -1, 0
+        self.visits[node] = self.value[node] = 0.0
+        self.size += 1
+        return node
+
+    def grow(self):
+        extra = self.capacity
+        for name, fill in (("parent", -1), ("move", -1), ("first_child", -1), ("child_count", 0),
+                           ("visits", 0), ("value", 0), ("mover", 0)):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.full(extra, fill, dtype=array.dtype)]))
+        self.capacity += extra
+
+    def expand(self, node, board):
+        moves = board.legal_indices()
+        if self.size + len(moves) > self.capacity:
+            self.grow()
+        first = self.size
+        for move in moves:
+            self.new_node(node, move, board.player)
+        self.first_child[node], self.child_count[node] = first, len(moves)
+
+    def select_child(self, node):
+        first = self.first_child[node]
+        children = slice(first, first + self.child_count[node])
+        visits = self.visits[children]
+        unvisited = np.flatnonzero(visits == 0)
+        if unvisited.size:
+            return first + int(self.rng.choice(unvisited))
+        uct = self.value[children] / visits + self.exploration * np.sqrt(np.log(self.visits[node]) / visits)
+        return first + int(uct.argmax())
+
+    # keeps the subtree of the current position from the previous search, compacted to the front
+    def find_root(self, board):
+        state = board.state()
+        if not self.reuse_tree or self.root < 0:
+            return None
+        frontier = [(self.root, self.root_state)]
+        # the new position is at most two plies (our move, their move) below the old root
+        for _ in range(3):
+            next_frontier = []
+            for node, node_state in frontier:
+                if node_state == state:
+                    return node
+                first = self.first_child[node]
+                if first < 0:
+                    continue
+                parent_board = BitBoard.from_state(node_state)
+                for child in range(first, first + self.child_count[node]):
+                    undo = parent_board.make_move(int(self.move[child]))
+                    next_frontier.append((child, parent_board.state()))
+                    parent_board.unmake_move(undo)
+            frontier = next_frontier
+        return None
+
+    def reroot(self, node):
+        order = [node]
+        i = 0
+        while i < len(order):
+            first = self.first_child[order[i]]
+            if first >= 0:
+                order.extend(range(first, first + self.child_count[order[i]]))
+            i += 1
+        order = np.array(order)
+        new_index = np.full(self.size, -1, dtype=np.int32)
+        new_index[order] = np.arange(len(order))
+
+        first_child = self.first_child[order]
+        self.first_child[:len(order)] = np.where(first_child >= 0, new_index[np.maximum(first_child, 0)], -1)
+        self.parent[:len(order)] = new_index[np.maximum(self.parent[order], 0)]
+        self.parent[0] = -1
+        for array in (self.move, self.child_count, self.visits, self.value, self.mover):
+            array[:len(order)] = array[order]
+        self.size = len(order)
+        self.root = 0
+
+    # moves the root to the current position, keeping the old subtree when it is found
+    def set_root(self, board):
+        root = self.find_root(board)
+        if root is None:
+            self.size = 0
+            self.root = self.new_node(-1, -1, 3 - board.player)
+        else:
+            self.reroot(root)
+        self.root_state = board.state()
+        return int(self.visits[self.root])
+
+    def stop(self):
+        self.stopped = True
+
+    def get_bot_move(self, game):
+        self.stopped = False
+        start_time = time.time()
+        board = game.board
+        legal_moves = board.legal_indices()
+        if not legal_moves:
+            return None
+        if len(legal_moves) == 1:
+            return index_to_move(legal_moves[0])
+
+        reused = self.set_root(board)
+
+        self.playouts = 0
+        # the first iteration expands the root, so there is a move to pick even with no time left or after stop()
+        self.run_iteration(board)
+        while time.time() - start_time < self.max_time * 0.95 and not self.stopped:
+            self.run_iteration(board)
+
+        elapsed = time.time() - start_time
+        self.playouts_per_second = self.playouts / elapsed if elapsed > 0 else 0.0
+        first = self.first_child[self.root]
+        children = slice(first, first + self.child_count[self.root])
+        best_child = first + int(self.visits[children].argmax())
+        win_rate = self.value[best_child] / max(self.visits[best_child], 1)
+        print(f"Player {self.player}: {self.playouts} playouts, {self.playouts_per_second:.0f} playouts/s, "
+              f"{self.size} nodes ({reused} visits reused), win rate {win_rate * 100:.1f}%")
+        return index_to_move(int(self.move[best_child]))
+
+    # grows the tree below the opponent's position until stop(), get_bot_move reuses it afterwards
+    def ponder(self, game, max_nodes = 1 << 20):
+        board = game.board
+        if not self.reuse_tree or board.global_status() != 0 or not board.legal_indices():
+            return
+        self.set_root(board)
+        self.playouts = 0
+        while not self.stopped and self.size < max_nodes:
+            self.run_iteration(board)
+        print(f"Player {self.player}: pondered {self.playouts} playouts, {self.size} nodes")
+
+    def run_iteration(self, root_board):
+        board = root_board.copy()
+        node = self.root
+
+        # selection
+        while self.first_child[node] >= 0 and board.global_status() == 0:
+            node = self.select_child(node)
+            board.make_move(int(self.move[node]))
+
+        # expansion, then batched playouts from one new child
+        status = board.global_status()
+        if status == 0 and self.first_child[node] < 0:
+            self.expand(node, board)
+            if self.child_count[node]:
+                node = self.select_child(node)
+                board.make_move(int(self.move[node]))
+                status = board.global_status()
+            else:
+                status = -1
+
+        if status == 0:
+            winners = random_playouts(board, self.batch_size, self.rng)
+        else:
+            winners = np.full(self.batch_size, status)
+        self.playouts += self.batch_size
+        wins = (winners == 1).sum(), (winners == 2).sum()
+        draws = self.batch_size - wins[0] - wins[1]
+
+        # backpropagation
+        while node >= 0:
+            self.visits[node] += self.batch_size
+            self.value[node] += wins[self.mover[node] - 1] + 0.5 * draws
+            node = self.parent[node]
+
+# search depth reached within max_time on the same position for each worker count
+def depth_scaling(game, player, max_time = 2.0, worker_counts = (1, 2, 4, 8)):
+    rows = []
+    for workers in worker_counts:
+        bot = UltimateTTTBot(player, max_time, workers=workers)
+        bot.start_workers()
+        bot.get_bot_move(game)
+        rows.append((workers, bot.depth, bot.nodes, bot.nodes_per_second))
+        bot.close()
+
+    print(f"{'workers':>8} {'depth':>6} {'nodes':>10} {'nodes/s':>10}")
+    for workers, depth, nodes, nodes_per_second in rows:
+        print(f"{workers:>8} {depth:>6} {nodes:>10} {nodes_per_second:>10.0f}")
+    return rows
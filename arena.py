@@ -0,0 +1,159 @@
+# Headless bot-vs-bot tournaments
+#
+# usage: python arena.py random minimax:max_time=0.1 mcts:max_time=0.2,batch_size=64 --games 200 --workers 8
+# Every pair of bots plays --games games with alternating colours, results are streamed to a gzip JSONL file.
+import argparse, contextlib, gzip, io, json, math, os, random, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from TTT_bot import RandomTTTBot, UltimateTTTBot, MCTSBot
+from uttt_engine import Game
+from config import ARENA_LOG_PATH
+
+BOT_TYPES = {
+    "random": RandomTTTBot,
+    "minimax": UltimateTTTBot,
+    "mcts": MCTSBot,
+}
+
+# "minimax:max_time=0.2,workers=2" -> ("minimax", {"max_time": 0.2, "workers": 2})
+def parse_bot_spec(spec):
+    name, _, options = spec.partition(":")
+    if name not in BOT_TYPES:
+        raise ValueError(f"Unknown bot '{name}', expected one of {sorted(BOT_TYPES)}")
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        kwargs[key] = json.loads(value)
+    return name, kwargs
+
+def make_bot(spec, player, seed):
+    name, kwargs = parse_bot_spec(spec)
+    if name == "mcts":
+        kwargs.setdefault("seed", seed)
+    return BOT_TYPES[name](player, **kwargs)
+
+def play_game(game_id, x_spec, o_spec, seed):
+    random.seed(seed)
+    bots = {1: make_bot(x_spec, 1, seed), 2: make_bot(o_spec, 2, seed + 1)}
+    game = Game()
+    moves, move_times = [], []
+
+    # the bots print search statistics on every move
+    with contextlib.redirect_stdout(io.StringIO()):
+        while game.running and game.get_legal_moves():
+            start = time.perf_counter()
+            # bots get a copy like in main.BotRunner, a search has to hand it back as it found it
+            position = game.copy()
+            move = bots[game.player].get_bot_move(position)
+            move_times.append(round(time.perf_counter() - start, 5))
+            if position.board.state() != game.board.state():
+                raise RuntimeError(f"Game {game_id}: {bots[game.player].__class__.__name__} left its board changed after {len(moves)} moves")
+            if move is None or tuple(move) not in game.get_legal_moves():
+                # an illegal or missing move loses the game
+                game.winner = 3 - game.player
+                break
+            game.play_move(*move)
+            moves.append(list(move))
+
+    for bot in bots.values():
+        if hasattr(bot, "close"):
+            bot.close()
+
+    winner = int(game.winner) if game.winner in (1, 2) else -1
+    return {"game": game_id, "x": x_spec, "o": o_spec, "seed": seed, "winner": winner,
+            "moves": moves, "move_times": move_times}
+
+# every pair plays games alternating who is X
+def schedule(specs, games, seed):
+    jobs = []
+    for i in range(len(specs)):
+        for j in range(i + 1, len(specs)):
+            for k in range(games):
+                x_spec, o_spec = (specs[i], specs[j]) if k % 2 == 0 else (specs[j], specs[i])
+                jobs.append((len(jobs), x_spec, o_spec, seed + 2 * len(jobs)))
+    return jobs
+
+# score of a against b: wins + draws / 2 over all their games
+def pair_scores(results):
+    scores = {}
+    for result in results:
+        x_spec, o_spec = result["x"], result["o"]
+        for spec, opponent, side in ((x_spec, o_spec, 1), (o_spec, x_spec, 2)):
+            entry = scores.setdefault((spec, opponent), [0, 0, 0])
+            if result["winner"] == side: entry[0] += 1
+            elif result["winner"] == -1: entry[1] += 1
+            else: entry[2] += 1
+    return scores
+
+# mean score with a normal-approximation 95% interval from the per-game score variance
+def score_interval(wins, draws, losses):
+    n = wins + draws + losses
+    if n == 0:
+        return 0.5, 0.0, 1.0
+    score = (wins + 0.5 * draws) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    margin = 1.96 * math.sqrt(variance / n)
+    return score, max(score - margin, 0.0), min(score + margin, 1.0)
+
+def elo_difference(score):
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+def print_tables(results, specs):
+    scores = pair_scores(results)
+
+    print(f"\n{'bot':<40} {'games':>6} {'W':>5} {'D':>5} {'L':>5} {'score':>7} {'95% CI':>15}")
+    for spec in specs:
+        totals = np.zeros(3, dtype=int)
+        for (a, _), entry in scores.items():
+            if a == spec:
+                totals += entry
+        score, low, high = score_interval(*totals)
+        print(f"{spec:<40} {totals.sum():>6} {totals[0]:>5} {totals[1]:>5} {totals[2]:>5} "
+              f"{score * 100:>6.1f}% [{low * 100:5.1f}, {high * 100:5.1f}]")
+
+    print(f"\n{'bot':<40} {'opponent':<40} {'score':>7} {'Elo':>7} {'95% CI':>17}")
+    for i, a in enumerate(specs):
+        for b in specs[i + 1:]:
+            if (a, b) not in scores:
+                continue
+            score, low, high = score_interval(*scores[(a, b)])
+            print(f"{a:<40} {b:<40} {score * 100:>6.1f}% {elo_difference(score):>+7.0f} "
+                  f"[{elo_difference(low):+6.0f}, {elo_difference(high):+6.0f}]")
+
+def run_arena(specs, games, workers, output, seed):
+    for spec in specs:
+        parse_bot_spec(spec)
+    jobs = schedule(specs, games, seed)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    print(f"Playing {len(jobs)} games with {workers} workers, results go to {output}")
+    results = []
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor, gzip.open(output, "at") as f:
+        futures = [executor.submit(play_game, *job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            f.write(json.dumps(result) + "\n")
+            if len(results) % max(1, len(jobs) // 20) == 0:
+                elapsed = time.time() - start
+                print(f"  {len(results)}/{len(jobs)} games, {len(results) / elapsed:.2f} games/s")
+
+    elapsed = time.time() - start
+    print_tables(results, specs)
+    print(f"\n{len(results)} games in {elapsed:.1f}s, {len(results) / elapsed:.2f} games/s")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless bot-vs-bot arena")
+    parser.add_argument("bots", nargs="+", help="bot specs, e.g. random, minimax:max_time=0.1, mcts:max_time=0.2")
+    parser.add_argument("--games", type=int, default=100, help="games per pair of bots")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--output", default=ARENA_LOG_PATH, help="gzip JSONL file the games are appended to")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if len(args.bots) < 2:
+        parser.error("need at least two bots")
+    run_arena(args.bots, args.games, args.workers, args.output, args.seed)
@@ -0,0 +1,50 @@
+# Vectorized version of UltimateTTTBot.evaluate for a stack of positions
+#
+# Every step adds the same terms in the same order as the scalar heuristic, so the
+# float scores match it exactly. Local boards are scored through the board_tables lookups.
+import numpy as np
+from board_tables import POWERS, CENTER_INDEX, STATUS, LINE_SCORE, grid_status, evaluate_lines_batch
+
+WIN_SCORE = 10000000
+
+# squares: (N, 3, 3, 3, 3), free_play: (N,) True where the side to move has no allowed square
+def evaluate_batch(squares, free_play, player):
+    opponent = 1 if player == 2 else 2
+    squares = np.asarray(squares)
+    n = squares.shape[0]
+    local_index = squares.reshape(n, 9, 9).astype(np.int64) @ POWERS
+
+    local_status = STATUS[local_index]
+    winner = grid_status(local_status)
+    local_scores = LINE_SCORE[player][local_index] * 5
+
+    score = np.zeros(n)
+
+    # Global Board Evaluation
+    score += evaluate_lines_batch(local_status, player, opponent) * 10000
+
+    # Punish for giving opponent free play
+    score += np.where(np.asarray(free_play, dtype=bool), -500.0, 0.0)
+
+    # Local Board Evaluation
+    for board in range(9):
+        status = local_status[:, board]
+        score += np.where(status == player, 2000.0, np.where(status == opponent, -2000.0, local_scores[:, board]))
+        if board == CENTER_INDEX:
+            score += np.where(status == player, 2000.0, 0.0)
+
+    score[winner == player] = WIN_SCORE
+    score[winner == opponent] = -WIN_SCORE
+    return score
+
+# (squares, free_play, players) for log entries written by main.log_bot_move
+def stack_log_entries(entries):
+    squares = np.zeros((len(entries), 3, 3, 3, 3), dtype=np.int8)
+    free_play = np.zeros(len(entries), dtype=bool)
+    players = np.zeros(len(entries), dtype=np.int8)
+    for i, entry in enumerate(entries):
+        for cell in entry["global state"]:
+            squares[i, cell["global_row"], cell["global_col"], cell["local_row"], cell["local_col"]] = cell["player"]
+        free_play[i] = entry["allowed squares"] is None
+        players[i] = entry["player"]
+    return squares, free_play, players
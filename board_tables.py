@@ -0,0 +1,118 @@
+# Lookup tables for a single 3x3 grid (local board)
+#
+# A grid is indexed by its base-3 number sum(cell * 3 ** i) with i = row * 3 + col and
+# cell 0 = empty, 1 = X, 2 = O, so there are 3 ** 9 = 19683 states. The tables are built
+# once at import, or loaded from TABLES_PATH after it has been written with save_tables().
+import os
+import numpy as np
+from uttt_engine import LINES, mask_status
+from config import TABLES_PATH
+
+STATES = 3 ** 9
+POWERS = 3 ** np.arange(9)
+
+# cell indices (0-8) of every line of a 3x3 grid, same order as uttt_engine.LINES
+LINE_INDEX = np.array([[cell for cell in range(9) if line >> cell & 1] for line in LINES])
+CENTER_INDEX = 4
+CORNER_INDEX = (0, 2, 6, 8)
+
+# base-3 value of a 9-bit mask, the index of a bitboard grid is TERNARY[x_mask] + 2 * TERNARY[o_mask]
+TERNARY = tuple(sum(3 ** i for i in range(9) if mask >> i & 1) for mask in range(1 << 9))
+
+# status of (..., 9) grids: 1/2 won, -1 draw, 0 ongoing. -1 cells (drawn boards) count as a draw line
+def grid_status(grids):
+    lines = grids[..., LINE_INDEX]
+    status = np.zeros(grids.shape[:-1], dtype=np.int8)
+    full = np.all(grids != 0, axis=-1)
+    draw_line = np.any(np.all(lines == -1, axis=-1), axis=-1)
+    status[full | draw_line] = -1
+    status[np.any(np.all(lines == 2, axis=-1), axis=-1)] = 2
+    status[np.any(np.all(lines == 1, axis=-1), axis=-1)] = 1
+    return status
+
+# UltimateTTTBot.evaluate_lines for (M, 9) grids, same terms in the same order so the floats match
+def evaluate_lines_batch(grids, player, opponent):
+    score = np.zeros(grids.shape[0])
+
+    center = grids[:, CENTER_INDEX]
+    score += np.where(center == player, 0.35, np.where(center == opponent, -0.35, 0.0))
+
+    for corner_index in CORNER_INDEX:
+        corner = grids[:, corner_index]
+        score += np.where(corner == player, 0.30, np.where(corner == opponent, -0.30, 0.0))
+
+    own = grids == player
+    opponent_cells = grids == opponent
+    empty = grids == 0
+    for line in LINE_INDEX:
+        own_count = own[:, line].sum(axis=1)
+        opponent_count = opponent_cells[:, line].sum(axis=1)
+        empty_count = empty[:, line].sum(axis=1)
+        score += np.select(
+            [(own_count == 2) & (empty_count > 0),
+             (opponent_count == 2) & (empty_count > 0),
+             (own_count == 1) & (empty_count == 2),
+             (opponent_count == 1) & (empty_count == 2)],
+            [20.0, -20.0, 1.0, -1.0], 0.0)
+    return score
+
+def build_tables():
+    grids = ((np.arange(STATES)[:, None] // POWERS) % 3).astype(np.int8)
+    lines = grids[:, LINE_INDEX]
+    tables = {"status": grid_status(grids)}
+    for player, opponent in ((1, 2), (2, 1)):
+        tables[f"line_score_{player}"] = evaluate_lines_batch(grids, player, opponent)
+        open_twos = ((lines == player).sum(axis=-1) == 2) & ((lines == 0).sum(axis=-1) == 1)
+        tables[f"open_twos_{player}"] = open_twos.sum(axis=-1).astype(np.int8)
+    return tables
+
+TABLE_NAMES = ("status", "line_score_1", "line_score_2", "open_twos_1", "open_twos_2")
+
+def load_tables(path=TABLES_PATH):
+    if path and os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                tables = {name: data[name] for name in TABLE_NAMES}
+            if all(len(table) == STATES for table in tables.values()):
+                return tables
+            print(f"Tables in {path} have the wrong size, rebuilding.")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Could not load tables from {path}: {e}")
+    return build_tables()
+
+def save_tables(path=TABLES_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, **_tables)
+    print(f"Saved local board tables to {path}")
+
+_tables = load_tables()
+STATUS = _tables["status"]
+LINE_SCORE = (None, _tables["line_score_1"], _tables["line_score_2"])
+OPEN_TWOS = (None, _tables["open_twos_1"], _tables["open_twos_2"])
+
+# plain lists, indexing them is much faster than numpy for single lookups
+STATUS_LIST = STATUS.tolist()
+LINE_SCORE_LIST = (None, LINE_SCORE[1].tolist(), LINE_SCORE[2].tolist())
+OPEN_TWOS_LIST = (None, OPEN_TWOS[1].tolist(), OPEN_TWOS[2].tolist())
+
+def mask_index(x_mask, o_mask):
+    return TERNARY[x_mask] + 2 * TERNARY[o_mask]
+
+def grid_index(grid):
+    return int(np.asarray(grid).reshape(9).astype(np.int64) @ POWERS)
+
+# method to check if local/global board (3x3) has been won by any player: 1/2 won, -1 draw, 0 ongoing
+def check_win(grid):
+    flat = np.asarray(grid).reshape(9)
+    if np.any(flat == -1):
+        # global boards can hold drawn local boards, which the base-3 tables do not cover
+        x_mask = o_mask = draw_mask = 0
+        for cell in range(9):
+            if flat[cell] == 1: x_mask |= 1 << cell
+            elif flat[cell] == 2: o_mask |= 1 << cell
+            elif flat[cell] == -1: draw_mask |= 1 << cell
+        return mask_status(x_mask, o_mask, draw_mask)
+    return STATUS_LIST[grid_index(flat)]
+
+if __name__ == "__main__":
+    save_tables()
@@ -0,0 +1,276 @@
+# Compact columnar dataset format: the board as int8[81] and moves as uint8 cell indices
+#
+# usage: python compact_dataset.py [--input uttt_qwen_dataset/test.parquet] [--output uttt_qwen_dataset/test.compact.parquet]
+#    or: python compact_dataset.py --input logs/bot_moves_synthetic.jsonl --output uttt_qwen_dataset/synthetic.compact.arrow
+# A cell index is board * 9 + cell with board = global_row * 3 + global_col and cell = local_row * 3 + local_col
+# (uttt_engine.MOVES, symmetry.py). allowed is the board index 0-8 or -1 when the player can choose.
+# The ASCII board and the unplayable boards are not stored, ascii_board() and board_status() derive them.
+# load_compact() hands out NumPy views of the Arrow buffers, an .arrow file is memory-mapped so nothing
+# is copied at all, a .parquet file is decoded once into Arrow memory.
+import argparse, json, os, time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from board_tables import STATUS, POWERS
+from config import *
+
+COMPACT_SCHEMA = pa.schema([
+    ("image", pa.struct([("bytes", pa.binary()), ("path", pa.string())])),
+    ("player", pa.int8()),
+    ("board", pa.list_(pa.int8(), 81)),
+    ("allowed", pa.int8()),
+    ("best_move", pa.uint8()),
+    ("legal_moves", pa.list_(pa.uint8())),
+    ("chain_of_thought", pa.string()),
+    # -1 for reflections, which have a null rotation_angle in the log
+    ("rotation_angle", pa.int16()),
+    # symmetry.py numbering, older data only holds rotations (rotation_angle // 90)
+    ("symmetry", pa.int8()),
+])
+
+MOVE_KEYS = ("global_row", "global_col", "local_row", "local_col")
+SYMBOLS = {0: '.', 1: 'X', 2: 'O'}
+
+def compact_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}.compact{ext}"
+
+def move_index(move):
+    return (move["global_row"] * 3 + move["global_col"]) * 9 + move["local_row"] * 3 + move["local_col"]
+
+def index_move(index):
+    global_row, global_col = divmod(int(index) // 9, 3)
+    local_row, local_col = divmod(int(index) % 9, 3)
+    return {"global_row": global_row, "global_col": global_col, "local_row": local_row, "local_col": local_col}
+
+# (..., 81) boards -> (..., 9) status of every local board: 1/2 won, -1 draw, 0 open
+def board_status(boards):
+    boards = np.asarray(boards)
+    grids = boards.reshape(boards.shape[:-1] + (9, 9)).astype(np.int64)
+    return STATUS[grids @ POWERS]
+
+def unplayable_boards(status):
+    return [{"global_row": int(board) // 3, "global_col": int(board) % 3} for board in np.flatnonzero(status)]
+
+# same text as render_ascii_board in dataset-make.ipynb
+def ascii_board(board):
+    board = np.asarray(board).reshape(9, 9)
+    sections = []
+    for index in range(9):
+        section = [f"=== Global Board [Row {index // 3}, Col {index % 3}] ===", "    0 1 2", "   -------"]
+        for local_row in range(3):
+            section.append(f"{local_row} | " + " ".join(SYMBOLS.get(int(player), '?') for player in board[index, local_row * 3:local_row * 3 + 3]))
+        sections.append("\n".join(section))
+    return "\n\n".join(sections)
+
+# (row index of every list element, flattened list) of a list<struct> column
+def _flatten_lists(column):
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    lengths = column.value_lengths().fill_null(0).to_numpy(zero_copy_only=False)
+    return np.repeat(np.arange(len(column)), lengths), column.flatten(), lengths
+
+def _fields(struct_array, names):
+    return [struct_array.field(name).to_numpy(zero_copy_only=False).astype(np.int64) for name in names]
+
+# table in the current dataset schema (dataset-make.ipynb) -> table in COMPACT_SCHEMA, column by column
+def compact_table(table):
+    n = table.num_rows
+
+    rows, cells, _ = _flatten_lists(table["global_state"])
+    global_row, global_col, local_row, local_col, player = _fields(cells, MOVE_KEYS + ("player",))
+    boards = np.zeros((n, 81), dtype=np.int8)
+    boards[rows, (global_row * 3 + global_col) * 9 + local_row * 3 + local_col] = player
+
+    _, moves, lengths = _flatten_lists(table["legal_moves"])
+    global_row, global_col, local_row, local_col = _fields(moves, MOVE_KEYS)
+    legal = ((global_row * 3 + global_col) * 9 + local_row * 3 + local_col).astype(np.uint8)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+
+    best = table["best_move"].combine_chunks()
+    global_row, global_col, local_row, local_col = _fields(best, MOVE_KEYS)
+    best_moves = ((global_row * 3 + global_col) * 9 + local_row * 3 + local_col).astype(np.uint8)
+
+    # [row, col] or null/empty for a free choice
+    allowed = np.full(n, -1, dtype=np.int8)
+    rows, values, lengths = _flatten_lists(table["allowed_squares"])
+    values = values.to_numpy(zero_copy_only=False)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    has_square = lengths >= 2
+    allowed[has_square] = values[starts[has_square]] * 3 + values[starts[has_square] + 1]
+
+    if "rotation_angle" in table.column_names:
+        rotation_angle = table["rotation_angle"].fill_null(-1).to_numpy().astype(np.int16)
+    else:
+        rotation_angle = np.zeros(n, dtype=np.int16)
+    if "symmetry" in table.column_names:
+        symmetry = table["symmetry"].to_numpy(zero_copy_only=False).astype(np.int8)
+    else:
+        symmetry = (rotation_angle // 90).astype(np.int8)
+
+    return pa.table({
+        "image": table["image"].cast(COMPACT_SCHEMA.field("image").type),
+        "player": table["player"].cast(pa.int8()),
+        "board": pa.FixedSizeListArray.from_arrays(pa.array(boards.reshape(-1)), 81),
+        "allowed": allowed,
+        "best_move": best_moves,
+        "legal_moves": pa.ListArray.from_arrays(pa.array(offsets), pa.array(legal)),
+        "chain_of_thought": table["chain_of_thought"].cast(pa.string()),
+        "rotation_angle": rotation_angle,
+        "symmetry": symmetry,
+    }, schema=COMPACT_SCHEMA)
+
+# the synthetic move log -> table in COMPACT_SCHEMA, the image file bytes are embedded as they are
+def compact_log(path=SYNTHETIC_LOG_FILE_PATH, embed_images=True):
+    images, players, boards, allowed, best_moves, legal, cots, angles, symmetries = [], [], [], [], [], [], [], [], []
+    offsets = [0]
+    with open(path, "r") as f:
+        for line_num, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping invalid JSON at line {line_num}")
+                continue
+
+            image_path = entry.get("image path")
+            image_bytes = None
+            if embed_images:
+                if not os.path.exists(image_path):
+                    print(f"Warning: Image not found at {image_path}. Skipping.")
+                    continue
+                with open(image_path, "rb") as image_file:
+                    image_bytes = image_file.read()
+
+            board = np.zeros(81, dtype=np.int8)
+            for cell in entry["global state"]:
+                board[move_index(cell)] = cell["player"]
+            square = entry.get("allowed squares")
+            moves = [move_index(move) for move in entry.get("legal moves", [])]
+
+            images.append({"bytes": image_bytes, "path": image_path})
+            players.append(entry["player"])
+            boards.append(board)
+            allowed.append(square[0] * 3 + square[1] if square else -1)
+            best_moves.append(move_index(entry["best move"]))
+            legal.extend(moves)
+            offsets.append(offsets[-1] + len(moves))
+            cots.append(entry.get("chain of thought", ""))
+            angle = entry.get("rotation_angle", 0)
+            angles.append(-1 if angle is None else angle)
+            symmetries.append(entry.get("symmetry", (entry.get("rotation_angle") or 0) // 90))
+
+    boards = np.stack(boards) if boards else np.zeros((0, 81), dtype=np.int8)
+    return pa.table({
+        "image": pa.array(images, type=COMPACT_SCHEMA.field("image").type),
+        "player": np.array(players, dtype=np.int8),
+        "board": pa.FixedSizeListArray.from_arrays(pa.array(boards.reshape(-1)), 81),
+        "allowed": np.array(allowed, dtype=np.int8),
+        "best_move": np.array(best_moves, dtype=np.uint8),
+        "legal_moves": pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), pa.array(legal, type=pa.uint8())),
+        "chain_of_thought": cots,
+        "rotation_angle": np.array(angles, dtype=np.int16),
+        "symmetry": np.array(symmetries, dtype=np.int8),
+    }, schema=COMPACT_SCHEMA)
+
+# .arrow writes an uncompressed Arrow IPC file for memory-mapping, anything else zstd Parquet
+def save_compact(table, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".arrow"):
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, path, compression="zstd")
+
+def convert(input_path, output_path):
+    if input_path.endswith(".jsonl"):
+        table = compact_log(input_path)
+    else:
+        table = compact_table(pq.read_table(input_path))
+    save_compact(table, output_path)
+    return table
+
+# the rows of a compact table as NumPy arrays that share the Arrow buffers
+class CompactDataset:
+    def __init__(self, table):
+        # every column has to be one contiguous chunk for the views, files with several row groups are joined once
+        if any(column.num_chunks > 1 for column in table.columns):
+            table = table.combine_chunks()
+        self.table = table
+        columns = {name: table[name].chunk(0) if table[name].num_chunks else pa.array([], type=table.schema.field(name).type)
+                   for name in table.column_names}
+        # columns left out by load_compact(columns=...) are None
+        view = lambda name: columns[name].to_numpy() if name in columns else None
+
+        self.players = view("player")
+        self.boards = columns["board"].flatten().to_numpy().reshape(-1, 81) if "board" in columns else None
+        self.allowed = view("allowed")
+        self.best_moves = view("best_move")
+        # the legal moves of row i are legal_values[legal_offsets[i]:legal_offsets[i + 1]]
+        self.legal_offsets = columns["legal_moves"].offsets.to_numpy() if "legal_moves" in columns else None
+        self.legal_values = columns["legal_moves"].values.to_numpy() if "legal_moves" in columns else None
+        self.rotation_angles = view("rotation_angle")
+        self.symmetries = view("symmetry")
+        self.images = columns.get("image")
+        self.chains_of_thought = columns.get("chain_of_thought")
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def legal_moves(self, i):
+        return self.legal_values[self.legal_offsets[i]:self.legal_offsets[i + 1]]
+
+    def image_bytes(self, i):
+        return self.images.field("bytes")[i].as_py()
+
+    def __getitem__(self, i):
+        return {
+            "player": self.players[i],
+            "board": self.boards[i],
+            "allowed": self.allowed[i],
+            "best_move": self.best_moves[i],
+            "legal_moves": self.legal_moves(i),
+            "rotation_angle": self.rotation_angles[i],
+            "symmetry": self.symmetries[i],
+        }
+
+    # row i in the current dataset schema, for code that still reads the dicts
+    def expand(self, i):
+        board = self.boards[i]
+        allowed = int(self.allowed[i])
+        image = self.images[i].as_py()
+        return {
+            "image": image,
+            "player": int(self.players[i]),
+            "global_state": [dict(index_move(index), player=int(player)) for index, player in enumerate(board)],
+            "unplayable_boards": unplayable_boards(board_status(board)),
+            "ascii_board": ascii_board(board),
+            "allowed_squares": None if allowed < 0 else [allowed // 3, allowed % 3],
+            "best_move": index_move(self.best_moves[i]),
+            "legal_moves": [index_move(index) for index in self.legal_moves(i)],
+            "chain_of_thought": self.chains_of_thought[i].as_py(),
+            "rotation_angle": None if self.rotation_angles[i] < 0 else int(self.rotation_angles[i]),
+        }
+
+def load_compact(path, columns=None):
+    if path.endswith(".arrow"):
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    else:
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    return CompactDataset(table)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a dataset parquet or the synthetic log to the compact format")
+    parser.add_argument("--input", default=DATASET_TEST_PATH)
+    parser.add_argument("--output", default=None, help="defaults to the input with .compact before the extension")
+    args = parser.parse_args()
+    output_path = args.output or compact_path(args.input if not args.input.endswith(".jsonl") else os.path.splitext(args.input)[0] + ".parquet")
+
+    start_time = time.time()
+    table = convert(args.input, output_path)
+    print(f"Wrote {table.num_rows} rows to {output_path} in {time.time() - start_time:.2f}s "
+          f"({os.path.getsize(args.input) / 1e6:.2f} MB -> {os.path.getsize(output_path) / 1e6:.2f} MB)")
@@ -13,6 +13,7 @@ GLOBAL_LINE_WIDTH = 20
 LOCAL_LINE_WIDTH = 7
 CROSS_WIDTH = 20
 PADDING = 50
+FPS = 60
 
 # colors
 BG_COLOR = (230, 217, 200)
@@ -28,13 +29,68 @@ ALLOWED_BOARD_COLOR = (182, 219, 192, 85)
 IMAGES_FOLDER = "screens"
 LOG_FILE_PATH = "logs/bot_moves.jsonl"
 SYNTHETIC_LOG_FILE_PATH = "logs/bot_moves_synthetic.jsonl"
+ARENA_LOG_PATH = "logs/arena_results.jsonl.gz"
 DATASET_FOLDER = "uttt_qwen_dataset"
+TABLES_PATH = "tables/local_tables.npz"
+
+# vlm api client, deadline and backoff in seconds
+VLM_API_URL = "https://vernetta-superspiritual-sorrily.ngrok-free.dev/predict_move"
+VLM_TIMEOUT = 20
+VLM_RETRIES = 2
+VLM_BACKOFF = 0.5
+VLM_FALLBACK_TIME = 0.5
+# frames are scaled to this side length before the JPEG encode, the training screenshots are 720x720
+VLM_IMAGE_SIZE = 720
+VLM_JPEG_QUALITY = 75
+VLM_MULTIPART = False
+
+# inference server, backend "vlm" (the fine-tuned model) or "engine" (UltimateTTTBot stand-in for load tests)
+INFERENCE_BACKEND = "vlm"
+# load and warm up at startup, False loads on the first request
+INFERENCE_EAGER_LOAD = True
+INFERENCE_HOST = "0.0.0.0"
+INFERENCE_PORT = 8000
+ENGINE_BACKEND_DEPTH = 2
+# micro-batching
+BATCH_MAX_SIZE = 8
+BATCH_MAX_WAIT_MS = 10
+# response cache keyed on the board state and the adapter version, size 0 disables it, TTL in seconds (None never expires)
+RESPONSE_CACHE_SIZE = 10000
+RESPONSE_CACHE_TTL = 24 * 3600
+# JSONL file the cache is persisted to, None keeps it in memory only
+RESPONSE_CACHE_PATH = "logs/response_cache.jsonl"
+# positions that are rotations or reflections of each other share one entry
+RESPONSE_CACHE_SYMMETRY = False
 
 # model
+# reuse the key/value cache of the constant system prompt across requests (vlm_generation.PrefixCache)
+PREFIX_CACHE = True
+# the VLM can only write the move JSON and stops after its closing brace (server answers),
+# CONSTRAIN_TO_LEGAL_MOVES limits the server to the legal moves of the submitted position
+CONSTRAINED_DECODING = True
+CONSTRAIN_TO_LEGAL_MOVES = True
 MODEL_NAME = "unsloth/Qwen3-VL-8B-Instruct-unsloth-bnb-4bit"
 
 # model relevant paths
 DATASET_TRAIN_PATH = "uttt_qwen_dataset/train.parquet"
 DATASET_EVAL_PATH = "uttt_qwen_dataset/evaluate.parquet"
 DATASET_TEST_PATH = "uttt_qwen_dataset/test.parquet"
-OUTPUT_DIR_V2 = "adapter_uttt_qwen_8b_v2"
\ No newline at end of file
+# dataset_builder: split fractions by source position, log lines per build partition, rows per parquet row group
+# (about 1.5 MB of PNG at 720x720, small enough for random access)
+DATASET_SPLITS = {"train": 0.8, "test": 0.1, "evaluate": 0.1}
+DATASET_PARTITION_SIZE = 1024
+DATASET_ROW_GROUP_SIZE = 128
+# decoded frames of the splits (image_store.py), same size as the frames VLMBot sends, shard size in frames
+IMAGE_STORE_PATH = "uttt_qwen_dataset/images"
+IMAGE_STORE_SIZE = VLM_IMAGE_SIZE
+IMAGE_STORE_SHARD_SIZE = 256
+# eval_runner: per-sample results for resuming, tasks per generate call, image decoding workers
+EVAL_RESULTS_PATH = "logs/eval_results.jsonl"
+EVAL_BATCH_SIZE = 16
+EVAL_NUM_WORKERS = 2
+EVAL_MAX_NEW_TOKENS = 512
+# the same JSON constraint on the MOVE answers of the eval, off measures the model as it is
+EVAL_CONSTRAINED_DECODING = False
+OUTPUT_DIR_V2 = "adapter_uttt_qwen_8b_v2"
+# adapter the inference server loads
+ADAPTER_PATH = OUTPUT_DIR_V2
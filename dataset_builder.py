@@ -0,0 +1,213 @@
+# Parallel, incremental builder of the train/test/evaluate parquet splits from the synthetic log
+#
+# usage: python dataset_builder.py [--log logs/bot_moves_synthetic.jsonl] [--output uttt_qwen_dataset] [--workers 8] [--force]
+#    or: build_dataset() from dataset-make.ipynb
+# The log is cut into partitions of DATASET_PARTITION_SIZE lines. A process pool turns every partition into one
+# parquet shard per split under <output>/shards, the shards are then concatenated in partition order into the
+# split files (<output>/train.parquet, ...). manifest.json records the row counts and sha256 of every shard and
+# split and the sha1 of the log lines of every partition. The log only grows, so a rebuild keeps the partitions
+# whose lines and shards are unchanged and only decodes and encodes the images of the new ones.
+# A row goes to a split by the hash of its source image path without the _rotated_/_flipped_ suffix, so all
+# symmetries of a position land in the same split and a row never moves when the log grows.
+import argparse, hashlib, io, json, os, re, time
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datasets import Features, Image, Value, Sequence
+from PIL import Image as PILImage
+
+from compact_dataset import ascii_board, board_status, compact_path, convert, move_index, unplayable_boards
+from config import *
+
+# bumping it rebuilds every partition
+BUILDER_VERSION = 1
+
+MOVE_FEATURES = {
+    "global_row": Value("int32"),
+    "global_col": Value("int32"),
+    "local_row": Value("int32"),
+    "local_col": Value("int32"),
+}
+
+FEATURES = Features({
+    "image": Image(),
+    "player": Value("int32"),
+    "ascii_board": Value("string"),
+    "chain_of_thought": Value("string"),
+    "rotation_angle": Value("int32"),
+    "symmetry": Value("int32"),
+    "best_move": MOVE_FEATURES,
+    "allowed_squares": Sequence(Value("int32")),
+    "unplayable_boards": [{"global_row": Value("int32"), "global_col": Value("int32")}],
+    "legal_moves": [MOVE_FEATURES],
+    "global_state": [dict(MOVE_FEATURES, player=Value("int32"))],
+})
+SCHEMA = FEATURES.arrow_schema
+
+def split_of(image_path, splits=DATASET_SPLITS):
+    base = re.sub(r"_(rotated|flipped)_\d+$", "", os.path.splitext(image_path)[0])
+    u = int.from_bytes(hashlib.sha1(base.encode()).digest()[:8], "big") / 2 ** 64
+    for split, fraction in splits.items():
+        if u < fraction:
+            return split
+        u -= fraction
+    return split
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def lines_sha1(lines):
+    return hashlib.sha1("".join(lines).encode()).hexdigest()
+
+def shard_path(output_dir, split, partition):
+    return os.path.join(output_dir, "shards", f"{split}-{partition:05d}.parquet")
+
+# PNG bytes of the RGB image, files that already are RGB PNGs are embedded as they are
+def encode_image(path):
+    img = PILImage.open(path)
+    if img.format == "PNG" and img.mode == "RGB":
+        with open(path, "rb") as f:
+            return f.read()
+    buffer = io.BytesIO()
+    img.convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def build_row(entry):
+    board = [0] * 81
+    for cell in entry["global state"]:
+        board[move_index(cell)] = cell["player"]
+    return {
+        "image": {"bytes": encode_image(entry["image path"]), "path": None},
+        "player": entry.get("player"),
+        "ascii_board": ascii_board(board),
+        "chain_of_thought": entry.get("chain of thought", ""),
+        "rotation_angle": entry.get("rotation_angle", 0),
+        "symmetry": entry.get("symmetry", (entry.get("rotation_angle") or 0) // 90),
+        "best_move": entry.get("best move"),
+        "allowed_squares": entry.get("allowed squares"),
+        "unplayable_boards": unplayable_boards(board_status(board)),
+        "legal_moves": entry.get("legal moves", []),
+        "global_state": entry.get("global state", []),
+    }
+
+# runs in the worker processes: the lines of one partition -> one shard per split, {split: (file, rows, sha256)}
+def build_partition(output_dir, partition, first_line, lines, splits, row_group_size):
+    rows = {split: [] for split in splits}
+    for line_num, line in enumerate(lines, first_line):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Skipping invalid JSON at line {line_num}")
+            continue
+        image_path = entry.get("image path")
+        if not image_path or not os.path.exists(image_path):
+            print(f"Warning: Image not found at {image_path}. Skipping.")
+            continue
+        try:
+            rows[split_of(image_path, splits)].append(build_row(entry))
+        except Exception as e:
+            print(f"Error building the row of line {line_num} ({image_path}): {e}. Skipping.")
+
+    shards = {}
+    for split, split_rows in rows.items():
+        path = shard_path(output_dir, split, partition)
+        table = pa.Table.from_pylist(split_rows, schema=SCHEMA)
+        pq.write_table(table, path + ".tmp", row_group_size=row_group_size, compression="zstd")
+        os.replace(path + ".tmp", path)
+        shards[split] = {"file": os.path.relpath(path, output_dir), "rows": len(split_rows), "sha256": file_sha256(path)}
+    return shards
+
+def load_manifest(path):
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not read the manifest {path}: {e}")
+    return None
+
+def shards_intact(output_dir, shards):
+    return all(os.path.exists(os.path.join(output_dir, shard["file"]))
+               and file_sha256(os.path.join(output_dir, shard["file"])) == shard["sha256"] for shard in shards.values())
+
+# concatenates the shards of a split in partition order, the row groups keep their size
+def write_split(output_dir, split, partitions, row_group_size):
+    path = os.path.join(output_dir, f"{split}.parquet")
+    with pq.ParquetWriter(path + ".tmp", SCHEMA, compression="zstd") as writer:
+        for partition in partitions:
+            writer.write_table(pq.read_table(os.path.join(output_dir, partition["shards"][split]["file"])), row_group_size=row_group_size)
+    os.replace(path + ".tmp", path)
+    return path
+
+def build_dataset(log_path=SYNTHETIC_LOG_FILE_PATH, output_dir=DATASET_FOLDER, workers=os.cpu_count(),
+                  partition_size=DATASET_PARTITION_SIZE, row_group_size=DATASET_ROW_GROUP_SIZE, splits=DATASET_SPLITS, force=False):
+    if not os.path.exists(log_path):
+        print(f"Error: Input file '{log_path}' not found.")
+        return None
+    start_time = time.time()
+    os.makedirs(os.path.join(output_dir, "shards"), exist_ok=True)
+    with open(log_path, "r") as f:
+        lines = [line if line.endswith("\n") else line + "\n" for line in f if line.strip()]
+
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    options = {"version": BUILDER_VERSION, "partition_size": partition_size, "row_group_size": row_group_size, "splits": splits}
+    old = None if force else load_manifest(manifest_path)
+    if old is not None and old.get("options") != options:
+        print("Build options changed, rebuilding every partition")
+        old = None
+    old_partitions = {partition["index"]: partition for partition in old["partitions"]} if old else {}
+
+    partitions, reused = [], 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for index, first_line in enumerate(range(0, len(lines), partition_size)):
+            partition_lines = lines[first_line:first_line + partition_size]
+            partition = {"index": index, "first_line": first_line, "lines": len(partition_lines), "sha1": lines_sha1(partition_lines)}
+            previous = old_partitions.get(index)
+            if previous is not None and previous["sha1"] == partition["sha1"] and shards_intact(output_dir, previous["shards"]):
+                partition["shards"] = previous["shards"]
+                reused += 1
+            else:
+                futures[index] = executor.submit(build_partition, output_dir, index, first_line, partition_lines, splits, row_group_size)
+            partitions.append(partition)
+        print(f"{len(partitions)} partitions of up to {partition_size} lines, {reused} unchanged, {len(futures)} to build with {workers} workers")
+        for index, future in futures.items():
+            partitions[index]["shards"] = future.result()
+
+    # shards of partitions that no longer exist (the log was cut or partition_size changed)
+    current = {shard["file"] for partition in partitions for shard in partition["shards"].values()}
+    for name in os.listdir(os.path.join(output_dir, "shards")):
+        if os.path.join("shards", name) not in current:
+            os.remove(os.path.join(output_dir, "shards", name))
+
+    manifest = {"options": options, "log": log_path, "log_lines": len(lines), "partitions": partitions, "splits": {}}
+    for split in splits:
+        path = write_split(output_dir, split, partitions, row_group_size)
+        rows = sum(partition["shards"][split]["rows"] for partition in partitions)
+        # int8 board / uint8 move copy of the split, read with compact_dataset.load_compact
+        convert(path, compact_path(path))
+        manifest["splits"][split] = {"file": os.path.relpath(path, output_dir), "rows": rows, "sha256": file_sha256(path),
+                                     "compact_sha256": file_sha256(compact_path(path))}
+        print(f"  {split}: {rows} rows -> {path}")
+
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    print(f"Built {output_dir} from {len(lines)} log lines in {time.time() - start_time:.1f}s")
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the dataset splits from the synthetic log")
+    parser.add_argument("--log", default=SYNTHETIC_LOG_FILE_PATH)
+    parser.add_argument("--output", default=DATASET_FOLDER)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--partition-size", type=int, default=DATASET_PARTITION_SIZE, help="log lines per partition")
+    parser.add_argument("--row-group-size", type=int, default=DATASET_ROW_GROUP_SIZE, help="rows per parquet row group")
+    parser.add_argument("--force", action="store_true", help="rebuild every partition")
+    args = parser.parse_args()
+    build_dataset(args.log, args.output, args.workers, args.partition_size, args.row_group_size, force=args.force)
@@ -0,0 +1,277 @@
+# Batched, resumable evaluation of the fine-tuned VLM on a test parquet
+#
+# usage: python eval_runner.py [--data uttt_qwen_dataset/test.parquet] [--adapter adapter_uttt_qwen_8b_v2] [--limit 100]
+#                              [--images uttt_qwen_dataset/images] [--constrained] [--compare-ttft]
+#    or: eval_runner.run_eval(model, processor, DATASET_TEST_PATH) from evaluate.ipynb
+# Every sample asks the four tasks of evaluate.ipynb. The tasks of a group of samples are sorted by prompt
+# length and generated in padded batches, images are decoded ahead of time by DataLoader workers and
+# every finished sample is appended to a JSONL file, a run that is started again skips those samples
+# (use another --output for another adapter). Only results written with the same --constrained setting are resumed.
+import argparse, json, os, random, re, time
+
+import torch
+from torch.utils.data import DataLoader, Dataset
+from transformers import LogitsProcessorList, RepetitionPenaltyLogitsProcessor
+
+from vlm_generation import PrefixCache, MoveJsonProcessor
+from image_store import ImageStore, image_id
+from config import *
+
+SYS_PROMPT = ("You are an Ultimate Tic-Tac-Toe Visual Engine. **STRICT PROTOCOL:**\n"
+              "1. FORMAT: All responses must be valid JSON snippets wrapped in JSON_START/JSON_END anchors.\n"
+              "2. COORDINATES: Use 0-indexed integers (0, 1, 2) for all Row/Col values.\n"
+              "3. VISUAL ANCHOR: The allowed square (active subgrid) is highlighted in GREEN. You must play there.")
+
+TASKS = ("ALLOWED_SQUARE", "MOVE", "STATE", "LEGALITY")
+
+def extract_json_content(text):
+    try:
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if match:
+            return json.loads(match.group(0))
+        return None
+    except:
+        return None
+
+# the four (task, prompt) pairs of a sample and what they are scored against.
+# the probed subgrid is drawn from a generator seeded with the sample index so a resumed run asks the same
+def build_tasks(index, sample, seed=0):
+    rng = random.Random(seed * 1000003 + index)
+    p_char = "X" if sample["player"] == 1 else "O"
+    gr, gc = rng.randint(0, 2), rng.randint(0, 2)
+
+    gt_matrix = []
+    for lr in range(3):
+        row = []
+        for lc in range(3):
+            occ = next((p['player'] for p in sample["global_state"] if p['global_row'] == gr and p['global_col'] == gc and p['local_row'] == lr and p['local_col'] == lc), 0)
+            row.append("X" if occ == 1 else "O" if occ == 2 else ".")
+        gt_matrix.append(row)
+
+    truth = {
+        "allowed": sample.get("allowed_squares"),
+        "legal_moves": sample["legal_moves"],
+        "best_move": sample["best_move"],
+        "matrix": gt_matrix,
+        "is_legal": any(m['global_row'] == gr and m['global_col'] == gc and m['local_row'] == 1 and m['local_col'] == 1 for m in sample["legal_moves"]),
+    }
+    tasks = [
+        ("ALLOWED_SQUARE", "Identify the allowed square (active global subgrid) based on the green highlight. If none is highlighted, report null."),
+        ("MOVE", f"Visually analyze the board. It is Player {p_char}'s turn. Identify the allowed square (green highlight) and then select the best move."),
+        ("STATE", f"Examine Global Subgrid ({gr}, {gc}). Represent the 3x3 local grid state as a matrix of 'X', 'O', or '.' (Empty)."),
+        ("LEGALITY", f"Is it legal for Player {p_char} to play at Global({gr},{gc}), Local(1,1)? Step 1: Inspect the square state. Step 2: Check allowed square constraint. Step 3: Verdict."),
+    ]
+    return tasks, truth
+
+def check_allowed(pred, gt_allowed):
+    if gt_allowed is None or len(gt_allowed) < 2:
+        return pred is None or pred == "null"
+    if not pred: return False
+    if isinstance(pred, dict): return pred.get("global_row") == gt_allowed[0] and pred.get("global_col") == gt_allowed[1]
+    return False
+
+# metric counters one task adds, the same rules as the per-sample loop in evaluate.ipynb
+def score_task(task_name, parsed, truth):
+    scores = {"total_tasks": 1}
+    total = {"ALLOWED_SQUARE": "total_active_task", "MOVE": "total_move", "STATE": "total_state", "LEGALITY": "total_legality"}
+    if not parsed:
+        return scores
+    scores["json_success"] = 1
+    scores[total[task_name]] = 1
+
+    if task_name == "ALLOWED_SQUARE":
+        if check_allowed(parsed.get("allowed_square"), truth["allowed"]): scores["active_grid_task_acc"] = 1
+
+    elif task_name == "MOVE":
+        if check_allowed(parsed.get("allowed_square"), truth["allowed"]): scores["move_active_grid"] = 1
+        pm = parsed.get("move") or parsed.get("best_move")
+        if isinstance(pm, dict):
+            pr, pc, plr, plc = pm.get("global_row"), pm.get("global_col"), pm.get("local_row"), pm.get("local_col")
+            if pr is not None:
+                if any(m['global_row'] == pr and m['global_col'] == pc and m['local_row'] == plr and m['local_col'] == plc for m in truth["legal_moves"]):
+                    scores["move_legal"] = 1
+                gt_best = truth["best_move"]
+                if pr == gt_best['global_row'] and pc == gt_best['global_col'] and plr == gt_best['local_row'] and plc == gt_best['local_col']:
+                    scores["move_exact"] = 1
+
+    elif task_name == "STATE":
+        pm = parsed.get("grid_matrix")
+        if pm == truth["matrix"]: scores["state_exact"] = 1
+        if pm and isinstance(pm, list) and len(pm) == 3:
+            matches = 0
+            for r in range(3):
+                for c in range(3):
+                    if isinstance(pm[r], list) and len(pm[r]) > c and pm[r][c] == truth["matrix"][r][c]: matches += 1
+            scores["state_similarity"] = matches / 9.0
+
+    elif task_name == "LEGALITY":
+        pl = parsed.get("is_legal")
+        if pl is not None and pl == truth["is_legal"]: scores["legality_acc"] = 1
+    return scores
+
+# decodes the images in DataLoader workers, samples come out as (index, image, sample without image).
+# With an image store the dataset is loaded without its image column and the frames come from the store
+class EvalDataset(Dataset):
+    def __init__(self, dataset, indices, image_store=None, data_path=None):
+        self.dataset = dataset
+        self.indices = indices
+        self.image_store = image_store
+        self.data_path = data_path
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        index = self.indices[i]
+        sample = self.dataset[index]
+        if self.image_store is not None:
+            image = self.image_store.image(image_id(self.data_path, index))
+        else:
+            image = sample.pop("image").convert("RGB")
+        return index, image, sample
+
+def collate_samples(batch):
+    return batch
+
+def load_results(output_path, test_data_path, constrained=EVAL_CONSTRAINED_DECODING):
+    results = {}
+    if os.path.exists(output_path):
+        with open(output_path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line of a run that was killed mid-write
+                    continue
+                if result["dataset"] == test_data_path and result.get("constrained") == constrained:
+                    results[result["index"]] = result
+    return results
+
+def summarize(results):
+    metrics = dict.fromkeys(["json_success", "total_tasks", "move_active_grid", "move_legal", "move_exact", "total_move",
+                             "state_similarity", "state_exact", "total_state", "legality_acc", "total_legality",
+                             "active_grid_task_acc", "total_active_task"], 0)
+    for result in results.values():
+        for task in result["tasks"].values():
+            for key, value in task["scores"].items():
+                metrics[key] += value
+    return metrics
+
+def print_report(metrics):
+    print("\n" + "="*40)
+    print(f"JSON Syntax:     {metrics['json_success']/max(1, metrics['total_tasks'])*100:.1f}%")
+    print("-" * 40)
+    print(f"[ALLOWED] Acc:   {metrics['active_grid_task_acc']/max(1, metrics['total_active_task'])*100:.1f}%")
+    print(f"[MOVE] Legal:    {metrics['move_legal']/max(1, metrics['total_move'])*100:.1f}%")
+    print(f"[MOVE] Exact:    {metrics['move_exact']/max(1, metrics['total_move'])*100:.1f}%")
+    print("-" * 40)
+    print(f"[STATE] Exact:   {metrics['state_exact']/max(1, metrics['total_state'])*100:.1f}%")
+    print(f"[STATE] Sim %:   {(metrics['state_similarity']/max(1, metrics['total_state']))*100:.1f}%")
+    print("-" * 40)
+    print(f"[LEGAL] Logic:   {metrics['legality_acc']/max(1, metrics['total_legality'])*100:.1f}%")
+    print("="*40 + "\n")
+
+def run_eval(model, processor, test_data_path, output_path=EVAL_RESULTS_PATH, batch_size=EVAL_BATCH_SIZE,
+             num_workers=EVAL_NUM_WORKERS, max_new_tokens=EVAL_MAX_NEW_TOKENS, limit=None, seed=0, generator=None, image_store=None,
+             constrained=EVAL_CONSTRAINED_DECODING, compare_ttft=False):
+    from datasets import load_dataset
+
+    dataset = load_dataset("parquet", data_files={"test": test_data_path}, split="test")
+    if isinstance(image_store, str):
+        image_store = ImageStore(image_store)
+    if image_store is not None:
+        image_store.check(test_data_path)
+        dataset = dataset.remove_columns("image")
+    num_samples = len(dataset) if limit is None else min(limit, len(dataset))
+    results = load_results(output_path, test_data_path, constrained)
+    todo = [i for i in range(num_samples) if i not in results]
+    print(f"\n--- EVAL ON {num_samples} SAMPLES{' (CONSTRAINED)' if constrained else ''}, {num_samples - len(todo)} DONE IN {output_path} ---\n")
+
+    if generator is None:
+        generator = PrefixCache(model, processor, enabled=PREFIX_CACHE)
+    model.eval()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    # the tasks of this many samples are sorted together, every sample is written once all its tasks are done
+    group_size = max(1, batch_size // len(TASKS))
+    loader = DataLoader(EvalDataset(dataset, todo, image_store, test_data_path), batch_size=group_size, num_workers=num_workers,
+                        collate_fn=collate_samples, prefetch_factor=4 if num_workers else None)
+
+    start_time = time.perf_counter()
+    done = tasks_done = 0
+    with open(output_path, "a") as f:
+        for group in loader:
+            pending = []
+            for index, image, sample in group:
+                tasks, truth = build_tasks(index, sample, seed)
+                results[index] = {"dataset": test_data_path, "index": index, "constrained": constrained, "tasks": {}}
+                for task_name, prompt in tasks:
+                    messages = [
+                        {"role": "system", "content": [{"type": "text", "text": SYS_PROMPT}]},
+                        {"role": "user", "content": [{"type": "text", "text": prompt}, {"type": "image", "image": image}]}
+                    ]
+                    pending.append((len(prompt), index, task_name, messages, truth))
+
+            # similar lengths share a batch, so little of it is padding
+            pending.sort(key=lambda task: task[0])
+            for i in range(0, len(pending), batch_size):
+                batch = pending[i:i + batch_size]
+                processors = LogitsProcessorList([RepetitionPenaltyLogitsProcessor(1.1)])
+                if constrained:
+                    # only MOVE answers contain "best_move", the other rows are left alone
+                    processors.append(MoveJsonProcessor(processor.tokenizer, int(generator.eos_ids[0]), trigger='"best_move": ', suffix="}"))
+                responses = generator.generate([messages for _, _, _, messages, _ in batch], max_new_tokens=max_new_tokens,
+                                               logits_processor=processors)
+                for (_, index, task_name, _, truth), response in zip(batch, responses):
+                    parsed = extract_json_content(response)
+                    results[index]["tasks"][task_name] = {"response": response, "scores": score_task(task_name, parsed, truth)}
+                tasks_done += len(batch)
+
+            for index, _, _ in group:
+                f.write(json.dumps(results[index]) + "\n")
+            f.flush()
+            done += len(group)
+            elapsed = time.perf_counter() - start_time
+            print(f"  {len(results)}/{num_samples} samples, {done / elapsed:.2f} samples/s, {tasks_done / elapsed:.2f} tasks/s")
+
+    elapsed = time.perf_counter() - start_time
+    metrics = summarize({index: result for index, result in results.items() if index < num_samples})
+    print_report(metrics)
+    if done:
+        print(f"{done} samples in {elapsed:.1f}s, {done / elapsed:.2f} samples/s")
+        if compare_ttft:
+            generator.compare_ttft([pending[-1][3]])
+    return metrics
+
+def load_model(model_name=MODEL_NAME, adapter_path=ADAPTER_PATH):
+    from unsloth import FastLanguageModel
+    from transformers import AutoProcessor
+
+    model, tokenizer = FastLanguageModel.from_pretrained(
+        model_name = model_name,
+        max_seq_length = 4096,
+        dtype = None,
+        load_in_4bit = True,
+    )
+    processor = AutoProcessor.from_pretrained(model_name)
+    model.load_adapter(adapter_path)
+    FastLanguageModel.for_inference(model)
+    return model, processor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched, resumable evaluation of the VLM")
+    parser.add_argument("--data", default=DATASET_TEST_PATH)
+    parser.add_argument("--adapter", default=ADAPTER_PATH)
+    parser.add_argument("--output", default=EVAL_RESULTS_PATH, help="JSONL file per-sample results are appended to")
+    parser.add_argument("--batch-size", type=int, default=EVAL_BATCH_SIZE, help="tasks per generate call")
+    parser.add_argument("--workers", type=int, default=EVAL_NUM_WORKERS, help="image decoding workers")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N samples")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--images", default=None, help="image store to read the frames from instead of decoding the PNGs")
+    parser.add_argument("--constrained", action="store_true", default=EVAL_CONSTRAINED_DECODING,
+                        help="constrain the MOVE answers to the move JSON")
+    parser.add_argument("--compare-ttft", action="store_true", help="time the first token with and without the prefix cache at the end")
+    args = parser.parse_args()
+    model, processor = load_model(adapter_path=args.adapter)
+    run_eval(model, processor, args.data, args.output, args.batch_size, args.workers, limit=args.limit, seed=args.seed,
+             image_store=args.images, constrained=args.constrained, compare_ttft=args.compare_ttft)
@@ -0,0 +1,186 @@
+# Sharded, memory-mapped store of decoded frames for training and evaluation
+#
+# usage: python image_store.py [--data uttt_qwen_dataset] [--output uttt_qwen_dataset/images] [--size 720] [--workers 8]
+#    or: python image_store.py --log logs/bot_moves_synthetic.jsonl --output screens_store
+# Every shard is an .npy array of shape (frames, size, size, 3) uint8 that is opened with np.load(mmap_mode="r"),
+# so reading a frame is a slice of the page cache instead of a PNG decode, and a few large files are touched
+# instead of one per image. index.json maps the sample id to (shard, row). The ids of a dataset store are
+# "<split>/<row>" (image_id), the ids of a log store are the image paths in the log.
+# The ids are row positions, so a dataset store also records the sha256 and row count of every split it was
+# built from, and open_store / ImageStore.check refuse it once a split was rebuilt.
+# Shards are decoded and written by a process pool, each one to a temporary file that is renamed when complete.
+import argparse, io, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from config import *
+
+def image_id(data_path, row):
+    return f"{os.path.splitext(os.path.basename(data_path))[0]}/{row}"
+
+def shard_name(shard):
+    return f"shard_{shard:05d}.npy"
+
+# runs in the worker processes, sources are image paths or encoded image bytes. Returns the rows that failed
+def write_shard(path, sources, size):
+    tmp_path = path + ".tmp"
+    frames = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(len(sources), size, size, 3))
+    failed = []
+    for row, source in enumerate(sources):
+        try:
+            img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source).convert("RGB")
+            if img.size != (size, size):
+                img = img.resize((size, size), Image.BILINEAR)
+            frames[row] = np.asarray(img)
+        except Exception as e:
+            print(f"  -> ERROR decoding image {source if isinstance(source, str) else row}: {e}")
+            failed.append(row)
+    frames.flush()
+    del frames
+    os.replace(tmp_path, path)
+    return failed
+
+# {"file", "rows", "sha256"} of a split parquet, the sha256 is taken from the manifest.json of dataset_builder
+# when it lists the file, hashing a split of full-size PNGs takes a while
+def source_record(data_path):
+    import pyarrow.parquet as pq
+    from dataset_builder import file_sha256, load_manifest
+
+    name = os.path.basename(data_path)
+    manifest = load_manifest(os.path.join(os.path.dirname(data_path), "manifest.json")) or {"splits": {}}
+    sha256 = next((split["sha256"] for split in manifest["splits"].values() if split["file"] == name), None)
+    return {"file": name, "rows": pq.ParquetFile(data_path).metadata.num_rows, "sha256": sha256 or file_sha256(data_path)}
+
+# items: (sample id, image path or bytes), written as shards of shard_size frames by workers processes,
+# sources: {split: source_record} of the parquets the items come from
+def build_store(items, output_dir=IMAGE_STORE_PATH, size=IMAGE_STORE_SIZE, shard_size=IMAGE_STORE_SHARD_SIZE, workers=os.cpu_count(),
+                sources=None):
+    os.makedirs(output_dir, exist_ok=True)
+    ids = [sample_id for sample_id, _ in items]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Sample ids in the image store have to be unique.")
+    print(f"Writing {len(items)} frames of {size}x{size} to {output_dir} in shards of {shard_size} with {workers} workers")
+
+    start_time = time.time()
+    starts = list(range(0, len(items), shard_size))
+    index = {"size": size, "sources": sources or {}, "shards": [], "ids": {}}
+    failed_count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(write_shard, os.path.join(output_dir, shard_name(shard)),
+                                   [source for _, source in items[start:start + shard_size]], size)
+                   for shard, start in enumerate(starts)]
+        for shard, (start, future) in enumerate(zip(starts, futures)):
+            failed = set(future.result())
+            failed_count += len(failed)
+            shard_ids = ids[start:start + shard_size]
+            index["shards"].append({"file": shard_name(shard), "count": len(shard_ids)})
+            for row, sample_id in enumerate(shard_ids):
+                if row not in failed:
+                    index["ids"][sample_id] = [shard, row]
+
+    # the index is written last, a store without one is incomplete
+    with open(os.path.join(output_dir, "index.json.tmp"), "w") as f:
+        json.dump(index, f)
+    os.replace(os.path.join(output_dir, "index.json.tmp"), os.path.join(output_dir, "index.json"))
+    elapsed = time.time() - start_time
+    print(f"Wrote {len(index['ids'])} frames in {len(starts)} shards in {elapsed:.1f}s "
+          f"({len(items) / max(elapsed, 1e-9):.1f} imgs/s), {failed_count} failed")
+    return index
+
+# the embedded images of the dataset parquet splits, ids "<split>/<row>"
+def build_from_parquet(data_paths, output_dir=IMAGE_STORE_PATH, **kwargs):
+    import pyarrow.parquet as pq
+
+    items, sources = [], {}
+    for data_path in data_paths:
+        sources[os.path.splitext(os.path.basename(data_path))[0]] = source_record(data_path)
+        column = pq.read_table(data_path, columns=["image"])["image"].combine_chunks()
+        for row, (image_bytes, path) in enumerate(zip(column.field("bytes").to_pylist(), column.field("path").to_pylist())):
+            items.append((image_id(data_path, row), image_bytes if image_bytes is not None else path))
+    return build_store(items, output_dir, sources=sources, **kwargs)
+
+# the images referenced by a move log, ids are the image paths
+def build_from_log(log_path, output_dir, **kwargs):
+    paths = []
+    with open(log_path, "r") as f:
+        for line in f:
+            if line.strip():
+                paths.append(json.loads(line)["image path"])
+    paths = list(dict.fromkeys(paths))
+    return build_store([(path, path) for path in paths], output_dir, **kwargs)
+
+class ImageStore:
+    def __init__(self, path=IMAGE_STORE_PATH):
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+        self.path = path
+        self.size = index["size"]
+        self.shard_files = [shard["file"] for shard in index["shards"]]
+        self.ids = index["ids"]
+        self.sources = index.get("sources", {})
+        # opened on first use, so every DataLoader worker maps the files itself
+        self.shards = [None] * len(self.shard_files)
+
+    # raises ValueError unless the store holds the frames of this exact version of the split
+    def check(self, data_path):
+        split = os.path.splitext(os.path.basename(data_path))[0]
+        if split not in self.sources:
+            raise ValueError(f"Image store {self.path} has no frames of {data_path}, rebuild it with image_store.py")
+        current = source_record(data_path)
+        if self.sources[split] != current:
+            raise ValueError(f"Image store {self.path} was built from another version of {data_path} "
+                             f"({self.sources[split]['rows']} rows, now {current['rows']}), rebuild it with image_store.py")
+
+    def shard(self, shard):
+        if self.shards[shard] is None:
+            self.shards[shard] = np.load(os.path.join(self.path, self.shard_files[shard]), mmap_mode="r")
+        return self.shards[shard]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, sample_id):
+        return str(sample_id) in self.ids
+
+    # (size, size, 3) uint8 view of the mapped shard
+    def __getitem__(self, sample_id):
+        shard, row = self.ids[str(sample_id)]
+        return self.shard(shard)[row]
+
+    def image(self, sample_id):
+        return Image.fromarray(np.asarray(self[sample_id]))
+
+    def batch(self, sample_ids):
+        return np.stack([self[sample_id] for sample_id in sample_ids])
+
+# the store at path if it exists and matches every split in data_paths, otherwise None (the PNGs are decoded)
+def open_store(path=IMAGE_STORE_PATH, data_paths=()):
+    if not os.path.exists(os.path.join(path, "index.json")):
+        return None
+    store = ImageStore(path)
+    try:
+        for data_path in data_paths:
+            store.check(data_path)
+    except ValueError as e:
+        print(f"{e}. Decoding the PNGs instead.")
+        return None
+    return store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped image store of the dataset or a move log")
+    parser.add_argument("--data", default=DATASET_FOLDER, help="folder with the split parquets")
+    parser.add_argument("--log", default=None, help="move log to read the image paths from instead of the dataset")
+    parser.add_argument("--output", default=IMAGE_STORE_PATH)
+    parser.add_argument("--size", type=int, default=IMAGE_STORE_SIZE, help="side length the frames are resized to")
+    parser.add_argument("--shard-size", type=int, default=IMAGE_STORE_SHARD_SIZE, help="frames per shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    options = {"size": args.size, "shard_size": args.shard_size, "workers": args.workers}
+    if args.log:
+        build_from_log(args.log, args.output, **options)
+    else:
+        data_paths = sorted(os.path.join(args.data, name) for name in os.listdir(args.data)
+                            if name.endswith(".parquet") and not name.endswith(".compact.parquet"))
+        build_from_parquet(data_paths, args.output, **options)
@@ -0,0 +1,584 @@
+# FastAPI inference service behind VLMBot
+#
+# usage: python inference_server.py [--backend vlm|engine] [--lazy] [--host 0.0.0.0] [--port 8000]
+#    or: uvicorn inference_server:app   (backend and loading from config)
+# The "engine" backend answers with UltimateTTTBot at a fixed depth, it needs no GPU or model
+# weights and serves the same API for load tests.
+import argparse, asyncio, base64, contextlib, gzip, hashlib, io, json, os, re, threading, time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request, Response, UploadFile, File, Form
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from PIL import Image as PILImage
+
+from board_tables import check_win
+from symmetry import INVERSE, canonical_board, transform_move
+from config import *
+
+# VLMBot gzips its request bodies (Content-Encoding: gzip)
+class GzipRequest(Request):
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            if "gzip" in self.headers.getlist("Content-Encoding"):
+                body = gzip.decompress(body)
+            self._body = body
+        return self._body
+
+class GzipRoute(APIRoute):
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def custom_route_handler(request: Request) -> Response:
+            request = GzipRequest(request.scope, request.receive)
+            if "gzip" in request.headers.getlist("Content-Encoding"):
+                # form parsing reads request.stream(), which replays the cached inflated body
+                await request.body()
+            return await original_route_handler(request)
+
+        return custom_route_handler
+
+class MoveRequest(BaseModel):
+    image_base64: str
+    player_turn: str
+    # either the verbose per-cell dicts or the compact 81 digit board string
+    global_state: list = []
+    board: str | None = None
+    allowed_square: list | None = None
+
+# what a backend gets for every request of a batch
+class MoveJob:
+    def __init__(self, image, player_turn, global_state, allowed_square=None):
+        self.image = image
+        self.player_turn = player_turn
+        self.global_state = global_state
+        self.allowed_square = allowed_square
+
+    # the submitted position on the bitboard engine
+    def board(self):
+        from uttt_engine import BitBoard
+
+        player = 1 if self.player_turn == "X" else 2
+        squares = np.zeros(81, dtype=np.int8)
+        for cell in self.global_state:
+            squares[(cell["global_row"] * 3 + cell["global_col"]) * 9 + cell["local_row"] * 3 + cell["local_col"]] = cell["player"]
+        allowed = tuple(self.allowed_square) if self.allowed_square is not None else None
+        return BitBoard.from_array(squares, allowed, player)
+
+    def legal_moves(self):
+        board = self.board()
+        return board.get_legal_moves() if board.global_status() == 0 else []
+
+# "0120..." with index (global_row * 3 + global_col) * 9 + local_row * 3 + local_col -> global_state dicts
+def expand_board(board):
+    if len(board) != 81 or any(ch not in "012" for ch in board):
+        raise HTTPException(status_code=400, detail="board must be 81 digits 0, 1 or 2")
+    return [{"global_row": i // 27, "global_col": i // 9 % 3, "local_row": i % 9 // 3, "local_col": i % 3,
+             "player": int(board[i])} for i in range(81)]
+
+# inverse of expand_board, cells that are not listed stay empty
+def board_string(global_state):
+    board = ["0"] * 81
+    for cell in global_state:
+        board[(cell["global_row"] * 3 + cell["global_col"]) * 9 + cell["local_row"] * 3 + cell["local_col"]] = str(int(cell["player"]))
+    return "".join(board)
+
+def reconstruct_board_matrix(global_state_list):
+    board_matrix = [[[[0 for _ in range(3)] for _ in range(3)] for _ in range(3)] for _ in range(3)]
+    global_status = [[0 for _ in range(3)] for _ in range(3)]
+    for cell in global_state_list:
+        g_r, g_c, l_r, l_c = cell['global_row'], cell['global_col'], cell['local_row'], cell['local_col']
+        board_matrix[g_r][g_c][l_r][l_c] = cell['player']
+    for g_r in range(3):
+        for g_c in range(3):
+            global_status[g_r][g_c] = check_win(board_matrix[g_r][g_c])
+    return board_matrix, global_status
+
+def get_unplayable_boards(global_status):
+    unplayable = []
+    for r in range(3):
+        for c in range(3):
+            if global_status[r][c] != 0:
+                unplayable.append({"global_row": r, "global_col": c})
+    return unplayable
+
+def render_ascii_board(global_state_list):
+    symbols = {0: '.', 1: 'X', 2: 'O'}
+    state_map = {(c['global_row'], c['global_col'], c['local_row'], c['local_col']): symbols.get(c['player'], '.') for c in global_state_list}
+    sections = []
+    for g_r in range(3):
+        for g_c in range(3):
+            s = [f"=== Global Board [{g_r}, {g_c}] ===", "    0 1 2", "   -------"]
+            for l_r in range(3):
+                row = [state_map.get((g_r, g_c, l_r, l_c), '.') for l_c in range(3)]
+                s.append(f"{l_r} | " + " ".join(row))
+            sections.append("\n".join(s))
+    return "\n\n".join(sections)
+
+def parse_move_from_text(text):
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match:
+        try: return json.loads(match.group(0).replace("'", '"'))
+        except: return None
+    return None
+
+def format_squares_to_str(squares_list):
+    if not squares_list:
+        return "[]"
+
+    formatted = []
+    for sq in squares_list:
+        if isinstance(sq, dict) and 'global_row' in sq and 'global_col' in sq:
+            formatted.append(f"({sq['global_row']}, {sq['global_col']})")
+
+    return "[" + ", ".join(formatted) + "]"
+
+def build_messages(image, player_turn, global_state):
+    _, global_status = reconstruct_board_matrix(global_state)
+    unplayable_boards = get_unplayable_boards(global_status)
+    unplayable_list_str = format_squares_to_str(unplayable_boards)
+    ascii_board = render_ascii_board(global_state)
+
+    system_content = (
+        f"You are an expert Ultimate Tic-Tac-Toe player. "
+        f"Your goal is to identify the optimal, legal move based on the provided image and context. "
+        f"The final output must be **ONLY** a raw JSON object containing the chosen move."
+        f"{{\"global_row\": r, \"global_col\": c, \"local_row\": lr, \"local_col\": lc}}."
+    )
+
+    user_prompt_text = (
+        f"Player: {player_turn} (X=Player 1, O=Player 2)\n"
+        f"Analyze the board state in the image and determine the optimal move.\n\n"
+        f"--- BOARD CONTEXT ---\n"
+        f"**Allowed/Active Board:** The global board highlighted in **BRIGHT GREEN** in the image is the current active board constraint. If this board is already won/tied, you must select any other available board (Free Play).\n"
+        f"**Unplayable Boards:** The following Global Boards are already WON or TIED and cannot be played: {unplayable_list_str}\n\n"
+        f"--- ASCII VISUALIZATION ---\n"
+        f"Use this labeled diagram to cross-reference the image coordinates (0, 1, 2) with the piece locations and board status:\n"
+        f"{ascii_board}\n\n"
+        f"CRITICAL RULE: The target local cell (local_row, local_col) MUST be **EMPTY** on the global board (global_row, global_col).\n"
+        f"CRITICAL RULE: All output coordinates (global_row, global_col, local_row, local_col) MUST be **0, 1 or 2**."
+    )
+
+    messages = [
+        {"role": "system", "content": [{"type": "text", "text": system_content}]},
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "image": image},
+                {"type": "text", "text": user_prompt_text},
+            ],
+        },
+    ]
+    return messages
+
+# A backend turns a batch of MoveJobs into one response text per job, the text is parsed
+# with parse_move_from_text. load() and predict_batch() always run on the batcher's thread.
+class Backend:
+    name = "backend"
+
+    def __init__(self):
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        pass
+
+    # part of the response cache key, answers of another model or adapter are never reused
+    @property
+    def version(self):
+        return self.name
+
+    def ensure_loaded(self):
+        with self.lock:
+            if not self.loaded:
+                self.load()
+                self.loaded = True
+
+    def predict_batch(self, jobs):
+        raise NotImplementedError
+
+    def metrics(self):
+        return {}
+
+    # one request on an empty board so the first real request does not pay for compilation and caches
+    def warm_up(self):
+        image = PILImage.new("RGB", (WIDTH, HEIGHT), BG_COLOR)
+        return self.predict_batch([MoveJob(image, "X", expand_board("0" * 81))])
+
+class VLMBackend(Backend):
+    name = "vlm"
+
+    def __init__(self, model_name=MODEL_NAME, adapter_path=ADAPTER_PATH, max_new_tokens=128, prefix_cache=PREFIX_CACHE,
+                 constrained=CONSTRAINED_DECODING, legal_only=CONSTRAIN_TO_LEGAL_MOVES):
+        super().__init__()
+        self.model_name = model_name
+        self.adapter_path = adapter_path
+        self.max_new_tokens = max_new_tokens
+        self.prefix_cache = prefix_cache
+        self.constrained = constrained
+        self.legal_only = legal_only
+
+    # retraining into the same directory changes the adapter files and with them the version,
+    # constrained decoding can answer differently so it is part of it too
+    @property
+    def version(self):
+        weights = os.path.join(self.adapter_path, "adapter_model.safetensors")
+        mtime = os.path.getmtime(weights) if os.path.exists(weights) else 0
+        return f"{self.model_name}:{self.adapter_path}:{mtime:.0f}:constrained={self.constrained},{self.legal_only}"
+
+    def load(self):
+        # the GPU stack is only imported when this backend is used
+        from unsloth import FastLanguageModel
+        from transformers import AutoProcessor
+        from vlm_generation import PrefixCache
+
+        self.model, self.tokenizer = FastLanguageModel.from_pretrained(
+                model_name = self.model_name,
+                max_seq_length = 2048,
+                dtype = None,
+                load_in_4bit = True,
+                trust_remote_code = True
+            )
+
+        self.processor = AutoProcessor.from_pretrained(self.model_name, trust_remote_code=True)
+        # batched generation pads on the left so every prompt ends right where generation starts
+        self.processor.tokenizer.padding_side = "left"
+        self.model.config.use_cache = True
+
+        self.model.load_adapter(self.adapter_path)
+        FastLanguageModel.for_inference(self.model)
+        # the system prompt is computed once with the adapter loaded
+        self.generator = PrefixCache(self.model, self.processor, enabled=self.prefix_cache)
+
+    # one padded greedy decode for the whole batch, starting from the cached system prompt
+    def predict_batch(self, jobs):
+        from vlm_generation import MoveJsonProcessor
+
+        batch_messages = [build_messages(job.image, job.player_turn, job.global_state) for job in jobs]
+        logits_processor = None
+        if self.constrained:
+            moves = [job.legal_moves() if self.legal_only else None for job in jobs]
+            logits_processor = MoveJsonProcessor(self.processor.tokenizer, int(self.generator.eos_ids[0]), moves)
+        return self.generator.generate(batch_messages, max_new_tokens=self.max_new_tokens, logits_processor=logits_processor)
+
+    # time to first token with and without the prefix cache
+    def metrics(self):
+        return self.generator.metrics() if self.loaded else {}
+
+# deterministic stand-in: fixed depth minimax on the board state, the image is ignored
+class EngineBackend(Backend):
+    name = "engine"
+
+    def __init__(self, depth=ENGINE_BACKEND_DEPTH):
+        super().__init__()
+        self.depth = depth
+
+    @property
+    def version(self):
+        return f"engine:depth={self.depth}"
+
+    def load(self):
+        from TTT_bot import UltimateTTTBot
+        # the table only speeds up the search, the result at a fixed depth is the same without it
+        self.bots = {player: UltimateTTTBot(player, tt_size=0) for player in (1, 2)}
+
+    def predict_batch(self, jobs):
+        from uttt_engine import index_to_move
+
+        texts = []
+        for job in jobs:
+            board = job.board()
+            if board.global_status() != 0 or not board.legal_indices():
+                texts.append("no legal move")
+                continue
+            _, move = self.bots[board.player].minimax(board, self.depth, -np.inf, np.inf, True, board.legal_indices())
+            global_row, global_col, local_row, local_col = index_to_move(move)
+            texts.append(json.dumps({"global_row": global_row, "global_col": global_col,
+                                     "local_row": local_row, "local_col": local_col}))
+        return texts
+
+BACKENDS = {"vlm": VLMBackend, "engine": EngineBackend}
+
+# Collects requests for up to max_wait_ms or max_batch_size items and runs them as one backend call
+# in a worker thread so the event loop keeps accepting requests, then resolves each request's future
+class MicroBatcher:
+    def __init__(self, backend, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.latencies = deque(maxlen=1000)
+        self.batch_sizes = deque(maxlen=1000)
+        self.requests = 0
+
+    async def submit(self, job):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((job, future, time.perf_counter()))
+        return await future
+
+    async def collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def predict_batch(self, jobs):
+        # lazy loading happens here, on the first batch
+        self.backend.ensure_loaded()
+        return self.backend.predict_batch(jobs)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.collect()
+            try:
+                texts = await loop.run_in_executor(self.executor, self.predict_batch, [job for job, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self.batch_sizes.append(len(batch))
+            self.requests += len(batch)
+            for (_, future, start_time), text in zip(batch, texts):
+                self.latencies.append(now - start_time)
+                if not future.done():
+                    future.set_result(text)
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "queue_depth": self.queue.qsize(),
+            "requests": self.requests,
+            "batches": len(self.batch_sizes),
+            "last_batch_size": self.batch_sizes[-1] if self.batch_sizes else 0,
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p99_ms": float(np.percentile(latencies, 99)),
+        }
+
+# LRU cache of parsed moves keyed on a hash of (backend version, player, allowed square, board).
+# The image is not part of the key, it is rendered from the same state. With symmetry the board is
+# first mapped to its canonical image under the 8 board symmetries and the move is stored in that
+# frame, a hit is mapped back with the inverse symmetry. Entries are appended to path as JSONL and
+# read back by load() at server startup, which rewrites the file without expired and evicted entries.
+class ResponseCache:
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, path=RESPONSE_CACHE_PATH, symmetry=RESPONSE_CACHE_SYMMETRY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.symmetry = symmetry
+        # key -> (move, expiry time or None), oldest first
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.expired = self.evictions = 0
+        self.persist_errors = 0
+
+    # (key, symmetry that maps the position to the frame the move is stored in)
+    def key(self, version, player_turn, board, allowed_square):
+        symmetry = 0
+        if allowed_square is not None:
+            allowed_square = tuple(allowed_square)
+        if self.symmetry:
+            symmetry, board, allowed_square = canonical_board(board, allowed_square)
+        text = f"{version}|{player_turn}|{allowed_square}|{board}"
+        return hashlib.sha1(text.encode()).hexdigest(), symmetry
+
+    def get(self, version, player_turn, board, allowed_square):
+        if not self.max_size:
+            return None
+        key, symmetry = self.key(version, player_turn, board, allowed_square)
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] < time.time():
+            del self.entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return self.from_frame(entry[0], INVERSE[symmetry])
+
+    def put(self, version, player_turn, board, allowed_square, move):
+        if not self.max_size:
+            return
+        key, symmetry = self.key(version, player_turn, board, allowed_square)
+        move = self.from_frame(move, symmetry)
+        if move is None:
+            return
+        expires = time.time() + self.ttl if self.ttl else None
+        self.insert(key, move, expires)
+        if self.path:
+            # the entry stays cached in memory when the file cannot be written, the response is not affected
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"key": key, "move": move, "expires": expires}) + "\n")
+            except OSError as e:
+                self.persist_errors += 1
+                print(f"Could not persist the response cache to {self.path}: {e}")
+
+    def insert(self, key, move, expires):
+        self.entries[key] = (move, expires)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # moves other than four coordinates can only be cached as they are
+    def from_frame(self, move, symmetry):
+        keys = ("global_row", "global_col", "local_row", "local_col")
+        if not symmetry:
+            return move
+        try:
+            coords = transform_move([int(move[k]) for k in keys], symmetry)
+        except (KeyError, TypeError, ValueError):
+            return None
+        return dict(zip(keys, coords))
+
+    def load(self):
+        if not self.path or not self.max_size:
+            return
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            return
+        now = time.time()
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a line cut short by a crash
+                    continue
+                if entry["expires"] is None or entry["expires"] > now:
+                    self.insert(entry["key"], entry["move"], entry["expires"])
+        self.evictions = 0
+        with open(self.path, "w") as f:
+            for key, (move, expires) in self.entries.items():
+                f.write(json.dumps({"key": key, "move": move, "expires": expires}) + "\n")
+        print(f"Loaded {len(self.entries)} cached responses from {self.path}")
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "cache_size": len(self.entries),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": self.hits / lookups if lookups else 0.0,
+            "cache_expired": self.expired,
+            "cache_evictions": self.evictions,
+            "cache_persist_errors": self.persist_errors,
+        }
+
+def create_app(backend=None, eager=INFERENCE_EAGER_LOAD, warm_up=True, cache=None):
+    if backend is None:
+        backend = BACKENDS[INFERENCE_BACKEND]()
+    if cache is None:
+        cache = ResponseCache()
+    batcher = MicroBatcher(backend)
+    status = {"ready": False, "warm_up_ms": None}
+
+    @contextlib.asynccontextmanager
+    async def lifespan(api):
+        loop = asyncio.get_running_loop()
+        batcher_task = loop.create_task(batcher.run())
+        cache.load()
+        if eager:
+            # loading and warm-up share the batcher's thread, so they never overlap a batch
+            start_time = time.perf_counter()
+            await loop.run_in_executor(batcher.executor, backend.ensure_loaded)
+            if warm_up:
+                await loop.run_in_executor(batcher.executor, backend.warm_up)
+            status["warm_up_ms"] = (time.perf_counter() - start_time) * 1000
+            print(f"{backend.name} backend ready after {status['warm_up_ms']:.0f} ms")
+        status["ready"] = True
+        yield
+        batcher_task.cancel()
+
+    api = FastAPI(lifespan=lifespan)
+    api.router.route_class = GzipRoute
+    api.state.backend, api.state.batcher, api.state.cache = backend, batcher, cache
+
+    # liveness, the process answers
+    @api.get("/health")
+    async def health():
+        return {"status": "ok", "backend": backend.name}
+
+    # readiness, the model is loaded (or will load lazily on the first request)
+    @api.get("/ready")
+    async def ready():
+        content = {"ready": status["ready"], "loaded": backend.loaded, "backend": backend.name, "warm_up_ms": status["warm_up_ms"]}
+        return JSONResponse(content, status_code=200 if status["ready"] else 503)
+
+    @api.get("/metrics")
+    async def metrics():
+        return {**batcher.metrics(), **cache.metrics(), **backend.metrics()}
+
+    async def predict(img_bytes, player_turn, global_state, allowed_square, response):
+        start_time = time.perf_counter()
+        try:
+            board = board_string(global_state)
+            move = cache.get(backend.version, player_turn, board, allowed_square)
+            response.headers["X-Cache"] = "miss" if move is None else "hit"
+            if move is None:
+                image = PILImage.open(io.BytesIO(img_bytes)).convert("RGB")
+                response_text = await batcher.submit(MoveJob(image, player_turn, global_state, allowed_square))
+
+                move = parse_move_from_text(response_text)
+                if not move:
+                    raise HTTPException(status_code=422, detail=f"Model failed: {response_text}")
+                cache.put(backend.version, player_turn, board, allowed_square, move)
+            # lets the client split its round trip into server and network time
+            response.headers["Server-Timing"] = f"predict;dur={(time.perf_counter() - start_time) * 1000:.1f}"
+            return move
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @api.post("/predict_move")
+    async def predict_move(request: MoveRequest, response: Response):
+        global_state = request.global_state or expand_board(request.board or "")
+        return await predict(base64.b64decode(request.image_base64), request.player_turn, global_state,
+                             request.allowed_square, response)
+
+    # same as /predict_move with the JPEG sent as a raw file part instead of base64
+    @api.post("/predict_move/multipart")
+    async def predict_move_multipart(response: Response, image: UploadFile = File(...), player_turn: str = Form(...),
+                                     board: str = Form(...), allowed_square: str = Form("null")):
+        return await predict(await image.read(), player_turn, expand_board(board), json.loads(allowed_square), response)
+
+    return api
+
+# for "uvicorn inference_server:app", nothing is loaded before the server starts
+app = create_app()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ultimate Tic Tac Toe move inference server")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=INFERENCE_BACKEND)
+    parser.add_argument("--lazy", action="store_true", help="load the model on the first request instead of at startup")
+    parser.add_argument("--host", default=INFERENCE_HOST)
+    parser.add_argument("--port", type=int, default=INFERENCE_PORT)
+    parser.add_argument("--cache-size", type=int, default=RESPONSE_CACHE_SIZE, help="cached responses, 0 disables the cache")
+    parser.add_argument("--cache-path", default=RESPONSE_CACHE_PATH, help="JSONL file the cache is persisted to, empty for memory only")
+    parser.add_argument("--cache-symmetry", action="store_true", default=RESPONSE_CACHE_SYMMETRY,
+                        help="share cache entries between rotated and reflected positions")
+    args = parser.parse_args()
+    cache = ResponseCache(args.cache_size, path=args.cache_path or None, symmetry=args.cache_symmetry)
+    uvicorn.run(create_app(BACKENDS[args.backend](), eager=not args.lazy, cache=cache), host=args.host, port=args.port, log_level="info")
@@ -18,8 +18,8 @@ try:
     public_url = ngrok.connect(PORT).public_url
     
     print(f"Forwarding: {public_url} -> http://localhost:{PORT}")
-    print(f"\nCOPY THIS TO TTT_bot.py:")
-    print(f"self.api_url = \"{public_url}/predict_move\"")
+    print(f"\nCOPY THIS TO config.py:")
+    print(f"VLM_API_URL = \"{public_url}/predict_move\"")
     
     while True:
         time.sleep(1)
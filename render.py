@@ -0,0 +1,385 @@
+# Drawing of a board position onto any pygame surface
+#
+# main.Game draws the live window with these functions. BoardRenderer uses the same drawing
+# offscreen (no window needed) to turn stacks of positions into images for the datasets.
+import os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pygame
+
+from uttt_engine import Board
+from config import *
+
+_layers = {}
+
+# SRCALPHA scratch surfaces are allocated once and reused on every frame
+def _alpha_layer(name, size):
+    layer = _layers.get(name)
+    if layer is None:
+        layer = _layers[name] = pygame.Surface(size, pygame.SRCALPHA)
+    return layer
+
+def draw_board_lines(surface, global_squares, allowed_square):
+
+    #global board
+    pygame.draw.line(surface, LINE_COLOR, (SIZE, 0),
+                     (SIZE, HEIGHT), LINE_WIDTH)
+    pygame.draw.line(surface, LINE_COLOR, (WIDTH-SIZE, 0),
+                     (WIDTH-SIZE, HEIGHT), LINE_WIDTH)
+
+    pygame.draw.line(surface, LINE_COLOR, (0, SIZE),
+                     (WIDTH, SIZE), LINE_WIDTH)
+    pygame.draw.line(surface, LINE_COLOR, (0, HEIGHT-SIZE),
+                     (WIDTH, HEIGHT-SIZE), LINE_WIDTH)
+
+    #local boards
+    local_lines_surface = _alpha_layer("local_lines", (WIDTH, HEIGHT))
+    local_lines_surface.fill((0, 0, 0, 0))
+    for row in range(ROWS):
+        for col in range(COLS):
+            local_winner = global_squares[row][col]
+            if local_winner != -1 and local_winner != 0:
+                 continue
+
+            board_x_offset = col * SIZE
+            board_y_offset = row * SIZE
+
+            is_allowed = allowed_square is None or (row, col) == tuple(allowed_square)
+            draw_color = LINE_COLOR if is_allowed else DENIED_BOARD_LINE_COLOR
+
+            pygame.draw.line(local_lines_surface, draw_color,
+                             (board_x_offset + LOCAL_SIZE, board_y_offset),
+                             (board_x_offset + LOCAL_SIZE, board_y_offset + SIZE),
+                             LOCAL_LINE_WIDTH)
+
+            pygame.draw.line(local_lines_surface, draw_color,
+                             (board_x_offset + 2 * LOCAL_SIZE, board_y_offset),
+                             (board_x_offset + 2 * LOCAL_SIZE, board_y_offset + SIZE),
+                             LOCAL_LINE_WIDTH)
+
+            pygame.draw.line(local_lines_surface, draw_color,
+                             (board_x_offset, board_y_offset + LOCAL_SIZE),
+                             (board_x_offset + SIZE, board_y_offset + LOCAL_SIZE),
+                             LOCAL_LINE_WIDTH)
+
+            pygame.draw.line(local_lines_surface, draw_color,
+                             (board_x_offset, board_y_offset + 2 * LOCAL_SIZE),
+                             (board_x_offset + SIZE, board_y_offset + 2 * LOCAL_SIZE),
+                             LOCAL_LINE_WIDTH)
+
+    surface.blit(local_lines_surface, (0, 0))
+
+def draw_win(surface, winner_line_coords):
+    if winner_line_coords is not None:
+        initial_pos, end_pos = winner_line_coords
+        pygame.draw.line(surface, WIN_LINE_COLOR, initial_pos, end_pos, CROSS_WIDTH)
+
+# every X/O of the position, won local boards only show the big figure
+def draw_figures(surface, squares, global_squares):
+    for global_row in range(ROWS):
+        for global_col in range(COLS):
+            local_winner = global_squares[global_row, global_col]
+            if local_winner == -1 or local_winner == 0:
+                for local_row in range(ROWS):
+                    for local_col in range(COLS):
+                        player = squares[global_row][global_col][local_row][local_col]
+                        if player != 0:
+                            draw_local_fig(surface, int(player), global_row, global_col, local_row, local_col)
+            if local_winner in [1, 2]:
+                draw_global_fig(surface, int(local_winner), global_row, global_col)
+
+# function to draw X or O on global board, when a local board has been won
+def draw_global_fig(surface, player, row, col):
+    #X-shape
+    if player == 1:
+        #\-shape
+        left_start_pos = (col * SIZE + 60, row * SIZE + 60)
+        left_end_pos = (col * SIZE + SIZE - 60, row * SIZE + SIZE - 60)
+        pygame.draw.line(surface, CROSS_COLOR, left_start_pos, left_end_pos, CROSS_WIDTH)
+
+        #/-shape
+        right_start_pos = (col * SIZE + 60, row * SIZE + SIZE - 60)
+        right_end_pos = (col * SIZE + SIZE - 60, row * SIZE + 60)
+        pygame.draw.line(surface, CROSS_COLOR, right_start_pos, right_end_pos, CROSS_WIDTH)
+    #O-shape
+    elif player == 2:
+        center = (col*SIZE + SIZE//2, row*SIZE + SIZE//2)
+        pygame.draw.circle(surface, CIRCLE_COLOR, center, RADIUS, LINE_WIDTH)
+
+# function to draw X or O on local boards
+def draw_local_fig(surface, player, global_row, global_col, local_row, local_col):
+    local_center_x = global_col * SIZE + local_col * LOCAL_SIZE + LOCAL_SIZE // 2
+    local_center_y = global_row * SIZE + local_row * LOCAL_SIZE + LOCAL_SIZE // 2
+    padding = LOCAL_SIZE * 0.25
+
+    # X-shape
+    if player == 1:
+        x1 = local_center_x - LOCAL_SIZE // 2 + padding
+        x2 = local_center_x + LOCAL_SIZE // 2 - padding
+        y1 = local_center_y - LOCAL_SIZE // 2 + padding
+        y2 = local_center_y + LOCAL_SIZE // 2 - padding
+        local_width = LOCAL_LINE_WIDTH + 2
+
+        # \-shape
+        pygame.draw.line(surface, CROSS_COLOR, (x1, y1), (x2, y2), local_width)
+        # /-shape
+        pygame.draw.line(surface, CROSS_COLOR, (x1, y2), (x2, y1), local_width)
+
+    # O-shape
+    elif player == 2:
+        pygame.draw.circle(surface, CIRCLE_COLOR, (local_center_x, local_center_y),
+                           LOCAL_RADIUS, LOCAL_LINE_WIDTH)
+
+def draw_allowed_square(surface, allowed_square, running=True):
+    if allowed_square is None:
+        return
+
+    global_row, global_col = allowed_square
+    x = global_col * SIZE
+    y = global_row * SIZE
+
+    overlay = _alpha_layer("allowed_square", (SIZE, SIZE))
+    overlay.fill(ALLOWED_BOARD_COLOR)
+    if running:
+        surface.blit(overlay, (x, y))
+
+# full frame in the same order as main.refresh_screen
+def draw_board(surface, squares, global_squares, allowed_square, running=True, winner_line_coords=None):
+    surface.fill(BG_COLOR)
+    draw_allowed_square(surface, allowed_square, running)
+    draw_board_lines(surface, global_squares, allowed_square)
+    draw_figures(surface, squares, global_squares)
+    draw_win(surface, winner_line_coords)
+
+# Offscreen renderer, pixel-identical to draw_board. Everything below the figures only depends on
+# the allowed square and which local boards are won, so those backgrounds are cached, and the
+# figures are blitted from sprites drawn once with draw_local_fig / draw_global_fig.
+class BoardRenderer:
+    def __init__(self, cache_size=256):
+        self.surface = pygame.Surface((WIDTH, HEIGHT))
+        self.cache_size = cache_size
+        self.backgrounds = {}
+        self.local_sprites = {}
+        self.global_sprites = {}
+        for player in (1, 2):
+            sprite = pygame.Surface((LOCAL_SIZE, LOCAL_SIZE), pygame.SRCALPHA)
+            draw_local_fig(sprite, player, 0, 0, 0, 0)
+            self.local_sprites[player] = sprite
+            sprite = pygame.Surface((SIZE, SIZE), pygame.SRCALPHA)
+            draw_global_fig(sprite, player, 0, 0)
+            self.global_sprites[player] = sprite
+
+    def background(self, global_squares, allowed_square, running):
+        won = tuple(int(status) in (1, 2) for status in global_squares.flat)
+        key = (allowed_square, running, won)
+        surface = self.backgrounds.get(key)
+        if surface is None:
+            if len(self.backgrounds) >= self.cache_size:
+                self.backgrounds.clear()
+            surface = pygame.Surface((WIDTH, HEIGHT))
+            surface.fill(BG_COLOR)
+            draw_allowed_square(surface, allowed_square, running)
+            draw_board_lines(surface, global_squares, allowed_square)
+            self.backgrounds[key] = surface
+        return surface
+
+    # squares: (3, 3, 3, 3) or (81,), allowed: board index 0-8 or -1 for free play
+    def render(self, squares, allowed=-1):
+        board = Board.from_array(squares, None if allowed < 0 else divmod(int(allowed), 3))
+        squares = np.asarray(squares).reshape(ROWS, COLS, ROWS, COLS)
+        global_squares = board.global_squares
+        winner, winner_line_coords = board.final_global_state()
+        running = winner == 0
+
+        blits = []
+        for global_row in range(ROWS):
+            for global_col in range(COLS):
+                local_winner = global_squares[global_row, global_col]
+                if local_winner in (1, 2):
+                    blits.append((self.global_sprites[int(local_winner)], (global_col * SIZE, global_row * SIZE)))
+                    continue
+                for local_row in range(ROWS):
+                    for local_col in range(COLS):
+                        player = squares[global_row, global_col, local_row, local_col]
+                        if player != 0:
+                            position = (global_col * SIZE + local_col * LOCAL_SIZE, global_row * SIZE + local_row * LOCAL_SIZE)
+                            blits.append((self.local_sprites[int(player)], position))
+
+        self.surface.blit(self.background(global_squares, board.allowed_square, running), (0, 0))
+        self.surface.blits(blits, doreturn=False)
+        draw_win(self.surface, winner_line_coords)
+        return self.surface
+
+    # (H, W, 3) uint8 copy of the rendered frame, written into out when given
+    def render_array(self, squares, allowed=-1, out=None):
+        surface = self.render(squares, allowed)
+        # tobytes gives row-major RGB, about twice as fast as copying the transposed surfarray view
+        pixels = np.frombuffer(pygame.image.tobytes(surface, "RGB"), dtype=np.uint8).reshape(HEIGHT, WIDTH, 3)
+        if out is None:
+            return pixels.copy()
+        out[...] = pixels
+        return out
+
+# Redraws the window incrementally. Every local board is a SIZE x SIZE tile whose pixels only depend
+# on its own cells, status and allowed-square state (the grid lines between tiles are always black),
+# so a tile is only redrawn from the cached background and the sprites when its key changes.
+class ScreenRenderer(BoardRenderer):
+    def __init__(self, surface, cache_size=32):
+        super().__init__(cache_size)
+        self.surface = surface
+        self.tiles = [None] * 9
+        self.winner_line_coords = None
+        self.frame_times = deque(maxlen=120)
+        self.frames = 0
+        self.redrawn_tiles = 0
+
+    def tile_key(self, board, index, running):
+        x_mask, o_mask = board.local_masks(index)
+        allowed = board.allowed < 0 or board.allowed == index
+        return (x_mask, o_mask, board.local_status(index), allowed, running and board.allowed == index)
+
+    def invalidate(self):
+        self.tiles = [None] * 9
+
+    # draws what changed since the last call and returns the dirty rects for display.update
+    def draw(self, game):
+        start = time.perf_counter()
+        board = game.board
+        if game.winner_line_coords != self.winner_line_coords:
+            self.winner_line_coords = game.winner_line_coords
+            self.invalidate()
+
+        keys = [self.tile_key(board, index, game.running) for index in range(9)]
+        dirty = [index for index in range(9) if keys[index] != self.tiles[index]]
+        rects = []
+        if dirty:
+            # clipping changes how pygame rasterizes thick diagonal lines, so with a win line
+            # on the board the whole frame is redrawn and the line drawn once, unclipped
+            if self.winner_line_coords is not None:
+                dirty = list(range(9))
+            global_squares = board.global_squares
+            background = self.background(global_squares, board.allowed_square, game.running)
+            for index in dirty:
+                rects.append(self.draw_tile(board, index, background))
+                self.tiles[index] = keys[index]
+            if self.winner_line_coords is not None:
+                draw_win(self.surface, self.winner_line_coords)
+            self.redrawn_tiles += len(dirty)
+
+        self.frames += 1
+        self.frame_times.append(time.perf_counter() - start)
+        return rects
+
+    def draw_tile(self, board, index, background):
+        global_row, global_col = divmod(index, 3)
+        rect = pygame.Rect(global_col * SIZE, global_row * SIZE, SIZE, SIZE)
+        self.surface.blit(background, rect, rect)
+
+        status = board.local_status(index)
+        if status in (1, 2):
+            self.surface.blit(self.global_sprites[status], rect)
+        else:
+            blits = []
+            for player, mask in zip((1, 2), board.local_masks(index)):
+                while mask:
+                    low = mask & -mask
+                    local_row, local_col = divmod(low.bit_length() - 1, 3)
+                    blits.append((self.local_sprites[player], (rect.x + local_col * LOCAL_SIZE, rect.y + local_row * LOCAL_SIZE)))
+                    mask ^= low
+            self.surface.blits(blits, doreturn=False)
+        return rect
+
+    # average time spent in draw over the last frames, in milliseconds
+    def frame_time(self):
+        if not self.frame_times:
+            return 0.0
+        return 1000 * sum(self.frame_times) / len(self.frame_times)
+
+_renderer = None
+
+def _worker_renderer():
+    global _renderer
+    if _renderer is None:
+        _renderer = BoardRenderer()
+    return _renderer
+
+def _render_chunk(squares, allowed):
+    renderer = _worker_renderer()
+    images = np.empty((len(squares), HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for i in range(len(squares)):
+        renderer.render_array(squares[i], allowed[i], images[i])
+    return images
+
+def _save_chunk(squares, allowed, paths):
+    renderer = _worker_renderer()
+    for i in range(len(squares)):
+        os.makedirs(os.path.dirname(paths[i]) or ".", exist_ok=True)
+        pygame.image.save(renderer.render(squares[i], allowed[i]), paths[i])
+    return len(paths)
+
+def _chunks(n, chunk_size):
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+# squares: (N, 3, 3, 3, 3) or (N, 81), allowed: (N,) board index or -1 -> (N, HEIGHT, WIDTH, 3) uint8
+def render_batch(squares, allowed, workers=1, chunk_size=64):
+    squares = np.asarray(squares, dtype=np.int8).reshape(-1, 81)
+    allowed = np.asarray(allowed, dtype=np.int8)
+    if workers <= 1:
+        return _render_chunk(squares, allowed)
+
+    images = np.empty((len(squares), HEIGHT, WIDTH, 3), dtype=np.uint8)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = _chunks(len(squares), chunk_size)
+        futures = [executor.submit(_render_chunk, squares[a:b], allowed[a:b]) for a, b in chunks]
+        for (a, b), future in zip(chunks, futures):
+            images[a:b] = future.result()
+    return images
+
+# same as render_batch but every worker writes its PNGs directly, nothing big goes back to the parent
+def save_batch(squares, allowed, paths, workers=1, chunk_size=64):
+    squares = np.asarray(squares, dtype=np.int8).reshape(-1, 81)
+    allowed = np.asarray(allowed, dtype=np.int8)
+    if workers <= 1:
+        return _save_chunk(squares, allowed, paths)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_save_chunk, squares[a:b], allowed[a:b], paths[a:b])
+                   for a, b in _chunks(len(squares), chunk_size)]
+        return sum(future.result() for future in futures)
+
+# positions after a random number of random moves, for benchmarks and synthetic data
+def random_positions(count, seed=0):
+    rng = np.random.default_rng(seed)
+    squares = np.zeros((count, 81), dtype=np.int8)
+    allowed = np.zeros(count, dtype=np.int8)
+    for i in range(count):
+        board = Board()
+        for _ in range(rng.integers(0, 60)):
+            moves = board.legal_indices()
+            if not moves or board.global_status() != 0:
+                break
+            board.make_move(moves[rng.integers(len(moves))])
+        squares[i] = board.to_array().reshape(81)
+        allowed[i] = board.allowed
+    return squares, allowed
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Render random positions offscreen")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=None, help="folder for PNGs, only renders to memory when not set")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    squares, allowed = random_positions(args.count, args.seed)
+    start = time.time()
+    if args.output:
+        paths = [os.path.join(args.output, f"image_{i + 1}.png") for i in range(args.count)]
+        save_batch(squares, allowed, paths, args.workers)
+    else:
+        render_batch(squares, allowed, args.workers)
+    elapsed = time.time() - start
+    print(f"Rendered {args.count} images in {elapsed:.2f}s, {args.count / elapsed:.1f} images/s")
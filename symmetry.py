@@ -0,0 +1,58 @@
+# The 8 symmetries of the board (rotations and reflections, the dihedral group D4)
+#
+# A symmetry moves the global board position and the cell inside a local board the same way.
+# 0-3 rotate clockwise by 0/90/180/270 degrees like synthetic_game.rotate_coords, 4-7 reflect
+# across the vertical axis (col -> 2 - col) first and then rotate the same way.
+import numpy as np
+
+SYMMETRIES = 8
+
+def transform_coords(row, col, symmetry):
+    if symmetry >= 4:
+        col = 2 - col
+    for _ in range(symmetry % 4):
+        row, col = col, 2 - row
+    return row, col
+
+# INVERSE[s] undoes symmetry s
+INVERSE = tuple(next(t for t in range(SYMMETRIES)
+                     if all(transform_coords(*transform_coords(r, c, s), t) == (r, c) for r in range(3) for c in range(3)))
+                for s in range(SYMMETRIES))
+
+def transform_move(move, symmetry):
+    global_row, global_col, local_row, local_col = move
+    return transform_coords(global_row, global_col, symmetry) + transform_coords(local_row, local_col, symmetry)
+
+def transform_square(square, symmetry):
+    if square is None:
+        return None
+    return transform_coords(square[0], square[1], symmetry)
+
+# CELL_PERMUTATION[s][i] is where cell index i (board * 9 + cell) ends up under symmetry s
+CELL_PERMUTATION = np.array([[(lambda m: (m[0] * 3 + m[1]) * 9 + m[2] * 3 + m[3])(transform_move((i // 27, i // 9 % 3, i % 9 // 3, i % 3), s))
+                              for i in range(81)] for s in range(SYMMETRIES)])
+
+# cells: (..., 81) array in cell index order
+def transform_cells(cells, symmetry):
+    cells = np.asarray(cells)
+    out = np.empty_like(cells)
+    out[..., CELL_PERMUTATION[symmetry]] = cells
+    return out
+
+def transform_board_string(board, symmetry):
+    out = [""] * 81
+    for i, target in enumerate(CELL_PERMUTATION[symmetry]):
+        out[target] = board[i]
+    return "".join(out)
+
+# (symmetry, board, allowed square) with the smallest (board, allowed) of the 8 images,
+# transform_move(move, INVERSE[symmetry]) maps a move in the canonical frame back
+def canonical_board(board, allowed_square=None):
+    best = None
+    for symmetry in range(SYMMETRIES):
+        image = (transform_board_string(board, symmetry), transform_square(allowed_square, symmetry))
+        key = (image[0], image[1] or (-1, -1))
+        if best is None or key < best[0]:
+            best = (key, symmetry, image)
+    _, symmetry, (board, allowed_square) = best
+    return symmetry, board, allowed_square
@@ -1,6 +1,18 @@
-import json, os, re
+# Symmetry augmentation of the bot move log (the 4 rotations and 4 reflections of the board)
+#
+# usage: python synthetic_game.py [--input logs/bot_moves.jsonl] [--output logs/bot_moves_synthetic.jsonl] [--workers 8]
+#                                 [--symmetries 8] [--images numpy|render]
+# The log is read line by line, images are made in a process pool and the transformed entries are
+# written in input order as soon as their images exist. Images newer than their source are kept.
+# --images numpy flips/rotates the pixels of the logged screenshot, --images render draws the
+# transformed position from scratch with render.BoardRenderer.
+import argparse, json, os, re, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from config import *
 from PIL import Image
+from symmetry import SYMMETRIES, CELL_PERMUTATION, transform_coords
 
 ROTATION_ANGLES = [0, 90, 180, 270]
 
@@ -16,171 +28,198 @@ def rotate_coords(row, col, angle):
 
     raise ValueError ("Invalid angle.")
 
+# symmetry.py numbering: 0-3 are the rotations above, 4-7 flip left-right first and then rotate
+def symmetry_angle(symmetry):
+    return ROTATION_ANGLES[symmetry % 4]
 
-def rotate_and_save_image(original_path, new_path, angle):
-    try:
-        os.makedirs(os.path.dirname(new_path), exist_ok=True)
-
-        img = Image.open(original_path)
-        rotated_img = img.rotate(-angle, expand=True)
+def transformed_image_path(path, symmetry):
+    base, ext = os.path.splitext(path)
+    base = re.sub(r"_(rotated|flipped)_\d+$", "", base)
+    kind = "flipped" if symmetry >= 4 else "rotated"
+    return f"{base}_{kind}_{symmetry_angle(symmetry)}{ext}"
 
-        rotated_img.save(new_path)
-        print(f"  -> Generated image {new_path}")
+def is_up_to_date(original_path, new_path):
+    return os.path.exists(original_path) and os.path.exists(new_path) and os.path.getmtime(new_path) >= os.path.getmtime(original_path)
 
+# runs in the worker processes. The source frame is decoded once and every variant is a flip and
+# rot90 of its pixel buffer, so the result is exactly the source pixels moved. Returns the images written
+def transform_and_save_images(original_path, targets):
+    try:
+        img = Image.open(original_path)
+        pixels = np.asarray(img)
     except FileNotFoundError:
         print(f"  -> WARNING: Original image not found at {original_path}. Skipping image generation.")
+        return 0
+    except Exception as e:
+        print(f"  -> ERROR reading image {original_path}: {e}")
+        return 0
+
+    written = 0
+    for new_path, symmetry in targets:
+        try:
+            os.makedirs(os.path.dirname(new_path) or ".", exist_ok=True)
+            out = pixels[:, ::-1] if symmetry >= 4 else pixels
+            out = Image.fromarray(np.ascontiguousarray(np.rot90(out, k=-(symmetry % 4))))
+            if img.mode == "P":
+                out.putpalette(img.getpalette())
+            out.save(new_path)
+            written += 1
+        except Exception as e:
+            print(f"  -> ERROR transforming image {original_path}: {e}")
+    return written
+
+# runs in the worker processes, draws the transformed positions with render.BoardRenderer. Unlike the
+# pixel transform this is what the game would show for the position (line widths and the figure
+# sprites are not symmetric to the pixel), at the cost of a full render per variant
+def render_and_save_images(squares, allowed, paths):
+    # pygame is only needed for rendered images
+    import render
+    try:
+        return render.save_batch(squares, allowed, paths)
     except Exception as e:
-        print(f"  -> ERROR rotating image {original_path}: {e}")
+        print(f"  -> ERROR rendering images {paths[0]}: {e}")
+        return 0
 
-def rotate_cot_text(text, angle):
-    if angle == 0:
+def transform_cot_text(text, symmetry):
+    if symmetry == 0:
         return text
 
-    def rotate_func(r, c, a):
-        if a == 90: return c, 2 - r
-        if a == 180: return 2 - r, 2 - c
-        if a == 270: return 2 - c, r
-        return r, c
-
-    # 1. Rotate structured dictionary-like blocks in text
+    # 1. Transform structured dictionary-like blocks in text
     def fix_block(match):
         # Extract digits: gr, gc, lr, lc
         d = [int(x) for x in re.findall(r'\d+', match.group(0))]
-        ngr, ngc = rotate_func(d[0], d[1], angle)
-        nlr, nlc = rotate_func(d[2], d[3], angle)
-        return f"{{global_row: {ngr}, global_col: {ngc}, local_row: {nlr}, local_col: {ngc}}}"
+        ngr, ngc = transform_coords(d[0], d[1], symmetry)
+        nlr, nlc = transform_coords(d[2], d[3], symmetry)
+        return f"{{global_row: {ngr}, global_col: {ngc}, local_row: {nlr}, local_col: {nlc}}}"
 
-    text = re.sub(r'\{global_row: \d+, global_col: \d+, local_row: \d+, local_col: \d+\}', fix_block, text)
+    text = re.sub(r'\{global_row: [0-2], global_col: [0-2], local_row: [0-2], local_col: [0-2]\}', fix_block, text)
 
-    # 2. Rotate all free-text coordinate pairs (r, c)
+    # 2. Transform all free-text coordinate pairs (r, c)
     def fix_pair(match):
         r, c = int(match.group(1)), int(match.group(2))
-        nr, nc = rotate_func(r, c, angle)
+        nr, nc = transform_coords(r, c, symmetry)
         return f"({nr}, {nc})"
 
-    text = re.sub(r'\((\d)\s*,\s*(\d)\)', fix_pair, text)
+    text = re.sub(r'\(([0-2])\s*,\s*([0-2])\)', fix_pair, text)
     return text
 
-def rotate_log_entry(original_log, angle):
-    if angle == 0:
-        return original_log.copy()
+def rotate_cot_text(text, angle):
+    return transform_cot_text(text, ROTATION_ANGLES.index(angle))
 
-    new_log = original_log.copy()
+def cell_index(cell):
+    return (cell["global_row"] * 3 + cell["global_col"]) * 9 + cell["local_row"] * 3 + cell["local_col"]
 
-    # image rotation
-    path = original_log["image path"]
-    if angle == 0:
-        new_image_path = path
-    else:
-        base, ext = os.path.splitext(path)
-        if "_rotated_" in base:
-            base = base.rsplit("_rotated_", 1)[0]
-        new_image_path = f"{base}_rotated_{angle}{ext}"
-
-        rotate_and_save_image(path, new_image_path, angle)
-    new_log["image path"] = new_image_path
-
-    # best move
-    gr, gc, lr, lc = (
-        original_log["best move"]["global_row"],
-        original_log["best move"]["global_col"],
-        original_log["best move"]["local_row"],
-        original_log["best move"]["local_col"],
-    )
-    new_best_move_gr, new_best_move_gc, = rotate_coords(gr, gc, angle)
-    new_best_move_lr, new_best_move_lc = rotate_coords(lr, lc, angle)
-
-    new_log["best move"] = {
-        "global_row": new_best_move_gr, "global_col": new_best_move_gc,
-        "local_row": new_best_move_lr, "local_col": new_best_move_lc,
-    }
-
-    new_legal_moves = []
-    for move in original_log["legal moves"]:
-        new_legal_move_gr, new_legal_move_gc = rotate_coords(move["global_row"], move["global_col"], angle)
-        new_legal_move_lr, new_legal_move_lc = rotate_coords(move["local_row"], move["local_col"], angle)
-
-        new_legal_moves.append({
-            "global_row": new_legal_move_gr, "global_col": new_legal_move_gc,
-            "local_row": new_legal_move_lr, "local_col": new_legal_move_lc,
-        })
-    new_log["legal moves"] = new_legal_moves
-
-    new_global_state = []
+def index_cell(index):
+    global_row, global_col = divmod(index // 9, 3)
+    local_row, local_col = divmod(index % 9, 3)
+    return {"global_row": int(global_row), "global_col": int(global_col), "local_row": int(local_row), "local_col": int(local_col)}
+
+# the entry under the given symmetries, the images are written by the workers. The state, best move,
+# legal moves and allowed square are turned into cell indices and mapped through CELL_PERMUTATION
+# for all symmetries in one lookup
+def transform_log_entry(original_log, symmetries=range(SYMMETRIES)):
+    symmetries = list(symmetries)
+    permutation = CELL_PERMUTATION[symmetries]
+
+    cells = np.zeros(81, dtype=np.int8)
     for cell in original_log["global state"]:
-        new_gr, new_gc = rotate_coords(cell["global_row"], cell["global_col"], angle)
-        new_lr, new_lc = rotate_coords(cell["local_row"], cell["local_col"], angle)
-        new_global_state.append({
-            "global_row": new_gr, "global_col": new_gc,
-            "local_row": new_lr, "local_col": new_lc,
-            "player": cell["player"]
-        })
-    new_log["global state"] = new_global_state
+        cells[cell_index(cell)] = cell["player"]
+    # states[k, permutation[k, i]] = cells[i]
+    states = np.empty((len(symmetries), 81), dtype=np.int8)
+    states[np.arange(len(symmetries))[:, None], permutation] = cells
 
+    # the centre of a local board stays the centre of the board it is moved to
     allowed_square = original_log["allowed squares"]
-    new_allowed_square = None
+    moves = [cell_index(original_log["best move"])] + [cell_index(move) for move in original_log["legal moves"]]
     if allowed_square is not None:
-        ar, ac = rotate_coords(allowed_square[0], allowed_square[1], angle)
-        new_allowed_square = [ar, ac]
-
-    new_log["allowed squares"] = new_allowed_square
-    return new_log
-
-def process_log_rotation(original_log: list[dict]) -> dict:
-    print("Processing Logs...")
-    base_log = original_log
-
-    rotated_logs = {
-        0: [],
-        90: [],
-        180: [],
-        270: []
-    }
-
-    for entry in base_log:
-        for angle in ROTATION_ANGLES:
-            rotated_entry = rotate_log_entry(entry, angle)
-            rotated_logs[angle].append(rotated_entry)
-
-    print("\n--- Processing Complete ---")
-    return rotated_logs
-
-def save_logs_to_jsonl(all_logs: dict):
-    output_lines = []
-
-    original_logs = all_logs.get(0, [])
-
-    num_entries = len(original_logs)
-
-    for i in range(num_entries):
-        for angle in ROTATION_ANGLES:
-            log_list = all_logs.get(angle, [])
-            if i < len(log_list):
-                entry = log_list[i]
-                data = entry.copy()
-                data['rotation_angle'] = angle
-                output_lines.append(json.dumps(data) + '\n')
-
-    try:
-        os.makedirs(os.path.dirname(SYNTHETIC_LOG_FILE_PATH), exist_ok=True)
-        with open(SYNTHETIC_LOG_FILE_PATH, 'w') as f:
-            f.writelines(output_lines)
-        print(f"\nSuccessfully wrote {len(output_lines)} lines to: {SYNTHETIC_LOG_FILE_PATH}")
-    except Exception as e:
-        print(f"\nWARNING: Could not write file to {SYNTHETIC_LOG_FILE_PATH}. Error: {e}")
-
-    print(f"\nFile writing simulation complete. Total {len(output_lines)} lines prepared.")
+        moves.append((allowed_square[0] * 3 + allowed_square[1]) * 9 + 4)
+    moves = permutation[:, moves]
+
+    new_logs = []
+    for k, symmetry in enumerate(symmetries):
+        new_log = original_log.copy()
+        new_log["image path"] = original_log["image path"] if symmetry == 0 else transformed_image_path(original_log["image path"], symmetry)
+        new_log["best move"] = index_cell(moves[k, 0])
+        new_log["legal moves"] = [index_cell(index) for index in moves[k, 1:len(original_log["legal moves"]) + 1]]
+        new_log["global state"] = [dict(index_cell(index), player=int(player)) for index, player in enumerate(states[k])]
+        new_log["allowed squares"] = None if allowed_square is None else list(divmod(int(moves[k, -1]) // 9, 3))
+        if new_log.get("chain of thought"):
+            new_log["chain of thought"] = transform_cot_text(new_log["chain of thought"], symmetry)
+        # a reflection is no rotation of the original, its rotation_angle is null and only the
+        # untouched entry has 0 (train_model.ipynb trains the MOVE task on those)
+        new_log["rotation_angle"] = symmetry_angle(symmetry) if symmetry < 4 else None
+        new_log["symmetry"] = symmetry
+        new_logs.append((new_log, states[k], -1 if allowed_square is None else int(moves[k, -1]) // 9))
+    return new_logs
+
+def read_log(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def augment_log(input_path=LOG_FILE_PATH, output_path=SYNTHETIC_LOG_FILE_PATH, workers=os.cpu_count(), max_pending=1024,
+                symmetries=SYMMETRIES, images="numpy"):
+    print(f"Augmenting {input_path} -> {output_path} with {symmetries} symmetries, {images} images, {workers} workers")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    stats = {"entries": 0, "lines": 0, "images": 0, "failed": 0, "up_to_date": 0}
+    # (output lines, [(image future, images submitted)]) of each entry in input order
+    pending = deque()
+    start_time = time.time()
+
+    # writes the finished entries at the head, waits for the head while more than limit are queued
+    def write_finished(f, limit):
+        while pending and (len(pending) > limit or all(future.done() for future, _ in pending[0][1])):
+            lines, futures = pending.popleft()
+            for future, count in futures:
+                written = future.result()
+                stats["images"] += written
+                stats["failed"] += count - written
+            f.writelines(lines)
+            stats["lines"] += len(lines)
+
+    def report():
+        elapsed = max(time.time() - start_time, 1e-9)
+        print(f"  {stats['entries']} entries, {stats['images']} images ({stats['images'] / elapsed:.1f} imgs/s), "
+              f"{stats['up_to_date']} up to date, {stats['failed']} failed")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(output_path, "w") as f:
+        for entry in read_log(input_path):
+            lines, targets = [], []
+            for new_entry, squares, allowed in transform_log_entry(entry, range(symmetries)):
+                lines.append(json.dumps(new_entry) + "\n")
+                if new_entry["symmetry"] == 0:
+                    continue
+                if is_up_to_date(entry["image path"], new_entry["image path"]):
+                    stats["up_to_date"] += 1
+                else:
+                    targets.append((new_entry["image path"], new_entry["symmetry"], squares, allowed))
+
+            futures = []
+            if targets and images == "render":
+                paths, _, squares, allowed = zip(*targets)
+                futures.append((executor.submit(render_and_save_images, np.array(squares), np.array(allowed), list(paths)), len(targets)))
+            elif targets:
+                futures.append((executor.submit(transform_and_save_images, entry["image path"],
+                                                [(path, symmetry) for path, symmetry, _, _ in targets]), len(targets)))
+            pending.append((lines, futures))
+            stats["entries"] += 1
+            write_finished(f, max_pending)
+            if stats["entries"] % 500 == 0:
+                report()
+        write_finished(f, 0)
+
+    report()
+    print(f"\nWrote {stats['lines']} lines to {output_path} in {time.time() - start_time:.1f}s")
+    return stats
 
 if __name__ == "__main__":
-    print(f"Attempting to read log entries from: {LOG_FILE_PATH}")
-    original_log_file = []
-
-    try:
-        with open(LOG_FILE_PATH, 'r') as f:
-            for line in f:
-                original_log_file.append(json.loads(line))
-    except Exception as e:
-        print(f"WARNING: Actual file reading failed (Error: {e}). Using mock data for execution.")
-
-    new_logs = process_log_rotation(original_log_file)
-    save_logs_to_jsonl(new_logs)
+    parser = argparse.ArgumentParser(description="Symmetry augmentation of the bot move log")
+    parser.add_argument("--input", default=LOG_FILE_PATH)
+    parser.add_argument("--output", default=SYNTHETIC_LOG_FILE_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="image processes")
+    parser.add_argument("--symmetries", type=int, choices=(4, 8), default=SYMMETRIES, help="4 for the rotations only")
+    parser.add_argument("--images", choices=("numpy", "render"), default="numpy",
+                        help="transform the logged screenshot's pixels or render the transformed position")
+    args = parser.parse_args()
+    augment_log(args.input, args.output, args.workers, symmetries=args.symmetries, images=args.images)
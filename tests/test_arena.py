@@ -0,0 +1,51 @@
+import pytest
+
+import arena
+from arena import play_game
+
+# the searching bot used to corrupt the live game and forfeit after a ply or two
+def test_minimax_game_is_played_out():
+    result = play_game(0, "minimax:max_time=0.05", "random", 0)
+    assert len(result["moves"]) > 10
+    assert result["winner"] in (1, 2, -1)
+
+class ChangesTheBoard:
+    def get_bot_move(self, game):
+        move = game.get_legal_moves()[0]
+        game.play_move(*move)
+        return move
+
+# a bot that plays on the copy it was handed is caught on its first move
+def test_bot_changing_its_board_is_caught(monkeypatch):
+    monkeypatch.setattr(arena, "make_bot", lambda spec, player, seed: ChangesTheBoard())
+    with pytest.raises(RuntimeError):
+        play_game(0, "x", "o", 0)
+
+def test_spec_parsing_and_schedule():
+    assert arena.parse_bot_spec("minimax:max_time=0.2,workers=2") == ("minimax", {"max_time": 0.2, "workers": 2})
+    with pytest.raises(ValueError):
+        arena.parse_bot_spec("alphazero")
+    jobs = arena.schedule(["a", "b", "c"], 4, 10)
+    assert len(jobs) == 12 and len({seed for *_, seed in jobs}) == 12
+    # every pair plays as X and as O equally often
+    assert sum(x == "a" and o == "b" for _, x, o, _ in jobs) == sum(x == "b" and o == "a" for _, x, o, _ in jobs) == 2
+
+def test_scores_and_elo():
+    results = [{"x": "a", "o": "b", "winner": 1}, {"x": "b", "o": "a", "winner": 2}, {"x": "a", "o": "b", "winner": -1},
+               {"x": "b", "o": "a", "winner": 1}]
+    scores = arena.pair_scores(results)
+    assert scores[("a", "b")] == [2, 1, 1] and scores[("b", "a")] == [1, 1, 2]
+    score, low, high = arena.score_interval(*scores[("a", "b")])
+    assert score == 0.625 and low < score < high
+    assert arena.elo_difference(0.5) == 0 and round(arena.elo_difference(0.75)) == 191
+    assert arena.elo_difference(1.0) > 1000
+
+def test_run_arena_writes_every_game(tmp_path):
+    import gzip, json
+
+    output = str(tmp_path / "arena.jsonl.gz")
+    results = arena.run_arena(["random", "mcts:max_time=0.01"], 2, 2, output, 0)
+    with gzip.open(output, "rt") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(results) == len(lines) == 2
+    assert sorted(line["game"] for line in lines) == [0, 1]
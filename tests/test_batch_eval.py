@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+
+from batch_eval import evaluate_batch
+from TTT_bot import UltimateTTTBot
+from uttt_engine import BitBoard
+
+def random_positions(seed, count):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = BitBoard()
+        while board.global_status() == 0 and board.legal_indices():
+            board.make_move(rng.choice(board.legal_indices()))
+            positions.append(board.copy())
+    return positions
+
+# the same terms in the same order, so the scores are equal, not only close
+def test_batch_scores_equal_the_scalar_heuristic():
+    positions = random_positions(0, 400)
+    squares = np.stack([board.to_array() for board in positions])
+    free_play = [board.allowed < 0 for board in positions]
+    for player in (1, 2):
+        bot = UltimateTTTBot(player, tt_size=0)
+        assert evaluate_batch(squares, free_play, player).tolist() == [bot.evaluate(board) for board in positions]
+
+def test_children_are_scored_like_the_positions_they_lead_to():
+    for board in random_positions(1, 50)[::5]:
+        if board.global_status() != 0:
+            continue
+        bot = UltimateTTTBot(board.player, tt_size=0)
+        moves = board.legal_indices()
+        expected = []
+        for move in moves:
+            undo = board.make_move(move)
+            expected.append(bot.evaluate(board))
+            board.unmake_move(undo)
+        assert bot.evaluate_children(board, moves).tolist() == expected
@@ -0,0 +1,43 @@
+import numpy as np
+
+from board_tables import LINE_SCORE_LIST, OPEN_TWOS_LIST, STATUS_LIST, build_tables, check_win, load_tables, mask_index, save_tables
+from TTT_bot import UltimateTTTBot
+from uttt_engine import FULL_MASK, LINES, mask_status
+
+def masks():
+    for x_mask in range(1 << 9):
+        o_mask = FULL_MASK & ~x_mask
+        # every subset of the cells X does not hold
+        sub = o_mask
+        while True:
+            yield x_mask, sub
+            if sub == 0:
+                break
+            sub = (sub - 1) & o_mask
+
+# every one of the 3 ** 9 grids against the bitboard rules and the scalar line heuristic
+def test_tables_match_the_scalar_functions():
+    bots = {player: UltimateTTTBot(player, tt_size=0) for player in (1, 2)}
+    count = 0
+    for x_mask, o_mask in masks():
+        index = mask_index(x_mask, o_mask)
+        empty = FULL_MASK & ~(x_mask | o_mask)
+        assert STATUS_LIST[index] == mask_status(x_mask, o_mask)
+        assert LINE_SCORE_LIST[1][index] == bots[1].evaluate_lines(x_mask, o_mask, empty)
+        assert LINE_SCORE_LIST[2][index] == bots[2].evaluate_lines(o_mask, x_mask, empty)
+        assert OPEN_TWOS_LIST[1][index] == sum(bin(x_mask & line).count("1") == 2 and bool(empty & line) for line in LINES)
+        count += 1
+    assert count == 3 ** 9
+
+def test_check_win_on_global_boards_with_draws():
+    assert check_win([[1, 1, 1], [0, 2, 2], [0, 0, 0]]) == 1
+    assert check_win([[2, 1, 1], [-1, 2, 1], [1, -1, 2]]) == 2
+    assert check_win([[-1, 1, 2], [-1, 2, 1], [-1, 1, 0]]) == -1
+    assert check_win([[-1, 1, 2], [2, 1, 1], [1, 2, 2]]) == -1
+    assert check_win(np.zeros((3, 3))) == 0
+
+def test_saved_tables_load_back(tmp_path):
+    path = str(tmp_path / "tables.npz")
+    save_tables(path)
+    loaded, built = load_tables(path), build_tables()
+    assert all(np.array_equal(loaded[name], built[name]) for name in built)
@@ -0,0 +1,99 @@
+import json, random
+
+import numpy as np
+import pyarrow as pa
+from PIL import Image
+
+from compact_dataset import (CompactDataset, ascii_board, board_status, compact_log, compact_table, index_move, load_compact,
+                             move_index, save_compact, unplayable_boards)
+from dataset_builder import SCHEMA, build_row
+from synthetic_game import transform_log_entry
+from uttt_engine import Game
+
+KEYS = ("global_row", "global_col", "local_row", "local_col")
+
+# the 8 synthetic log entries of one random position, with a small PNG for each
+def log_entries(seed, tmp_path):
+    rng = random.Random(seed)
+    game = Game()
+    for _ in range(rng.randint(2, 12)):
+        game.play_move(*rng.choice(game.get_legal_moves()))
+    squares = game.board.to_array().reshape(81).astype(int)
+    legal = [dict(zip(KEYS, move)) for move in game.get_legal_moves()]
+    entry = {
+        "player": game.player,
+        "image path": str(tmp_path / f"image_{seed}.png"),
+        "legal moves": legal,
+        "allowed squares": list(game.allowed_square) if game.allowed_square is not None else None,
+        "global state": [dict(zip(KEYS, divmod(index // 9, 3) + divmod(index % 9, 3)), player=int(squares[index])) for index in range(81)],
+        "best move": rng.choice(legal),
+        "chain of thought": f"position {seed}",
+    }
+    entries = [new_log for new_log, _, _ in transform_log_entry(entry)]
+    for i, entry in enumerate(entries):
+        Image.new("RGB", (16, 16), (i * 30, seed, 0)).save(entry["image path"])
+    return entries
+
+def write_log(path, entries):
+    with open(path, "w") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+def test_move_index_and_index_move_are_inverse():
+    assert [move_index(index_move(index)) for index in range(81)] == list(range(81))
+    assert index_move(move_index({"global_row": 2, "global_col": 0, "local_row": 1, "local_col": 2})) == \
+        {"global_row": 2, "global_col": 0, "local_row": 1, "local_col": 2}
+
+# expand gives back the log entry, including the null rotation_angle of the reflections
+def test_compact_log_expands_to_the_log_entries(tmp_path):
+    entries = log_entries(0, tmp_path) + log_entries(1, tmp_path)
+    write_log(tmp_path / "log.jsonl", entries)
+    dataset = CompactDataset(compact_log(str(tmp_path / "log.jsonl")))
+    assert len(dataset) == len(entries)
+    for i, entry in enumerate(entries):
+        row = dataset.expand(i)
+        assert row["global_state"] == entry["global state"]
+        assert row["legal_moves"] == entry["legal moves"]
+        assert row["best_move"] == entry["best move"]
+        assert row["allowed_squares"] == entry["allowed squares"]
+        assert (row["player"], row["chain_of_thought"]) == (entry["player"], entry["chain of thought"])
+        assert row["rotation_angle"] == entry["rotation_angle"]
+        assert row["image"]["path"] == entry["image path"]
+        with open(entry["image path"], "rb") as f:
+            assert row["image"]["bytes"] == f.read()
+    assert dataset.symmetries.tolist() == [entry["symmetry"] for entry in entries]
+
+# the dataset parquet and the log give the same compact columns
+def test_compact_table_matches_compact_log(tmp_path):
+    entries = log_entries(2, tmp_path)
+    write_log(tmp_path / "log.jsonl", entries)
+    from_log = compact_log(str(tmp_path / "log.jsonl"))
+    from_table = compact_table(pa.Table.from_pylist([build_row(entry) for entry in entries], schema=SCHEMA))
+    assert from_table.drop(["image"]).equals(from_log.drop(["image"]))
+    assert from_table["image"].combine_chunks().field("bytes").equals(from_log["image"].combine_chunks().field("bytes"))
+
+def test_saved_files_load_back(tmp_path):
+    entries = log_entries(3, tmp_path)
+    write_log(tmp_path / "log.jsonl", entries)
+    table = compact_log(str(tmp_path / "log.jsonl"))
+    for name in ["data.compact.arrow", "data.compact.parquet"]:
+        save_compact(table, str(tmp_path / name))
+        dataset = load_compact(str(tmp_path / name))
+        assert dataset.table.equals(table)
+        assert (dataset.boards == np.stack([np.array([cell["player"] for cell in entry["global state"]]) for entry in entries])).all()
+        assert [dataset.legal_moves(i).tolist() for i in range(len(dataset))] == \
+            [[move_index(move) for move in entry["legal moves"]] for entry in entries]
+    boards_only = load_compact(str(tmp_path / "data.compact.arrow"), columns=["board", "best_move"])
+    assert boards_only.players is None and boards_only.best_moves.tolist() == table["best_move"].to_pylist()
+
+def test_board_status_and_ascii_board():
+    board = np.zeros(81, dtype=np.int8)
+    board[0:3] = 1
+    board[4 * 9:5 * 9] = [1, 2, 1, 1, 2, 2, 2, 1, 1]
+    board[8 * 9 + 2] = 2
+    assert board_status(board).tolist() == [1, 0, 0, 0, -1, 0, 0, 0, 0]
+    assert board_status(np.stack([board, np.zeros(81)])).shape == (2, 9)
+    assert unplayable_boards(board_status(board)) == [{"global_row": 0, "global_col": 0}, {"global_row": 1, "global_col": 1}]
+    text = ascii_board(board).split("\n\n")
+    assert len(text) == 9
+    assert text[0].splitlines() == ["=== Global Board [Row 0, Col 0] ===", "    0 1 2", "   -------", "0 | X X X", "1 | . . .", "2 | . . ."]
+    assert text[8].splitlines()[3] == "0 | . . O"
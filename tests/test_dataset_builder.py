@@ -0,0 +1,102 @@
+import json, os, random
+
+import pyarrow.parquet as pq
+from PIL import Image
+
+from compact_dataset import compact_path, load_compact
+from dataset_builder import build_dataset, build_row, file_sha256, split_of
+from synthetic_game import transform_log_entry
+from uttt_engine import Game
+
+KEYS = ("global_row", "global_col", "local_row", "local_col")
+SPLITS = {"train": 0.5, "test": 0.25, "evaluate": 0.25}
+
+# the 8 synthetic log lines of one random position, with a small PNG for each
+def log_lines(seed, tmp_path):
+    rng = random.Random(seed)
+    game = Game()
+    for _ in range(rng.randint(2, 12)):
+        game.play_move(*rng.choice(game.get_legal_moves()))
+    squares = game.board.to_array().reshape(81).astype(int)
+    legal = [dict(zip(KEYS, move)) for move in game.get_legal_moves()]
+    entry = {
+        "player": game.player,
+        "image path": str(tmp_path / "screens" / f"image_{seed}.png"),
+        "legal moves": legal,
+        "allowed squares": list(game.allowed_square) if game.allowed_square is not None else None,
+        "global state": [dict(zip(KEYS, divmod(index // 9, 3) + divmod(index % 9, 3)), player=int(squares[index])) for index in range(81)],
+        "best move": rng.choice(legal),
+        "chain of thought": f"position {seed}",
+    }
+    os.makedirs(tmp_path / "screens", exist_ok=True)
+    lines = []
+    for i, (new_log, _, _) in enumerate(transform_log_entry(entry)):
+        Image.new("RGB", (16, 16), (i * 30, seed, 0)).save(new_log["image path"])
+        lines.append(json.dumps(new_log) + "\n")
+    return lines
+
+def shard_times(output_dir):
+    shards = os.path.join(output_dir, "shards")
+    return {name: os.stat(os.path.join(shards, name)).st_mtime_ns for name in os.listdir(shards)}
+
+# all symmetries of a position share a split, and the fractions hold over many positions
+def test_split_of_groups_symmetries():
+    assert {split_of(f"screens/image_7_{kind}_{angle}.png") for kind in ["rotated", "flipped"] for angle in [0, 90, 180, 270]} == \
+        {split_of("screens/image_7.png")}
+    counts = {split: 0 for split in SPLITS}
+    for i in range(4000):
+        counts[split_of(f"screens/image_{i}.png", SPLITS)] += 1
+    assert abs(counts["train"] - 2000) < 150 and abs(counts["test"] - 1000) < 120
+    assert split_of("screens/image_7.png", {"train": 1.0}) == "train"
+
+# an entry without a rotation_angle is an original position, the same default as compact_log
+def test_build_row_defaults(tmp_path):
+    entry = json.loads(log_lines(0, tmp_path)[0])
+    del entry["rotation_angle"], entry["symmetry"]
+    row = build_row(entry)
+    assert (row["rotation_angle"], row["symmetry"]) == (0, 0)
+
+def test_manifest_matches_the_split_files(tmp_path):
+    lines = [line for seed in range(5) for line in log_lines(seed, tmp_path)]
+    (tmp_path / "log.jsonl").write_text("".join(lines))
+    output_dir = str(tmp_path / "dataset")
+    manifest = build_dataset(str(tmp_path / "log.jsonl"), output_dir, workers=2, partition_size=16, row_group_size=4, splits=SPLITS)
+
+    assert manifest["log_lines"] == 40 and [partition["lines"] for partition in manifest["partitions"]] == [16, 16, 8]
+    assert sum(split["rows"] for split in manifest["splits"].values()) == 40
+    for name, split in manifest["splits"].items():
+        path = os.path.join(output_dir, split["file"])
+        assert pq.ParquetFile(path).metadata.num_rows == split["rows"]
+        assert file_sha256(path) == split["sha256"] and file_sha256(compact_path(path)) == split["compact_sha256"]
+        # rows are in log order and every position is in a single split
+        paths = pq.read_table(path, columns=["chain_of_thought"])["chain_of_thought"].to_pylist()
+        expected = [json.loads(line)["chain of thought"] for line in lines if split_of(json.loads(line)["image path"], SPLITS) == name]
+        assert paths == expected
+        assert len(load_compact(compact_path(path))) == split["rows"]
+    with open(os.path.join(output_dir, "manifest.json")) as f:
+        assert json.load(f) == manifest
+
+# a rebuild of the same log keeps every shard, appended lines only rebuild the partitions they touch
+def test_rebuild_is_incremental(tmp_path):
+    lines = [line for seed in range(5) for line in log_lines(seed, tmp_path)]
+    (tmp_path / "log.jsonl").write_text("".join(lines))
+    output_dir = str(tmp_path / "dataset")
+    options = {"workers": 1, "partition_size": 16, "row_group_size": 4, "splits": SPLITS}
+    first = build_dataset(str(tmp_path / "log.jsonl"), output_dir, **options)
+    times = shard_times(output_dir)
+
+    assert build_dataset(str(tmp_path / "log.jsonl"), output_dir, **options) == first
+    assert shard_times(output_dir) == times
+
+    with open(tmp_path / "log.jsonl", "a") as f:
+        f.writelines(log_lines(5, tmp_path))
+    second = build_dataset(str(tmp_path / "log.jsonl"), output_dir, **options)
+    assert second["partitions"][:2] == first["partitions"][:2] and len(second["partitions"]) == 3
+    assert second["partitions"][2]["lines"] == 16
+    after = shard_times(output_dir)
+    assert all(after[name] == time for name, time in times.items() if "-00002" not in name)
+    assert all(after[name] != time for name, time in times.items() if "-00002" in name)
+    assert sum(split["rows"] for split in second["splits"].values()) == 48
+
+    forced = build_dataset(str(tmp_path / "log.jsonl"), output_dir, force=True, **options)
+    assert forced["splits"] == second["splits"]
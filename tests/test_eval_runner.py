@@ -0,0 +1,98 @@
+import io, json, random
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from PIL import Image
+
+import eval_runner
+from dataset_builder import SCHEMA
+from eval_runner import build_tasks, load_results, score_task, summarize
+from uttt_engine import Game
+
+KEYS = ("global_row", "global_col", "local_row", "local_col")
+
+def sample(seed):
+    rng = random.Random(seed)
+    game = Game()
+    for _ in range(rng.randint(2, 12)):
+        game.play_move(*rng.choice(game.get_legal_moves()))
+    squares = game.board.to_array().reshape(81).astype(int)
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), (230, 217, 200)).save(buffer, format="PNG")
+    legal = [dict(zip(KEYS, move)) for move in game.get_legal_moves()]
+    return {
+        "image": {"bytes": buffer.getvalue(), "path": None},
+        "player": game.player,
+        "allowed_squares": list(game.allowed_square) if game.allowed_square is not None else None,
+        "legal_moves": legal,
+        "best_move": legal[0],
+        "global_state": [dict(zip(KEYS, divmod(index // 9, 3) + divmod(index % 9, 3)), player=int(squares[index])) for index in range(81)],
+    }
+
+def perfect_answer(task_name, truth):
+    allowed = None if truth["allowed"] is None else {"global_row": truth["allowed"][0], "global_col": truth["allowed"][1]}
+    return {"ALLOWED_SQUARE": {"allowed_square": allowed},
+            "MOVE": {"allowed_square": allowed, "best_move": truth["best_move"]},
+            "STATE": {"grid_matrix": truth["matrix"]},
+            "LEGALITY": {"is_legal": truth["is_legal"]}}[task_name]
+
+# the probed subgrid depends on the sample and the seed only, so a resumed run asks the same questions
+def test_tasks_are_reproducible():
+    for index in range(10):
+        tasks, truth = build_tasks(index, sample(index), seed=3)
+        assert (tasks, truth) == build_tasks(index, sample(index), seed=3)
+        gr, gc = map(int, tasks[2][1].split("(")[1].split(")")[0].split(", "))
+        cells = {tuple(cell[k] for k in KEYS): cell["player"] for cell in sample(index)["global_state"]}
+        assert truth["matrix"] == [[".XO"[cells[(gr, gc, lr, lc)]] for lc in range(3)] for lr in range(3)]
+
+def test_perfect_answers_score_every_metric():
+    results = {}
+    for index in range(6):
+        tasks, truth = build_tasks(index, sample(index))
+        results[index] = {"tasks": {name: {"scores": score_task(name, perfect_answer(name, truth), truth)} for name, _ in tasks}}
+    metrics = summarize(results)
+    assert metrics["json_success"] == metrics["total_tasks"] == 24
+    for hit, total in (("active_grid_task_acc", "total_active_task"), ("move_legal", "total_move"), ("move_exact", "total_move"),
+                       ("move_active_grid", "total_move"), ("state_exact", "total_state"), ("legality_acc", "total_legality")):
+        assert metrics[hit] == metrics[total] == 6
+    assert summarize({0: {"tasks": {"MOVE": {"scores": score_task("MOVE", None, truth)}}}})["json_success"] == 0
+
+# a run with the other decoding setting starts over instead of resuming
+def test_results_resume_only_with_the_same_setting(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with open(path, "w") as f:
+        for index, constrained in [(0, False), (1, True), (2, False)]:
+            f.write(json.dumps({"dataset": "test.parquet", "index": index, "constrained": constrained, "tasks": {}}) + "\n")
+        f.write(json.dumps({"dataset": "other.parquet", "index": 3, "constrained": False, "tasks": {}}) + "\n")
+        f.write('{"dataset": "test.parquet", "ind')
+
+    assert sorted(load_results(str(path), "test.parquet", False)) == [0, 2]
+    assert sorted(load_results(str(path), "test.parquet", True)) == [1]
+    assert load_results(str(tmp_path / "missing.jsonl"), "test.parquet") == {}
+
+class Model:
+    def eval(self):
+        pass
+
+class Generator:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, batch_messages, max_new_tokens, logits_processor):
+        self.prompts += [messages[1]["content"][0]["text"] for messages in batch_messages]
+        return ['{"allowed_square": null, "is_legal": true}'] * len(batch_messages)
+
+# a second run with a larger limit only asks the samples the first one did not finish
+def test_run_eval_resumes(tmp_path):
+    data_path, output_path = str(tmp_path / "test.parquet"), str(tmp_path / "results.jsonl")
+    pq.write_table(pa.Table.from_pylist([sample(seed) for seed in range(5)], schema=SCHEMA), data_path)
+
+    generator = Generator()
+    eval_runner.run_eval(Model(), None, data_path, output_path, batch_size=8, num_workers=0, limit=2, generator=generator)
+    assert len(generator.prompts) == 8
+    metrics = eval_runner.run_eval(Model(), None, data_path, output_path, batch_size=8, num_workers=0, limit=5, generator=generator)
+    assert len(generator.prompts) == 20 and metrics["total_tasks"] == 20
+    with open(output_path) as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted(line["index"] for line in lines) == list(range(5))
+    assert all(line["constrained"] is False and len(line["tasks"]) == 4 for line in lines)
@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from PIL import Image
+
+from image_store import ImageStore, build_from_parquet, image_id, open_store
+
+def write_split(path, colors):
+    images = []
+    for color in colors:
+        buffer = io.BytesIO()
+        Image.new("RGB", (24, 24), color).save(buffer, format="PNG")
+        images.append({"bytes": buffer.getvalue(), "path": None})
+    pq.write_table(pa.table({"image": images}), path)
+
+def test_frames_are_read_by_split_and_row(tmp_path):
+    data_path = str(tmp_path / "test.parquet")
+    write_split(data_path, [(255, 0, 0), (0, 255, 0), (0, 0, 255)])
+    build_from_parquet([data_path], str(tmp_path / "images"), size=8, shard_size=2, workers=1)
+
+    store = ImageStore(str(tmp_path / "images"))
+    assert len(store) == 3 and len(store.shard_files) == 2
+    assert store.batch([image_id(data_path, row) for row in range(3)]).shape == (3, 8, 8, 3)
+    assert (store[image_id(data_path, 2)] == np.array([0, 0, 255], dtype=np.uint8)).all()
+    store.check(data_path)
+
+# the ids are row positions, a store of an older version of the split must not be used
+def test_store_of_a_rebuilt_split_is_refused(tmp_path):
+    data_path = str(tmp_path / "test.parquet")
+    write_split(data_path, [(255, 0, 0), (0, 255, 0)])
+    build_from_parquet([data_path], str(tmp_path / "images"), size=8, workers=1)
+    write_split(data_path, [(0, 255, 0), (255, 0, 0)])
+
+    with pytest.raises(ValueError):
+        ImageStore(str(tmp_path / "images")).check(data_path)
+    with pytest.raises(ValueError):
+        ImageStore(str(tmp_path / "images")).check(str(tmp_path / "evaluate.parquet"))
+    assert open_store(str(tmp_path / "images"), [data_path]) is None
+    assert open_store(str(tmp_path / "missing"), [data_path]) is None
+
+# a log store is keyed by image path, repeated paths are stored once and unreadable images are left out
+def test_log_store_skips_duplicates_and_broken_images(tmp_path):
+    import json
+    from image_store import build_from_log
+
+    paths = [str(tmp_path / f"image_{i}.png") for i in range(3)]
+    Image.new("RGB", (40, 40), (10, 20, 30)).save(paths[0])
+    Image.new("L", (8, 8), 200).save(paths[1])
+    (tmp_path / "image_2.png").write_bytes(b"not a png")
+    with open(tmp_path / "log.jsonl", "w") as f:
+        f.writelines(json.dumps({"image path": path}) + "\n" for path in [paths[0], paths[1], paths[0], paths[2]])
+    build_from_log(str(tmp_path / "log.jsonl"), str(tmp_path / "images"), size=8, shard_size=2, workers=1)
+
+    store = ImageStore(str(tmp_path / "images"))
+    assert len(store) == 2 and paths[2] not in store
+    assert (store[paths[0]] == np.array([10, 20, 30], dtype=np.uint8)).all()
+    assert store.image(paths[1]).getpixel((0, 0)) == (200, 200, 200)
@@ -0,0 +1,151 @@
+import asyncio, base64, gzip, io, json, threading
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from inference_server import Backend, EngineBackend, MicroBatcher, MoveJob, ResponseCache, create_app, expand_board
+
+MOVE = {"global_row": 1, "global_col": 1, "local_row": 1, "local_col": 1}
+
+# put() runs without load() when the cache is used outside the app lifespan
+def test_put_creates_the_cache_directory(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "logs" / "cache.jsonl"))
+    cache.put("v1", "X", "0" * 81, None, MOVE)
+    assert (tmp_path / "logs" / "cache.jsonl").exists()
+
+def test_put_survives_an_unwritable_path(tmp_path):
+    (tmp_path / "file").write_text("")
+    cache = ResponseCache(path=str(tmp_path / "file" / "cache.jsonl"))
+    cache.put("v1", "X", "0" * 81, None, MOVE)
+    assert cache.get("v1", "X", "0" * 81, None) == MOVE
+    assert cache.metrics()["cache_persist_errors"] == 1
+
+class RecordingBackend(Backend):
+    name = "recording"
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.batches = []
+        self.threads = set()
+
+    def predict_batch(self, jobs):
+        self.batches.append(len(jobs))
+        self.threads.add(threading.get_ident())
+        if self.fail:
+            raise RuntimeError("out of memory")
+        return [job.player_turn for job in jobs]
+
+async def submit_all(batcher, turns):
+    task = asyncio.get_running_loop().create_task(batcher.run())
+    try:
+        return await asyncio.gather(*[batcher.submit(MoveJob(None, turn, [])) for turn in turns])
+    finally:
+        task.cancel()
+
+# requests arriving together share one backend call off the event loop thread, each gets its own answer
+def test_concurrent_requests_are_batched():
+    backend = RecordingBackend()
+    batcher = MicroBatcher(backend, max_batch_size=4, max_wait_ms=50)
+    turns = ["X", "O", "X", "O", "X", "O"]
+    assert asyncio.run(submit_all(batcher, turns)) == turns
+    assert backend.batches == [4, 2] and backend.loaded
+    assert threading.get_ident() not in backend.threads
+    assert batcher.metrics()["requests"] == 6 and batcher.metrics()["mean_batch_size"] == 3
+
+def test_backend_errors_reach_every_request_of_the_batch():
+    batcher = MicroBatcher(RecordingBackend(fail=True), max_batch_size=4, max_wait_ms=50)
+    with pytest.raises(RuntimeError):
+        asyncio.run(submit_all(batcher, ["X", "O"]))
+
+# the engine stand-in answers every position of a batch with a legal move
+def test_engine_backend_answers_legal_moves():
+    backend = EngineBackend(depth=1)
+    backend.ensure_loaded()
+    jobs = [MoveJob(None, "X", expand_board("0" * 81)), MoveJob(None, "O", expand_board("0" * 40 + "1" + "0" * 40), [1, 1])]
+    texts = backend.predict_batch(jobs)
+    for job, text in zip(jobs, texts):
+        move = json.loads(text)
+        assert tuple(move[k] for k in ("global_row", "global_col", "local_row", "local_col")) in job.legal_moves()
+
+def jpeg():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (230, 217, 200)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+BOARD = "0" * 40 + "1" + "0" * 40
+KEYS = ("global_row", "global_col", "local_row", "local_col")
+
+def client():
+    return TestClient(create_app(EngineBackend(depth=1), cache=ResponseCache(path=None)))
+
+def test_health_ready_and_metrics():
+    with client() as api:
+        assert api.get("/health").json() == {"status": "ok", "backend": "engine"}
+        assert api.get("/ready").json()["ready"] is True
+        assert "latency_p50_ms" in api.get("/metrics").json()
+
+# the same position through the JSON, gzip and multipart routes, answered once and then from the cache
+def test_predict_move_routes():
+    fields = {"image_base64": base64.b64encode(jpeg()).decode(), "player_turn": "O", "board": BOARD, "allowed_square": [1, 1]}
+    with client() as api:
+        response = api.post("/predict_move", json=fields)
+        assert response.status_code == 200 and response.headers["X-Cache"] == "miss"
+        move = response.json()
+        assert (move["global_row"], move["global_col"]) == (1, 1) and "Server-Timing" in response.headers
+
+        response = api.post("/predict_move", content=gzip.compress(json.dumps(fields).encode()),
+                            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        assert response.json() == move and response.headers["X-Cache"] == "hit"
+
+        response = api.post("/predict_move/multipart", files={"image": ("board.jpg", jpeg(), "image/jpeg")},
+                            data={"player_turn": "O", "board": BOARD, "allowed_square": "[1, 1]"})
+        assert response.json() == move
+        assert api.get("/metrics").json()["cache_hits"] == 2
+
+def test_bad_board_is_rejected():
+    with client() as api:
+        response = api.post("/predict_move", json={"image_base64": base64.b64encode(jpeg()).decode(), "player_turn": "X", "board": "012"})
+        assert response.status_code == 400
+
+def test_cache_evicts_the_least_recent_and_expires_entries(monkeypatch):
+    import time
+
+    first, second, third = "1" + "0" * 80, "2" + "0" * 80, "0" * 81
+    cache = ResponseCache(max_size=2, ttl=10, path=None)
+    cache.put("v1", "X", first, None, MOVE)
+    cache.put("v1", "X", second, None, MOVE)
+    # reading the first entry makes the second the least recent one
+    assert cache.get("v1", "X", first, None) == MOVE
+    cache.put("v1", "X", third, None, MOVE)
+    assert cache.get("v1", "X", second, None) is None and cache.metrics()["cache_evictions"] == 1
+    assert cache.get("v2", "X", third, None) is None
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("v1", "X", third, None) is None and cache.metrics()["cache_expired"] == 1
+
+def test_cache_is_loaded_back_from_its_file(tmp_path):
+    path = str(tmp_path / "cache.jsonl")
+    cache = ResponseCache(path=path)
+    cache.put("v1", "O", "1" + "0" * 80, [0, 0], MOVE)
+    with open(path, "a") as f:
+        f.write('{"key": "cut')
+    loaded = ResponseCache(path=path)
+    loaded.load()
+    assert loaded.get("v1", "O", "1" + "0" * 80, [0, 0]) == MOVE
+    assert len(open(path).readlines()) == 1
+
+# a rotated or reflected position hits the entry of the original, the move comes back in its own frame
+def test_symmetric_positions_share_an_entry():
+    from symmetry import SYMMETRIES, transform_board_string, transform_move, transform_square
+
+    board = "1" + "0" * 9 + "2" + "0" * 70
+    move = {"global_row": 0, "global_col": 1, "local_row": 2, "local_col": 0}
+    cache = ResponseCache(path=None, symmetry=True)
+    cache.put("v1", "X", board, [0, 1], move)
+    keys = ("global_row", "global_col", "local_row", "local_col")
+    for symmetry in range(SYMMETRIES):
+        hit = cache.get("v1", "X", transform_board_string(board, symmetry), transform_square((0, 1), symmetry))
+        assert tuple(hit[k] for k in keys) == transform_move(tuple(move[k] for k in keys), symmetry)
+    assert cache.metrics()["cache_size"] == 1 and cache.hits == SYMMETRIES
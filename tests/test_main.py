@@ -0,0 +1,74 @@
+import threading, time
+
+from main import BotRunner
+from TTT_bot import UltimateTTTBot
+from uttt_engine import Game
+
+class WaitingBot:
+    def __init__(self):
+        self.release = threading.Event()
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+        self.release.set()
+
+    def get_bot_move(self, game):
+        self.release.wait(5)
+        return game.get_legal_moves()[0]
+
+def wait_for(runner, game):
+    for _ in range(500):
+        finished, move = runner.poll(game)
+        if finished or runner.future is None:
+            return finished, move
+        time.sleep(0.01)
+    raise TimeoutError
+
+# the move is collected by polling from the event loop, which never waits for the bot
+def test_move_is_picked_up_by_poll():
+    runner, game, bot = BotRunner(), Game(), WaitingBot()
+    try:
+        runner.request(bot, game)
+        assert runner.is_thinking() and runner.poll(game) == (False, None)
+        bot.release.set()
+        assert wait_for(runner, game) == (True, game.get_legal_moves()[0])
+        assert not runner.is_thinking()
+    finally:
+        runner.shutdown()
+
+# a move for a position the game has left (reset, undo, mode change) is dropped
+def test_stale_move_is_dropped():
+    runner, game, bot = BotRunner(), Game(), WaitingBot()
+    try:
+        runner.request(bot, game)
+        game.play_move(1, 1, 1, 1)
+        bot.release.set()
+        assert wait_for(runner, game) == (False, None)
+    finally:
+        runner.shutdown()
+
+def test_cancel_stops_the_bot():
+    runner, game, bot = BotRunner(), Game(), WaitingBot()
+    try:
+        runner.request(bot, game)
+        runner.cancel()
+        assert bot.stopped and not runner.is_thinking()
+    finally:
+        runner.shutdown()
+
+# pondering runs until the next request, which stops it before the bot is asked for a move
+def test_request_stops_pondering():
+    runner, game = BotRunner(ponder=True), Game()
+    game.play_move(1, 1, 1, 1)
+    ponderer = UltimateTTTBot(1, max_time=0.05)
+    try:
+        runner.start_pondering(ponderer, game)
+        time.sleep(0.1)
+        game.play_move(1, 1, 0, 0)
+        runner.request(ponderer, game)
+        assert runner.pondering_bot is None
+        finished, move = wait_for(runner, game)
+        assert finished and game.is_move_legal(*move)
+    finally:
+        runner.shutdown()
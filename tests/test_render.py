@@ -0,0 +1,53 @@
+import numpy as np
+import pygame
+
+import render
+from config import HEIGHT, WIDTH
+from uttt_engine import Board
+
+def full_frame(squares, allowed):
+    board = Board.from_array(squares, None if allowed < 0 else divmod(int(allowed), 3))
+    winner, winner_line_coords = board.final_global_state()
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    render.draw_board(surface, board.squares, board.global_squares, board.allowed_square, winner == 0, winner_line_coords)
+    return pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+
+# the cached backgrounds and sprites give the same pixels as drawing the frame from scratch
+def test_batch_render_matches_the_drawn_frame():
+    squares, allowed = render.random_positions(12, seed=3)
+    images = render.render_batch(squares, allowed)
+    assert images.shape == (12, HEIGHT, WIDTH, 3) and images.dtype == np.uint8
+    for i in range(len(squares)):
+        assert np.array_equal(images[i], full_frame(squares[i], allowed[i]))
+
+def test_worker_pool_renders_the_same_images():
+    squares, allowed = render.random_positions(6, seed=4)
+    assert np.array_equal(render.render_batch(squares, allowed, workers=2, chunk_size=2), render.render_batch(squares, allowed))
+
+def test_saved_images_are_the_rendered_frames(tmp_path):
+    squares, allowed = render.random_positions(3, seed=5)
+    paths = [str(tmp_path / f"image_{i}.png") for i in range(3)]
+    assert render.save_batch(squares, allowed, paths) == 3
+    images = render.render_batch(squares, allowed)
+    for path, image in zip(paths, images):
+        assert np.array_equal(pygame.surfarray.array3d(pygame.image.load(path)).transpose(1, 0, 2), image)
+
+# after every move of a game the incrementally drawn window equals a full redraw, and a frame
+# without changes redraws nothing
+def test_screen_renderer_redraws_only_what_changed():
+    import random
+    from uttt_engine import Game
+
+    rng = random.Random(0)
+    game = Game()
+    screen = pygame.Surface((WIDTH, HEIGHT))
+    renderer = render.ScreenRenderer(screen)
+    assert len(renderer.draw(game)) == 9
+    while game.running and game.get_legal_moves():
+        game.play_move(*rng.choice(game.get_legal_moves()))
+        rects = renderer.draw(game)
+        assert 0 < len(rects) <= 9
+        frame = full_frame(game.board.to_array(), game.board.allowed)
+        assert np.array_equal(pygame.surfarray.array3d(screen).transpose(1, 0, 2), frame)
+        assert renderer.draw(game) == []
+    assert renderer.redrawn_tiles < 9 * renderer.frames and renderer.frame_time() > 0
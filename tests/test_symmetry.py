@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+
+from symmetry import (CELL_PERMUTATION, INVERSE, SYMMETRIES, canonical_board, transform_board_string, transform_cells,
+                      transform_coords, transform_move, transform_square)
+from synthetic_game import rotate_coords
+
+def random_board(seed):
+    rng = random.Random(seed)
+    return "".join(rng.choice("0012") for _ in range(81))
+
+def test_inverse_undoes_every_symmetry():
+    board = random_board(0)
+    for symmetry in range(SYMMETRIES):
+        assert transform_board_string(transform_board_string(board, symmetry), INVERSE[symmetry]) == board
+        for move in [(0, 1, 2, 0), (2, 2, 1, 0), (1, 1, 1, 1)]:
+            assert transform_move(transform_move(move, symmetry), INVERSE[symmetry]) == move
+    assert transform_square(None, 3) is None
+
+# the 8 symmetries are different permutations, 0-3 are the rotations of the old augmentation
+def test_symmetries_are_the_dihedral_group():
+    assert len({tuple(permutation) for permutation in CELL_PERMUTATION}) == SYMMETRIES
+    assert all(sorted(permutation) == list(range(81)) for permutation in CELL_PERMUTATION)
+    for symmetry, angle in enumerate([0, 90, 180, 270]):
+        assert all(transform_coords(r, c, symmetry) == rotate_coords(r, c, angle) for r in range(3) for c in range(3))
+    assert [transform_coords(0, 0, symmetry) for symmetry in range(4, 8)] == [(0, 2), (2, 2), (2, 0), (0, 0)]
+
+def test_cell_arrays_and_strings_move_the_same_way():
+    board = random_board(1)
+    cells = np.array([int(ch) for ch in board])
+    for symmetry in range(SYMMETRIES):
+        assert "".join(map(str, transform_cells(cells, symmetry))) == transform_board_string(board, symmetry)
+    stacked = np.stack([cells, cells[::-1]])
+    assert (transform_cells(stacked, 5)[1] == transform_cells(cells[::-1], 5)).all()
+
+# every image of a position has the same canonical form, and the symmetry maps it there
+def test_canonical_board_is_shared_by_all_images():
+    board, allowed = random_board(2), (0, 1)
+    forms = set()
+    for symmetry in range(SYMMETRIES):
+        image = transform_board_string(board, symmetry), transform_square(allowed, symmetry)
+        to_canonical, canonical, canonical_allowed = canonical_board(*image)
+        assert transform_board_string(image[0], to_canonical) == canonical
+        assert transform_square(image[1], to_canonical) == canonical_allowed
+        forms.add((canonical, canonical_allowed))
+    assert len(forms) == 1
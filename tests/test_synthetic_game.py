@@ -0,0 +1,69 @@
+import numpy as np
+from PIL import Image
+
+from synthetic_game import augment_log, transform_log_entry, transform_cot_text, transformed_image_path
+from symmetry import SYMMETRIES
+from uttt_engine import Game
+
+MOVE_KEYS = ("global_row", "global_col", "local_row", "local_col")
+
+def log_entry(moves, image_path="screens/image_1.png"):
+    game = Game()
+    for move in moves:
+        game.play_move(*move)
+    squares = game.board.to_array().reshape(3, 3, 3, 3)
+    legal = [dict(zip(MOVE_KEYS, move)) for move in game.get_legal_moves()]
+    return {
+        "player": game.player,
+        "image path": image_path,
+        "legal moves": legal,
+        "allowed squares": list(game.allowed_square) if game.allowed_square is not None else None,
+        "global state": [{"global_row": a, "global_col": b, "local_row": c, "local_col": d, "player": int(squares[a, b, c, d])}
+                         for a in range(3) for b in range(3) for c in range(3) for d in range(3)],
+        "best move": legal[0],
+        "chain of thought": "Play (0, 1) then {global_row: 0, global_col: 1, local_row: 2, local_col: 0}",
+    }
+
+def test_only_the_identity_has_rotation_angle_zero():
+    entries = [new_log for new_log, _, _ in transform_log_entry(log_entry([(1, 1, 0, 2), (0, 2, 1, 1)]))]
+    assert [entry["symmetry"] for entry in entries] == list(range(SYMMETRIES))
+    assert [entry["rotation_angle"] for entry in entries] == [0, 90, 180, 270, None, None, None, None]
+
+# every transformed entry is a real position: the engine agrees with its legal moves
+def test_transformed_entries_are_consistent():
+    for new_log, squares, allowed in transform_log_entry(log_entry([(1, 1, 0, 2), (0, 2, 1, 1), (1, 1, 2, 2)])):
+        game = Game()
+        game.board = type(game.board).from_array(np.asarray(squares).reshape(3, 3, 3, 3),
+                                                 tuple(new_log["allowed squares"]) if new_log["allowed squares"] else None, new_log["player"])
+        assert sorted(game.board.get_legal_moves()) == sorted(tuple(move[k] for k in MOVE_KEYS) for move in new_log["legal moves"])
+        assert new_log["best move"] in new_log["legal moves"]
+        assert allowed == (-1 if new_log["allowed squares"] is None else new_log["allowed squares"][0] * 3 + new_log["allowed squares"][1])
+
+def test_cot_text_and_image_paths():
+    assert transform_cot_text("Play (0, 1)", 1) == "Play (1, 2)"
+    assert transform_cot_text("{global_row: 0, global_col: 0, local_row: 0, local_col: 1}", 4) == \
+        "{global_row: 0, global_col: 2, local_row: 0, local_col: 1}"
+    assert transformed_image_path("screens/image_1_rotated_90.png", 5) == "screens/image_1_flipped_90.png"
+
+# entries come out in input order with max_pending 1 and two workers, the images are the source pixels rotated
+def test_augment_log_streams_entries_in_order(tmp_path):
+    import json
+    import render
+
+    games = [[(1, 1, 0, 2)], [(1, 1, 0, 2), (0, 2, 1, 1)], [(0, 0, 0, 0), (0, 0, 1, 1), (1, 1, 0, 0)]]
+    entries = [log_entry(moves, str(tmp_path / f"image_{i}.png")) for i, moves in enumerate(games)]
+    render.save_batch([np.array([cell["player"] for cell in entry["global state"]]) for entry in entries],
+                      [-1 if entry["allowed squares"] is None else entry["allowed squares"][0] * 3 + entry["allowed squares"][1]
+                       for entry in entries], [entry["image path"] for entry in entries])
+    input_path, output_path = tmp_path / "log.jsonl", tmp_path / "synthetic.jsonl"
+    input_path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    stats = augment_log(str(input_path), str(output_path), workers=2, max_pending=1, symmetries=4)
+    lines = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [(line["image path"].split("_rotated")[0].removesuffix(".png"), line["symmetry"]) for line in lines] == \
+        [(entry["image path"].removesuffix(".png"), symmetry) for entry in entries for symmetry in range(4)]
+    assert stats["images"] == 9 and stats["failed"] == 0
+    original = np.asarray(Image.open(entries[2]["image path"]))
+    assert np.array_equal(np.asarray(Image.open(lines[9]["image path"])), np.rot90(original, k=-1))
+    # a second run keeps the images that are newer than their source
+    assert augment_log(str(input_path), str(output_path), workers=2, symmetries=4)["up_to_date"] == 9
@@ -0,0 +1,121 @@
+import random
+
+from TTT_bot import MCTSBot, UltimateTTTBot
+from uttt_engine import Game
+
+def random_game(seed, plies):
+    rng = random.Random(seed)
+    game = Game()
+    for _ in range(plies):
+        moves = game.get_legal_moves()
+        if not moves or not game.running:
+            break
+        game.play_move(*rng.choice(moves))
+    return game
+
+# the deadline interrupts minimax partway through a depth, the board has to come back as it was
+def test_timed_out_search_leaves_board_unchanged():
+    for seed in range(6):
+        game = random_game(seed, 10)
+        state = game.board.state()
+        bot = UltimateTTTBot(game.player, max_time=0.05)
+        move = bot.get_bot_move(game)
+        assert game.board.state() == state
+        assert game.is_move_legal(*move)
+
+def test_worker_bots_follow_the_table_size():
+    import time
+    from TTT_bot import _worker_bots, search_root_moves
+
+    board = random_game(0, 4).board
+    moves = board.legal_indices()
+    for tt_size in (1 << 10, 1 << 12):
+        search_root_moves(board.state(), board.player, moves, time.time() + 0.05, tt_size)
+        assert len(_worker_bots[(board.player, tt_size, True, False)].table.entries) == tt_size
+    search_root_moves(board.state(), board.player, moves, time.time() + 0.05, 1 << 10, False, True)
+    bot = _worker_bots[(board.player, 1 << 10, False, True)]
+    assert not bot.make_unmake and bot.batch_leaves
+
+# no time left still runs the iteration that expands the root
+def test_mcts_without_time_returns_a_legal_move():
+    for seed in range(4):
+        game = random_game(seed, 6)
+        move = MCTSBot(game.player, max_time=0, seed=seed).get_bot_move(game)
+        assert game.is_move_legal(*move)
+
+# stop() from another thread ends a parallel search long before its max_time
+def test_parallel_search_stops_early():
+    import threading, time
+
+    game = random_game(1, 8)
+    bot = UltimateTTTBot(game.player, max_time=30, workers=2)
+    try:
+        bot.start_workers()
+        threading.Timer(0.3, bot.stop).start()
+        start = time.time()
+        move = bot.get_bot_move(game)
+        assert time.time() - start < 5
+        assert game.is_move_legal(*move)
+    finally:
+        bot.close()
+
+# the make/unmake search and the copy-per-child search see the same tree
+def test_make_unmake_search_matches_the_copy_search():
+    import math
+
+    for seed in range(4):
+        board = random_game(seed, 12).board
+        results = [UltimateTTTBot(board.player, make_unmake=make_unmake, tt_size=0).minimax(board, 3, -math.inf, math.inf, True)
+                   for make_unmake in (True, False)]
+        assert results[0] == results[1]
+
+def test_transposition_table_keeps_the_deeper_entry():
+    from TTT_bot import TranspositionTable, TT_EXACT, TT_LOWER
+
+    table = TranspositionTable(4)
+    table.new_search()
+    table.store(1, 5, 0.5, TT_EXACT, 10)
+    assert table.probe(1)[1:5] == (5, 0.5, TT_EXACT, 10)
+    assert table.probe(2) is None
+    # same slot, shallower search of another position: the deeper entry stays
+    table.store(1 + 4, 2, 0.1, TT_LOWER, 11)
+    assert table.get(1) is not None and table.get(5) is None
+    # entries of an earlier move are always replaced
+    table.new_search()
+    table.store(5, 2, 0.1, TT_LOWER, 11)
+    assert table.get(1) is None and table.get(5)[4] == 11
+    assert table.size == 1
+
+# the workers split the root moves, the chosen move comes from a depth all of them finished
+def test_parallel_search_returns_a_legal_move():
+    for seed in range(3):
+        game = random_game(seed, 14)
+        state = game.board.state()
+        bot = UltimateTTTBot(game.player, max_time=0.3, workers=2)
+        try:
+            move = bot.get_bot_move(game)
+        finally:
+            bot.close()
+        assert game.board.state() == state
+        assert game.is_move_legal(*move)
+        assert bot.depth >= 1 and bot.principal_variation[0] == move
+
+# the subtree below the bot's move and the reply is kept for the next search
+def test_mcts_reuses_the_tree_of_the_last_move():
+    game = random_game(5, 6)
+    bot = MCTSBot(game.player, max_time=0.2, seed=0)
+    game.play_move(*bot.get_bot_move(game))
+    game.play_move(*random.Random(0).choice(game.get_legal_moves()))
+    assert bot.set_root(game.board) > 0
+    first = bot.first_child[bot.root]
+    assert (bot.parent[first:first + bot.child_count[bot.root]] == bot.root).all()
+    assert game.is_move_legal(*bot.get_bot_move(game))
+
+def test_random_playouts_end_in_results():
+    import numpy as np
+    from uttt_engine import random_playouts
+
+    board = random_game(6, 20).board
+    winners = random_playouts(board, 64, np.random.default_rng(0))
+    assert winners.shape == (64,) and set(winners.tolist()) <= {1, 2, -1}
+    assert (winners == random_playouts(board, 64, np.random.default_rng(0))).all()
@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+
+from uttt_engine import BitBoard, Game, MOVES, move_to_index, index_to_move
+
+LINES = [[(0, 0), (0, 1), (0, 2)], [(1, 0), (1, 1), (1, 2)], [(2, 0), (2, 1), (2, 2)],
+         [(0, 0), (1, 0), (2, 0)], [(0, 1), (1, 1), (2, 1)], [(0, 2), (1, 2), (2, 2)],
+         [(0, 0), (1, 1), (2, 2)], [(0, 2), (1, 1), (2, 0)]]
+
+# the rules written out on the (3, 3, 3, 3) array like the old NumPy Board, a line of drawn
+# boards ends the game in a draw
+def grid_status(grid):
+    for player in (1, 2, -1):
+        if any(all(grid[r][c] == player for r, c in line) for line in LINES):
+            return player
+    return -1 if all(grid[r][c] != 0 for r in range(3) for c in range(3)) else 0
+
+def reference_legal_moves(squares, allowed_square):
+    statuses = [[grid_status(squares[gr][gc]) for gc in range(3)] for gr in range(3)]
+    boards = [allowed_square] if allowed_square is not None else \
+        [(gr, gc) for gr in range(3) for gc in range(3) if statuses[gr][gc] == 0]
+    return sorted((gr, gc, lr, lc) for gr, gc in boards for lr in range(3) for lc in range(3) if squares[gr][gc][lr][lc] == 0)
+
+def test_moves_follow_the_rules_of_the_array_board():
+    rng = random.Random(0)
+    for _ in range(30):
+        game = Game()
+        while game.running and game.get_legal_moves():
+            squares = game.board.to_array().astype(int).tolist()
+            assert sorted(game.get_legal_moves()) == reference_legal_moves(squares, game.allowed_square)
+            move = rng.choice(game.get_legal_moves())
+            player = game.player
+            game.play_move(*move)
+            target = move[2:]
+            target_status = grid_status(game.board.to_array().astype(int).tolist()[target[0]][target[1]])
+            # sent to the board of the local cell, free play when that board is decided
+            assert game.allowed_square == (target if target_status == 0 else None)
+            assert game.player == 3 - player
+        statuses = [[grid_status(grid) for grid in row] for row in game.board.to_array().astype(int).tolist()]
+        assert game.board.global_squares.astype(int).tolist() == statuses
+        assert game.board.global_status() == grid_status(statuses)
+
+def test_state_and_array_round_trip():
+    rng = random.Random(1)
+    game = Game()
+    for _ in range(25):
+        game.play_move(*rng.choice(game.get_legal_moves()))
+    board = game.board
+    assert BitBoard.from_state(board.state()).state() == board.state()
+    copy = BitBoard.from_array(board.to_array(), board.allowed_square, board.player)
+    assert copy.state() == board.state() and copy.hash_key() == board.hash_key()
+    assert all(index_to_move(move_to_index(move)) == move for move in MOVES)
+
+# unmaking a line of moves in reverse gives back every earlier position exactly
+def test_unmake_restores_the_position():
+    rng = random.Random(2)
+    board = BitBoard()
+    states, undos = [], []
+    while board.global_status() == 0 and board.legal_indices():
+        states.append(board.state())
+        undos.append(board.make_move(rng.choice(board.legal_indices())))
+    for state, undo in zip(reversed(states), reversed(undos)):
+        board.unmake_move(undo)
+        assert board.state() == state
+
+# the incremental key matches the key of the same position built from scratch
+def test_hash_key_follows_the_position():
+    rng = random.Random(3)
+    board = BitBoard()
+    keys = set()
+    while board.global_status() == 0 and board.legal_indices():
+        key = board.hash_key()
+        assert key == BitBoard.from_state(board.state()).hash_key()
+        undo = board.make_move(rng.choice(board.legal_indices()))
+        assert board.hash_key() != key
+        board.unmake_move(undo)
+        assert board.hash_key() == key
+        keys.add(key)
+        board.make_move(rng.choice(board.legal_indices()))
+    assert len(keys) > 20
+
+# bots, the arena and the evaluator are used on servers without a display, pygame must not be imported
+def test_engine_and_bots_import_without_pygame():
+    import os, subprocess, sys
+
+    code = ("import sys; sys.modules['pygame'] = None\n"
+            "import uttt_engine, board_tables, batch_eval, TTT_bot, arena\n"
+            "game = uttt_engine.Game(); game.play_move(*TTT_bot.UltimateTTTBot(1, max_time=0.05).get_bot_move(game))\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.returncode == 0, result.stderr
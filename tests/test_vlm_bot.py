@@ -0,0 +1,111 @@
+import gzip, io, json
+
+import pygame
+import pytest
+import requests
+
+from TTT_bot import VLMBot
+from uttt_engine import Game
+
+class Response:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("no body")
+        return self.body
+
+# answers the posts in order, an exception in the list is raised instead
+class Session:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.requests = []
+
+    def post(self, url, data, headers, timeout):
+        self.requests.append((url, data, headers))
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+def make_bot(answers, **kwargs):
+    bot = VLMBot(pygame.Surface((720, 720)), 1, api_url="http://vlm.test/predict_move", backoff=0.001, **kwargs)
+    bot.session = Session(answers)
+    return bot
+
+MOVE = {"global_row": 1, "global_col": 1, "local_row": 0, "local_col": 2}
+
+def test_overloaded_server_is_retried():
+    bot = make_bot([Response(503), Response(200, MOVE, {"Server-Timing": "predict;dur=12.5"})])
+    assert bot.get_bot_move(Game()) == (1, 1, 0, 2)
+    assert bot.metrics[-1]["attempts"] == 2 and bot.metrics[-1]["server"] == 0.0125
+
+def test_client_errors_are_not_retried():
+    bot = make_bot([Response(400), Response(200, MOVE)], fallback=False)
+    assert bot.get_bot_move(Game()) is None
+    assert len(bot.session.requests) == 1
+
+# no answer, a broken one or an illegal move: the local engine plays instead
+@pytest.mark.parametrize("answers", [
+    [requests.ConnectionError("refused")] * 3,
+    [Response(200, {"best_move": "center"})],
+    [Response(200, dict(MOVE, local_row=7))],
+])
+def test_engine_plays_when_the_api_fails(answers):
+    game = Game()
+    game.play_move(1, 1, 0, 2)
+    bot = make_bot(answers, retries=2)
+    bot.player = game.player
+    move = bot.get_bot_move(game)
+    assert move is not None and game.is_move_legal(*move)
+
+def test_request_body_is_gzipped_json():
+    game = Game()
+    game.play_move(0, 0, 1, 1)
+    bot = make_bot([Response(200, MOVE)])
+    bot.get_bot_move(game)
+    url, body, headers = bot.session.requests[0]
+    fields = json.loads(gzip.decompress(body))
+    assert url == "http://vlm.test/predict_move" and headers["Content-Encoding"] == "gzip"
+    assert fields["board"][4] == "1" and fields["board"].count("0") == 80
+    assert fields["allowed_square"] == [1, 1] and fields["player_turn"] == "X"
+
+def drawn_screen():
+    screen = pygame.Surface((720, 720))
+    screen.fill((230, 217, 200))
+    pygame.draw.circle(screen, (8, 112, 202), (100, 600), 60)
+    screen.fill((205, 42, 91), pygame.Rect(500, 40, 120, 30))
+    return screen
+
+# the frame read from the surface buffer has the pixels of the slow tostring copy
+def test_capture_reads_the_window_pixels():
+    from PIL import Image
+
+    screen = drawn_screen()
+    bot = VLMBot(screen, 1, image_size=None)
+    expected = Image.frombytes("RGB", (720, 720), pygame.image.tostring(screen, "RGB"))
+    assert bot.capture().tobytes() == expected.tobytes()
+    assert VLMBot(screen, 1, image_size=360).capture().size == (360, 360)
+
+# the snapshot taken on the main thread is sent, not the window at the time of the request
+def test_snapshot_is_encoded_once():
+    from PIL import Image
+
+    screen = drawn_screen()
+    bot = make_bot([], compress=False, multipart=True)
+    bot.screen = screen
+    bot.snapshot()
+    screen.fill((0, 0, 0))
+    url, body, headers, image_bytes = bot.encode_request(Game())
+    assert url.endswith("/multipart") and headers["Content-Type"].startswith("multipart/form-data")
+    start = body.index(b"\xff\xd8")
+    image = Image.open(io.BytesIO(body[start:start + image_bytes]))
+    assert image.size == (720, 720) and image.getpixel((560, 55))[0] > 150
+    assert bot.frame is None
+    # without a snapshot the window is captured at encode time
+    _, body, _, image_bytes = bot.encode_request(Game())
+    start = body.index(b"\xff\xd8")
+    assert Image.open(io.BytesIO(body[start:start + image_bytes])).getpixel((560, 55))[0] < 50
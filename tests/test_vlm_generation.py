@@ -0,0 +1,105 @@
+import json, types
+
+import torch
+
+from vlm_generation import MoveJsonProcessor, PrefixCache
+
+# one token per character, id 0 ends the text
+class CharTokenizer:
+    pad_token_id = 0
+
+    def encode(self, text, add_special_tokens=False):
+        return [ord(ch) for ch in text]
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(i) for i in ids if i)
+
+    def __call__(self, text, add_special_tokens=False, return_tensors="pt"):
+        return types.SimpleNamespace(input_ids=torch.tensor([self.encode(text)]))
+
+class ChatProcessor:
+    tokenizer = CharTokenizer()
+
+    def apply_chat_template(self, messages, tokenize=False):
+        return "".join(f"<{message['content'][0]['text']}>" for message in messages)
+
+class PrefillModel:
+    device = torch.device("cpu")
+    generation_config = types.SimpleNamespace(eos_token_id=0)
+
+    def __init__(self):
+        self.prefills = 0
+
+    def get_rope_index(self, input_ids, attention_mask=None):
+        pass
+
+    def __call__(self, input_ids, attention_mask, past_key_values, use_cache):
+        self.prefills += 1
+
+def messages(system, user):
+    return [{"role": "system", "content": [{"type": "text", "text": system}]},
+            {"role": "user", "content": [{"type": "text", "text": user}]}]
+
+# left-padded rows as the processor returns them
+def padded_inputs(texts):
+    length = max(len(text) for text in texts)
+    input_ids = torch.tensor([[0] * (length - len(text)) + [ord(ch) for ch in text] for text in texts])
+    return {"input_ids": input_ids, "attention_mask": (input_ids != 0).long()}
+
+# the shared system prompt moves to the front of every row, the rest stays right-aligned
+def test_rows_are_repadded_behind_the_prefix():
+    model = PrefillModel()
+    cache = PrefixCache(model, ChatProcessor())
+    batch = [messages("SYS", "a board"), messages("SYS", "b")]
+    input_ids, attention_mask, prefix_length, prefix_cache = cache.split_rows(
+        padded_inputs(["<SYS><a board>", "<SYS><b>"]), batch, True)
+    assert prefix_length == 5 and prefix_cache is not None
+    decoded = [CharTokenizer().decode(row.tolist()) for row in input_ids]
+    assert decoded == ["<SYS><a board>", "<SYS><b>"]
+    assert attention_mask[1].tolist() == [1] * 5 + [0] * 6 + [1] * 3
+    # the system prompt is run through the model once
+    cache.split_rows(padded_inputs(["<SYS><c>"]), [messages("SYS", "c")], True)
+    assert model.prefills == 1
+
+def test_rows_without_a_common_prefix_are_left_alone():
+    cache = PrefixCache(PrefillModel(), ChatProcessor())
+    inputs = padded_inputs(["<SYS><a>", "<OTHER><b>"])
+    input_ids, _, prefix_length, prefix_cache = cache.split_rows(inputs, [messages("SYS", "a"), messages("OTHER", "b")], True)
+    assert prefix_length == 0 and prefix_cache is None and torch.equal(input_ids, inputs["input_ids"])
+    _, _, prefix_length, _ = cache.split_rows(padded_inputs(["<SYS><a>"]), [messages("SYS", "a")], False)
+    assert prefix_length == 0
+
+# greedy decoding of rows whose "model" wants to write script, under the processor
+def decode(processor, scripts, steps=120):
+    sequences = torch.zeros((len(scripts), 1), dtype=torch.long)
+    finished = [False] * len(scripts)
+    for step in range(steps):
+        scores = torch.zeros((len(scripts), 128))
+        for row, script in enumerate(scripts):
+            if step < len(script):
+                scores[row, ord(script[step])] = 10
+            scores[row] += torch.arange(128) / 1000
+        scores = processor(sequences, scores)
+        next_tokens = torch.tensor([0 if finished[row] else int(scores[row].argmax()) for row in range(len(scripts))])
+        finished = [done or token == 0 for done, token in zip(finished, next_tokens.tolist())]
+        sequences = torch.cat([sequences, next_tokens[:, None]], dim=1)
+        if all(finished):
+            break
+    return [CharTokenizer().decode(row[1:].tolist()) for row in sequences]
+
+def test_output_after_the_trigger_is_a_legal_move():
+    legal = [[(1, 1, 0, 2), (2, 0, 1, 1)], [(0, 0, 0, 0)]]
+    processor = MoveJsonProcessor(CharTokenizer(), 0, moves=legal, trigger='"best_move": ', suffix="}")
+    texts = decode(processor, ['{"thinking": "center", "best_move": {"global_row": 2, "global_col": 9}}',
+                               '{"best_move": {"local_row": 1}} and more'])
+    for text, moves in zip(texts, legal):
+        head, answer = text.split('"best_move": ')
+        assert answer.endswith("}}")
+        move = json.loads(answer[:-1])
+        assert tuple(move[k] for k in ("global_row", "global_col", "local_row", "local_col")) in moves
+    assert texts[0].startswith('{"thinking": "center", ')
+
+def test_without_a_trigger_the_first_token_is_constrained():
+    texts = decode(MoveJsonProcessor(CharTokenizer(), 0), ["I would play the center"])
+    move = json.loads(texts[0])
+    assert sorted(move) == sorted(["global_row", "global_col", "local_row", "local_col"])
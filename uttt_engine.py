@@ -0,0 +1,424 @@
+# Bitboard game state and rules for Ultimate Tic Tac Toe, no pygame so it can run headless
+#
+# Cells are numbered 0-80 as board * 9 + cell, where board = global_row * 3 + global_col
+# and cell = local_row * 3 + local_col. Each player owns one 81-bit int, i.e. nine 9-bit
+# local boards packed next to each other. Won/drawn local boards are kept as 9-bit masks.
+import copy, random
+import numpy as np
+from config import ROWS, COLS, SIZE, WIDTH, HEIGHT
+
+FULL_MASK = 0x1FF
+CENTER_BIT = 1 << 4
+CORNER_BITS = (1 << 0, 1 << 2, 1 << 6, 1 << 8)
+
+# rows, columns, diagonal, anti-diagonal
+LINES = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+# win lookup for every 9-bit mask
+WIN_TABLE = tuple(any(mask & line == line for line in LINES) for mask in range(1 << 9))
+
+# (global_row, global_col, local_row, local_col) for every cell index
+MOVES = tuple((b // 3, b % 3, c // 3, c % 3) for b in range(9) for c in range(9))
+
+# Zobrist keys, fixed seed so keys are the same in every process
+_zobrist_rng = random.Random(20240917)
+ZOBRIST_CELLS = (None,) + tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(81)) for _ in range(2))
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+# index 0 is free play, 1-9 the allowed board
+ZOBRIST_ALLOWED = tuple(_zobrist_rng.getrandbits(64) for _ in range(10))
+
+def move_to_index(move):
+    global_row, global_col, local_row, local_col = move
+    return (global_row * 3 + global_col) * 9 + local_row * 3 + local_col
+
+def index_to_move(index):
+    return MOVES[index]
+
+# status of a 3x3 grid given as masks: 1/2 won, -1 draw, 0 ongoing
+def mask_status(x_mask, o_mask, draw_mask=0):
+    if WIN_TABLE[x_mask]:
+        return 1
+    if WIN_TABLE[o_mask]:
+        return 2
+    if WIN_TABLE[draw_mask] or (x_mask | o_mask | draw_mask) == FULL_MASK:
+        return -1
+    return 0
+
+class BitBoard:
+    def __init__(self):
+        # index 1 and 2 belong to the players, index 0 is unused
+        self.cells = [0, 0, 0]
+        self.won = [0, 0, 0]
+        self.drawn = 0
+        self.allowed = -1
+        self.player = 1
+        # incremental Zobrist key of the occupied cells, see hash_key for the full position
+        self.cells_key = 0
+
+    # ---- converters to and from the (3, 3, 3, 3) array representation ----
+    @classmethod
+    def from_array(cls, squares, allowed_square=None, player=1):
+        board = cls()
+        board.load_array(squares, allowed_square, player)
+        return board
+
+    def load_array(self, squares, allowed_square=None, player=1):
+        self.__init__()
+        flat = np.asarray(squares).reshape(81)
+        for index in range(81):
+            value = int(flat[index])
+            if value in (1, 2):
+                self.cells[value] |= 1 << index
+                self.cells_key ^= ZOBRIST_CELLS[value][index]
+        for board in range(9):
+            self.update_status(board)
+        self.allowed_square = allowed_square
+        self.player = player
+
+    # plain tuple of ints, e.g. to send a position to another process
+    def state(self):
+        return (self.cells[1], self.cells[2], self.won[1], self.won[2], self.drawn, self.allowed, self.player)
+
+    @classmethod
+    def from_state(cls, state):
+        board = cls()
+        x_cells, o_cells, x_won, o_won, board.drawn, board.allowed, board.player = state
+        board.cells = [0, x_cells, o_cells]
+        board.won = [0, x_won, o_won]
+        for player in (1, 2):
+            mask = board.cells[player]
+            while mask:
+                low = mask & -mask
+                board.cells_key ^= ZOBRIST_CELLS[player][low.bit_length() - 1]
+                mask ^= low
+        return board
+
+    def to_array(self):
+        squares = np.zeros(81)
+        for player in (1, 2):
+            mask = self.cells[player]
+            while mask:
+                low = mask & -mask
+                squares[low.bit_length() - 1] = player
+                mask ^= low
+        return squares.reshape((ROWS, COLS, ROWS, COLS))
+
+    @property
+    def squares(self):
+        return self.to_array()
+
+    @property
+    def global_squares(self):
+        global_squares = np.zeros(9)
+        for board in range(9):
+            global_squares[board] = self.local_status(board)
+        return global_squares.reshape((ROWS, COLS))
+
+    @property
+    def allowed_square(self):
+        if self.allowed < 0:
+            return None
+        return divmod(self.allowed, 3)
+
+    @allowed_square.setter
+    def allowed_square(self, square):
+        self.allowed = -1 if square is None else square[0] * 3 + square[1]
+
+    # ---- local boards ----
+    def local_masks(self, board):
+        shift = board * 9
+        return (self.cells[1] >> shift) & FULL_MASK, (self.cells[2] >> shift) & FULL_MASK
+
+    def local_status(self, board):
+        bit = 1 << board
+        if self.won[1] & bit:
+            return 1
+        if self.won[2] & bit:
+            return 2
+        if self.drawn & bit:
+            return -1
+        return 0
+
+    def update_status(self, board):
+        bit = 1 << board
+        x_mask, o_mask = self.local_masks(board)
+        status = mask_status(x_mask, o_mask)
+        self.won[1] &= ~bit
+        self.won[2] &= ~bit
+        self.drawn &= ~bit
+        if status == -1:
+            self.drawn |= bit
+        elif status:
+            self.won[status] |= bit
+
+    # side to move and allowed square are plain attributes, so they are folded into the key here
+    def hash_key(self):
+        key = self.cells_key ^ ZOBRIST_ALLOWED[self.allowed + 1]
+        if self.player == 2:
+            key ^= ZOBRIST_SIDE
+        return key
+
+    @property
+    def closed(self):
+        return self.won[1] | self.won[2] | self.drawn
+
+    def global_status(self):
+        return mask_status(self.won[1], self.won[2], self.drawn)
+
+    # ---- moves ----
+    def is_local_square_empty(self, global_row, global_col, local_row, local_col):
+        index = move_to_index((global_row, global_col, local_row, local_col))
+        return not ((self.cells[1] | self.cells[2]) >> index) & 1
+
+    def mark_square(self, global_row, global_col, local_row, local_col, player):
+        index = move_to_index((global_row, global_col, local_row, local_col))
+        if not (self.cells[player] >> index) & 1:
+            self.cells[player] |= 1 << index
+            self.cells_key ^= ZOBRIST_CELLS[player][index]
+        self.update_status(index // 9)
+
+    def legal_mask(self):
+        occupied = self.cells[1] | self.cells[2]
+        if self.allowed >= 0:
+            boards = 1 << self.allowed
+        else:
+            boards = ~self.closed & FULL_MASK
+        legal = 0
+        while boards:
+            low = boards & -boards
+            shift = (low.bit_length() - 1) * 9
+            legal |= (~(occupied >> shift) & FULL_MASK) << shift
+            boards ^= low
+        return legal
+
+    def legal_indices(self):
+        indices = []
+        mask = self.legal_mask()
+        while mask:
+            low = mask & -mask
+            indices.append(low.bit_length() - 1)
+            mask ^= low
+        return indices
+
+    def get_legal_moves(self):
+        return [MOVES[index] for index in self.legal_indices()]
+
+    def is_legal(self, index):
+        return bool((self.legal_mask() >> index) & 1)
+
+    # plays the side to move at index and returns what unmake_move needs to restore it
+    def make_move(self, index):
+        player = self.player
+        board, cell = divmod(index, 9)
+        undo = (index, self.allowed, self.won[player], self.drawn)
+
+        self.cells[player] |= 1 << index
+        self.cells_key ^= ZOBRIST_CELLS[player][index]
+        shift = board * 9
+        local = (self.cells[player] >> shift) & FULL_MASK
+        if WIN_TABLE[local]:
+            self.won[player] |= 1 << board
+        elif ((self.cells[1] | self.cells[2]) >> shift) & FULL_MASK == FULL_MASK:
+            self.drawn |= 1 << board
+
+        # free play when the target board is already decided
+        self.allowed = -1 if (self.closed >> cell) & 1 else cell
+        self.player = 3 - player
+        return undo
+
+    def unmake_move(self, undo):
+        index, allowed, won, drawn = undo
+        player = 3 - self.player
+        self.cells[player] &= ~(1 << index)
+        self.cells_key ^= ZOBRIST_CELLS[player][index]
+        self.won[player] = won
+        self.drawn = drawn
+        self.allowed = allowed
+        self.player = player
+
+    # same as make_move/unmake_move but with (global_row, global_col, local_row, local_col) moves
+    def apply_move(self, move):
+        return self.make_move(move_to_index(move))
+
+    def undo_move(self, undo):
+        self.unmake_move(undo)
+
+    def copy(self):
+        board = self.__class__.__new__(self.__class__)
+        board.__dict__.update(self.__dict__)
+        board.cells = self.cells[:]
+        board.won = self.won[:]
+        return board
+
+# squares/global_squares are converted views of the bitboard for drawing and logging
+class Board(BitBoard):
+    def final_global_state(self):
+        global_squares = self.global_squares
+
+        # vertical wins
+        for col in range(COLS):
+            if global_squares[0][col] == global_squares[1][col] == global_squares[2][col] != 0:
+                winner = global_squares[0][col]
+                x = col * SIZE + SIZE // 2
+                initial_pos = (x, 20)
+                end_pos = (x, HEIGHT - 20)
+                line_coords = (initial_pos, end_pos)
+                return winner, line_coords
+
+        # horizontal wins
+        for row in range(ROWS):
+            if global_squares[row][0] == global_squares[row][1] == global_squares[row][2] != 0:
+                winner = global_squares[row][0]
+                y = row * SIZE + SIZE // 2
+                initial_pos = (20, y)
+                end_pos = (WIDTH - 20, y)
+                line_coords = (initial_pos, end_pos)
+                return winner, line_coords
+
+        # diagonal wins
+        if global_squares[0][0] == global_squares[1][1] == global_squares[2][2] != 0:
+            winner = global_squares[1][1]
+            initial_pos = (20, 20)
+            end_pos = (WIDTH - 20, HEIGHT - 20)
+            line_coords = (initial_pos, end_pos)
+            return winner, line_coords
+        if global_squares[2][0] == global_squares[1][1] == global_squares[0][2] != 0:
+            winner = global_squares[1][1]
+            initial_pos = (20, HEIGHT - 20)
+            end_pos = (WIDTH - 20, 20)
+            line_coords = (initial_pos, end_pos)
+            return winner, line_coords
+
+        return 0, None
+
+    def reset(self):
+        self.__init__()
+
+# rules and move bookkeeping of a game, main.Game adds the drawing on top
+class Game:
+    def __init__(self):
+        self.board = Board()
+        self.player = 1
+        self.allowed_square = None
+        self.running = True
+        self.winner = 0
+        self.winner_line_coords = None
+
+    # side to move and allowed square are part of the board state
+    @property
+    def player(self):
+        return self.board.player
+
+    @player.setter
+    def player(self, player):
+        self.board.player = player
+
+    @property
+    def allowed_square(self):
+        return self.board.allowed_square
+
+    @allowed_square.setter
+    def allowed_square(self, square):
+        self.board.allowed_square = square
+
+    def play_move(self, global_row, global_col, local_row, local_col):
+        self.apply_move((global_row, global_col, local_row, local_col))
+
+    # plays a move in place, the returned token lets undo_move restore the exact previous state
+    def apply_move(self, move):
+        undo = (self.board.apply_move(move), self.winner, self.winner_line_coords, self.running)
+
+        # win check
+        global_winner, line_coords = self.board.final_global_state()
+        if global_winner != 0:
+            self.winner = global_winner
+            self.winner_line_coords = line_coords
+            self.running = False
+        return undo
+
+    def undo_move(self, undo):
+        board_undo, self.winner, self.winner_line_coords, self.running = undo
+        self.board.undo_move(board_undo)
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def is_move_legal(self, global_row, global_col, local_row, local_col):
+        return self.board.is_legal(move_to_index((global_row, global_col, local_row, local_col)))
+
+    def get_legal_moves(self) -> list[tuple[int, int, int, int]]:
+        return self.board.get_legal_moves()
+
+    def is_game_over(self):
+        return self.board.global_status() in (1, 2)
+
+    def get_winner(self):
+        return self.board.global_status()
+
+    def get_board(self):
+        return self.board.global_squares
+
+    def switch_player(self):
+        self.player = self.player % 2 + 1
+
+    def reset(self):
+        self.board.reset()
+        self.player = 1
+        self.allowed_square = None
+        self.running = True
+        self.winner = 0
+        self.winner_line_coords = None
+
+WIN_ARRAY = np.array(WIN_TABLE)
+BOARD_RANGE = np.arange(9)
+
+# plays count uniformly random games from board at once, returns the winners (1, 2 or -1 for a draw)
+def random_playouts(board, count, rng):
+    masks = np.zeros((count, 3, 9), dtype=np.int32)
+    for player in (1, 2):
+        masks[:, player] = [(board.cells[player] >> (local * 9)) & FULL_MASK for local in range(9)]
+    won = np.zeros((count, 3), dtype=np.int32)
+    won[:, 1], won[:, 2] = board.won[1], board.won[2]
+    drawn = np.full(count, board.drawn, dtype=np.int32)
+    allowed = np.full(count, board.allowed, dtype=np.int32)
+    player = np.full(count, board.player, dtype=np.int32)
+    winner = np.full(count, board.global_status(), dtype=np.int32)
+
+    active = np.flatnonzero(winner == 0)
+    while active.size:
+        mover = player[active]
+        closed = won[active, 1] | won[active, 2] | drawn[active]
+        open_boards = ((closed[:, None] >> BOARD_RANGE) & 1) == 0
+        target = allowed[active]
+        boards_ok = np.where(target[:, None] >= 0, BOARD_RANGE == target[:, None], open_boards)
+        free = ~(masks[active, 1] | masks[active, 2]) & FULL_MASK
+        legal = (((free[:, :, None] >> BOARD_RANGE) & 1) == 1) & boards_ok[:, :, None]
+        legal = legal.reshape(active.size, 81)
+
+        # uniform choice among the legal cells
+        keys = rng.random(legal.shape)
+        keys[~legal] = -1.0
+        move = keys.argmax(axis=1)
+        local, cell = move // 9, move % 9
+
+        masks[active, mover, local] |= 1 << cell
+        local_won = WIN_ARRAY[masks[active, mover, local]]
+        local_full = (masks[active, 1, local] | masks[active, 2, local]) == FULL_MASK
+        won[active, mover] |= np.where(local_won, 1 << local, 0)
+        drawn[active] |= np.where(local_full & ~local_won, 1 << local, 0)
+
+        closed = won[active, 1] | won[active, 2] | drawn[active]
+        allowed[active] = np.where((closed >> cell) & 1, -1, cell)
+        player[active] = 3 - mover
+
+        # only the mover can have completed a line of won boards
+        result = np.where(WIN_ARRAY[won[active, mover]], mover, 0)
+        result = np.where((result == 0) & (WIN_ARRAY[drawn[active]] | (closed == FULL_MASK)), -1, result)
+        result[~legal.any(axis=1)] = -1
+        winner[active] = result
+        active = active[result == 0]
+    return winner
@@ -0,0 +1,233 @@
+# Greedy generation for the fine-tuned VLM with the system prompt's key/value cache reused
+#
+# Every prompt starts with the same system message. PrefixCache runs it through the model once
+# and every batch starts from a copy of that cache, so the prefill only covers the image and the
+# per-board text. Rows are padded between the shared prefix and their own tokens so the prefix sits
+# at the same positions in every row. generate() cannot continue from a prefix here: Qwen-VL derives
+# its multimodal rope positions from the uncached tokens only, so the positions are computed on the
+# full rows and prefill and greedy decoding run in this module.
+#
+# MoveJsonProcessor constrains the decoding to the move JSON, optionally to the legal moves only.
+import copy, inspect, itertools, json, time
+from collections import deque
+
+import numpy as np
+import torch
+from transformers import DynamicCache, LogitsProcessor
+
+MOVE_KEYS = ("global_row", "global_col", "local_row", "local_col")
+ALL_MOVES = list(itertools.product(range(3), repeat=4))
+
+# the language model under the PEFT and unsloth wrappers, it owns get_rope_index
+def multimodal_model(model):
+    while not hasattr(model, "get_rope_index"):
+        if hasattr(model, "get_base_model"):
+            model = model.get_base_model()
+        else:
+            model = model.model
+    return model
+
+class PrefixCache:
+    def __init__(self, model, processor, enabled=True):
+        self.model = model
+        self.processor = processor
+        self.tokenizer = processor.tokenizer
+        self.enabled = enabled
+        self.rope_model = multimodal_model(model)
+        self.rope_args = set(inspect.signature(self.rope_model.get_rope_index).parameters)
+        # system prompt text -> (token ids, key/value cache for a batch of one)
+        self.prefixes = {}
+        # time to first token in seconds, with and without the prefix cache
+        self.ttft = {True: deque(maxlen=1000), False: deque(maxlen=1000)}
+        self.last_ttft = None
+
+        eos = model.generation_config.eos_token_id
+        self.eos_ids = torch.tensor(eos if isinstance(eos, list) else [eos], device=model.device)
+        self.pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else int(self.eos_ids[0])
+
+    def prefix(self, system_message):
+        text = system_message["content"][0]["text"]
+        if text not in self.prefixes:
+            prompt = self.processor.apply_chat_template([system_message], tokenize=False)
+            ids = self.tokenizer(prompt, add_special_tokens=False, return_tensors="pt").input_ids.to(self.model.device)
+            cache = DynamicCache()
+            with torch.no_grad():
+                self.model(input_ids=ids, attention_mask=torch.ones_like(ids), past_key_values=cache, use_cache=True)
+            self.prefixes[text] = (ids[0], cache)
+        return self.prefixes[text]
+
+    # the rows of the batch without padding, re-padded between the shared prefix and the rest:
+    # (input_ids, attention_mask, prefix length, prefix cache or None)
+    def split_rows(self, inputs, batch_messages, use_prefix):
+        rows = [ids[mask.bool()] for ids, mask in zip(inputs["input_ids"], inputs["attention_mask"])]
+        prefix_ids, prefix_cache = None, None
+        if use_prefix and all(messages[0]["role"] == "system" for messages in batch_messages) \
+                and len({messages[0]["content"][0]["text"] for messages in batch_messages}) == 1:
+            prefix_ids, prefix_cache = self.prefix(batch_messages[0][0])
+            if not all(len(row) > len(prefix_ids) and torch.equal(row[:len(prefix_ids)], prefix_ids) for row in rows):
+                prefix_ids, prefix_cache = None, None
+
+        prefix_length = 0 if prefix_ids is None else len(prefix_ids)
+        length = max(len(row) for row in rows)
+        input_ids = torch.full((len(rows), length), self.pad_id, dtype=rows[0].dtype, device=self.model.device)
+        attention_mask = torch.zeros((len(rows), length), dtype=torch.long, device=self.model.device)
+        for i, row in enumerate(rows):
+            input_ids[i, :prefix_length] = row[:prefix_length]
+            input_ids[i, length - len(row) + prefix_length:] = row[prefix_length:]
+            attention_mask[i, :prefix_length] = 1
+            attention_mask[i, length - len(row) + prefix_length:] = 1
+        return input_ids, attention_mask, prefix_length, prefix_cache
+
+    # greedy decoding until every row produced an end token, logits_processor(sequences, logits) -> logits
+    def generate(self, batch_messages, max_new_tokens=128, logits_processor=None, use_prefix=None):
+        use_prefix = self.enabled if use_prefix is None else use_prefix
+        start_time = time.perf_counter()
+        inputs = self.processor.apply_chat_template(batch_messages, add_generation_prompt=True, tokenize=True, padding=True,
+                                                    return_dict=True, return_tensors="pt").to(self.model.device)
+        input_ids, attention_mask, prefix_length, prefix_cache = self.split_rows(inputs, batch_messages, use_prefix)
+        batch_size = input_ids.shape[0]
+
+        if prefix_cache is None:
+            cache = DynamicCache()
+        else:
+            cache = copy.deepcopy(prefix_cache)
+            cache.batch_repeat_interleave(batch_size)
+
+        # per-token inputs follow the re-padded rows, the image tensors are passed as they are
+        extra = {}
+        for key, value in inputs.items():
+            if key in ("input_ids", "attention_mask"):
+                continue
+            if torch.is_tensor(value) and value.shape[:2] == inputs["input_ids"].shape:
+                value = self.repad(value, inputs["attention_mask"], attention_mask)
+            extra[key] = value
+        rope_inputs = {key: value for key, value in extra.items() if key in self.rope_args}
+        position_ids, _ = self.rope_model.get_rope_index(input_ids, attention_mask=attention_mask, **rope_inputs)
+        # the prompts end in text, where all three rope axes agree, generated tokens continue from there
+        next_positions = position_ids[:, :, -1:] + 1
+        extra = {key: value[:, prefix_length:] if torch.is_tensor(value) and value.shape[:2] == input_ids.shape else value
+                 for key, value in extra.items()}
+
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids[:, prefix_length:], attention_mask=attention_mask,
+                                 position_ids=position_ids[..., prefix_length:], past_key_values=cache, use_cache=True, **extra)
+            logits = outputs.logits[:, -1, :]
+
+            sequences = input_ids
+            finished = torch.zeros(batch_size, dtype=torch.bool, device=input_ids.device)
+            generated = []
+            for step in range(max_new_tokens):
+                if logits_processor is not None:
+                    logits = logits_processor(sequences, logits)
+                next_tokens = logits.argmax(-1)
+                next_tokens = torch.where(finished, torch.full_like(next_tokens, self.pad_id), next_tokens)
+                if step == 0:
+                    self.last_ttft = time.perf_counter() - start_time
+                    self.ttft[prefix_cache is not None].append(self.last_ttft)
+                generated.append(next_tokens)
+                sequences = torch.cat([sequences, next_tokens[:, None]], dim=1)
+                finished |= torch.isin(next_tokens, self.eos_ids)
+                if finished.all() or step == max_new_tokens - 1:
+                    break
+
+                attention_mask = torch.cat([attention_mask, attention_mask.new_ones((batch_size, 1))], dim=1)
+                outputs = self.model(input_ids=next_tokens[:, None], attention_mask=attention_mask, position_ids=next_positions + step,
+                                     past_key_values=cache, use_cache=True)
+                logits = outputs.logits[:, -1, :]
+
+        generated = torch.stack(generated, dim=1) if generated else input_ids[:, :0]
+        return [self.tokenizer.decode(row, skip_special_tokens=True).strip() for row in generated]
+
+    # moves the unpadded values of every row into the layout of new_mask
+    def repad(self, value, old_mask, new_mask):
+        out = torch.zeros((value.shape[0], new_mask.shape[1]) + value.shape[2:], dtype=value.dtype, device=value.device)
+        for i in range(value.shape[0]):
+            out[i, new_mask[i].bool()] = value[i, old_mask[i].bool()]
+        return out
+
+    # runs the same batch with and without the prefix cache and prints the time to first token
+    def compare_ttft(self, batch_messages, repeats=3):
+        results = {}
+        for use_prefix in (False, True):
+            times = []
+            for _ in range(repeats):
+                self.generate(batch_messages, max_new_tokens=1, use_prefix=use_prefix)
+                times.append(self.last_ttft)
+            results[use_prefix] = float(np.median(times)) * 1000
+        prefix_tokens = max((len(ids) for ids, _ in self.prefixes.values()), default=0)
+        print(f"TTFT for a batch of {len(batch_messages)}: {results[False]:.1f} ms full prefill, "
+              f"{results[True]:.1f} ms with the cached prefix of {prefix_tokens} tokens")
+        return results
+
+    def metrics(self):
+        metrics = {"prefix_cache": self.enabled, "prefix_cache_entries": len(self.prefixes)}
+        for use_prefix, name in ((True, "prefix_cache"), (False, "full_prefill")):
+            times = np.array(self.ttft[use_prefix]) * 1000 if self.ttft[use_prefix] else np.zeros(1)
+            metrics[f"ttft_{name}_p50_ms"] = float(np.percentile(times, 50))
+            metrics[f"ttft_{name}_count"] = len(self.ttft[use_prefix])
+        return metrics
+
+# Lets a row write nothing but one of the given moves as JSON followed by suffix, then ends it.
+# Decoding is free until trigger shows up in the row's output (the trained MOVE answer reasons before
+# its "best_move"), an empty trigger constrains from the first token. moves holds a list of
+# (global_row, global_col, local_row, local_col) per row, None or an empty list allows all 81 cells.
+# The allowed texts are tokenized into a trie when a row is constrained, so every step is a lookup.
+class MoveJsonProcessor(LogitsProcessor):
+    def __init__(self, tokenizer, eos_token_id, moves=None, trigger="", suffix="", window=32):
+        self.tokenizer = tokenizer
+        self.eos_token_id = eos_token_id
+        self.moves = moves
+        self.trigger = trigger
+        self.suffix = suffix
+        # tokens decoded when looking for the trigger
+        self.window = window
+        self.prompt_length = None
+        # row -> (token trie or None when the output went off the schema, generated length it starts at)
+        self.tries = {}
+
+    def candidates(self, row):
+        moves = self.moves[row] if self.moves is not None and self.moves[row] else ALL_MOVES
+        return [json.dumps(dict(zip(MOVE_KEYS, map(int, move)))) + self.suffix for move in moves]
+
+    # tail is what the row already wrote past the trigger
+    def build_trie(self, row, tail):
+        trie = {}
+        for text in self.candidates(row):
+            if not text.startswith(tail):
+                continue
+            node = trie
+            for token in self.tokenizer.encode(text[len(tail):], add_special_tokens=False):
+                node = node.setdefault(token, {})
+            node[self.eos_token_id] = {}
+        return trie or None
+
+    def __call__(self, input_ids, scores):
+        # the first call sees the prompt only
+        if self.prompt_length is None:
+            self.prompt_length = input_ids.shape[1]
+        step = input_ids.shape[1] - self.prompt_length
+
+        for row in range(input_ids.shape[0]):
+            generated = input_ids[row, self.prompt_length:]
+            if row not in self.tries:
+                tail = ""
+                if self.trigger:
+                    text = self.tokenizer.decode(generated[-self.window:], skip_special_tokens=True)
+                    if self.trigger not in text:
+                        continue
+                    tail = text.rsplit(self.trigger, 1)[1]
+                self.tries[row] = (self.build_trie(row, tail), step)
+
+            node, start = self.tries[row]
+            for token in generated[start:].tolist():
+                if not node:
+                    break
+                node = node.get(token)
+            # finished, or the row is not following the schema
+            if not node:
+                continue
+            allowed = torch.tensor(list(node), device=scores.device)
+            mask = torch.full_like(scores[row], -float("inf"))
+            mask[allowed] = 0
+            scores[row] += mask
+        return scores